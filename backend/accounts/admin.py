@@ -1,3 +1,23 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-# Register your models here.
+from audit.admin import AuditedAdmin
+from .models import User
+
+
+@admin.register(User)
+class UserAdmin(AuditedAdmin, BaseUserAdmin):
+    list_display = ['username', 'email', 'first_name', 'last_name', 'role', 'site', 'department', 'is_active']
+    list_select_related = ['site', 'department']
+    # Site, role and department use user_site_role_idx, user_role_idx and
+    # user_department_idx.
+    list_filter = ['site', 'role', 'department', 'is_active', 'is_staff']
+    search_fields = ['username', 'email', 'first_name', 'last_name']
+    ordering = ['id']
+    raw_id_fields = ['department']
+    fieldsets = BaseUserAdmin.fieldsets + (
+        ('Organization', {'fields': ('role', 'site', 'department')}),
+    )
+    add_fieldsets = BaseUserAdmin.add_fieldsets + (
+        ('Organization', {'fields': ('email', 'role', 'site', 'department')}),
+    )
@@ -1,17 +1,61 @@
+import threading
+import time
+
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 
 User = get_user_model()
 
+
+class HashTimer:
+    """
+    Moving average of how long a password check takes, so that a login for an
+    unknown email can wait that long instead of hashing a throwaway password.
+    Sleeping keeps the response time without spending the CPU.
+    """
+    # Weight of the newest sample in the average.
+    ALPHA = 0.2
+
+    def __init__(self):
+        self.average = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            if self.average is None:
+                self.average = seconds
+            else:
+                self.average += self.ALPHA * (seconds - self.average)
+
+    def wait(self, password):
+        if self.average is None:
+            # Nothing measured yet: hash once, which also gives a first sample.
+            started = time.perf_counter()
+            make_password(password)
+            self.record(time.perf_counter() - started)
+        else:
+            time.sleep(self.average)
+
+
+hash_timer = HashTimer()
+
+
 class EmailBackend(ModelBackend):
     """
     Custom auth backend that lets users authenticate using their email.
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
         email = kwargs.get('email') or username
+        if email is None or password is None:
+            return None
         try:
             user = User.objects.get(email=email)
-            if user.check_password(password) and self.user_can_authenticate(user):
-                return user
         except User.DoesNotExist:
+            hash_timer.wait(password)
             return None
+        started = time.perf_counter()
+        valid = user.check_password(password)
+        hash_timer.record(time.perf_counter() - started)
+        if valid and self.user_can_authenticate(user):
+            return user
@@ -0,0 +1,267 @@
+"""
+Bulk user provisioning from CSV or JSON.
+
+Rows are validated in batches of ``USER_IMPORT_BATCH_SIZE``. Departments come
+from one preloaded name/id map of the site imported into (or of every site),
+and existing emails and usernames are checked with one query per batch.
+Hashing passwords is CPU-bound and dominates the cost of creating a user, so
+``manage.py import_users`` spreads it across a process pool; the API hashes
+in the request's own process and takes few enough passwords to finish well
+within the worker timeout. The valid users are then inserted with
+``bulk_create``.
+
+Every rejected row is reported with its row number and the reasons; the rest
+are still created. Rows without a password get an unusable one, so the user
+has to have it set by an admin before they can log in.
+"""
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from audit import log as audit
+from departments.models import Department
+from tenancy.scoping import scope_to_site
+from .models import User
+
+COLUMNS = ('email', 'username', 'first_name', 'last_name', 'role', 'department', 'password')
+ROLES = {role for role, _ in User.ROLE_CHOICES}
+
+# Below this many passwords a process pool costs more than it saves.
+MIN_POOL_PASSWORDS = 16
+
+
+class ImportFileError(ValueError):
+    """The upload could not be read at all (as opposed to individual bad rows)."""
+
+
+def parse_rows(content, fmt=None):
+    """Rows of a CSV or JSON document as dicts; ``fmt`` is guessed when not given."""
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ImportFileError("The file must be UTF-8 encoded")
+    fmt = fmt or ('json' if content.lstrip()[:1] in ('[', '{') else 'csv')
+
+    if fmt == 'json':
+        try:
+            rows = json.loads(content)
+        except ValueError as exc:
+            raise ImportFileError(f"Invalid JSON: {exc}")
+        if isinstance(rows, dict):
+            rows = rows.get('users')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ImportFileError('JSON must be a list of user objects, or {"users": [...]}')
+        return rows
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames or 'email' not in [name.strip().lower() for name in reader.fieldnames]:
+            raise ImportFileError("The CSV needs a header row with at least an 'email' column")
+        return [{(key or '').strip().lower(): value for key, value in row.items()} for row in reader]
+    raise ImportFileError(f"Unknown format {fmt!r}; expected csv or json")
+
+
+def department_map(site_id=None):
+    """
+    Lower-cased department names and string ids, both mapped to ``(id, site id)``;
+    only the departments of ``site_id`` when given.
+    """
+    departments = {}
+    for pk, name, department_site_id in scope_to_site(Department.objects.all(), site_id).values_list('id', 'name', 'site_id'):
+        departments[name.strip().lower()] = pk, department_site_id
+        departments[str(pk)] = pk, department_site_id
+    return departments
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _init_worker():
+    # Forked workers inherit configured settings; spawned ones need them set up.
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+
+def count_passwords(rows):
+    """Rows of ``rows`` that set a password, and so need hashing."""
+    return sum(1 for row in rows if _clean(row.get('password')))
+
+
+def hash_passwords(passwords, workers=1):
+    """
+    ``make_password`` for each password, across ``workers`` processes when it
+    is worth it. Only for commands: forking a web worker that runs threads
+    (audit, notifications, tasks) may deadlock the children.
+    """
+    if workers <= 1 or len(passwords) < MIN_POOL_PASSWORDS:
+        return [make_password(password) for password in passwords]
+    workers = min(workers, len(passwords))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+class UserImporter:
+    def __init__(self, actor=None, default_role='staff', batch_size=None, workers=1, dry_run=False, site=None):
+        self.actor = actor
+        # Admins of a site import into it; others may pick one.
+        self.site_id = actor.site_id if actor is not None and actor.site_id else getattr(site, 'pk', None)
+        self.default_role = default_role
+        self.batch_size = batch_size or settings.USER_IMPORT_BATCH_SIZE
+        self.workers = workers
+        self.dry_run = dry_run
+        self.departments = department_map(self.site_id)
+        self.seen_emails = set()
+        self.seen_usernames = set()
+        self.errors = []
+        self.created = 0
+
+    def run(self, rows):
+        for start in range(0, len(rows), self.batch_size):
+            self.import_batch(rows[start:start + self.batch_size], first_row=start + 1)
+        return self.report(len(rows))
+
+    def report(self, total):
+        return {
+            'total': total,
+            'created': self.created,
+            'failed': len(self.errors),
+            'dry_run': self.dry_run,
+            'errors': self.errors,
+        }
+
+    def reject(self, number, row, errors):
+        self.errors.append({'row': number, 'email': _clean(row.get('email')), 'errors': errors})
+
+    def validate(self, row):
+        """Build an unsaved ``User`` from ``row``; returns ``(user, password, errors)``."""
+        errors = {}
+        unknown = set(row) - set(COLUMNS)
+        if unknown:
+            errors['columns'] = [f"Unknown column(s): {', '.join(sorted(unknown))}"]
+
+        email = _clean(row.get('email')).lower()
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors['email'] = ["Enter a valid email address."]
+        else:
+            if email in self.seen_emails:
+                errors['email'] = ["Duplicate email in this import."]
+        username = _clean(row.get('username')) or email
+        if len(username) > 150:
+            errors['username'] = ["Must be at most 150 characters."]
+        elif username in self.seen_usernames:
+            errors['username'] = ["Duplicate username in this import."]
+
+        role = _clean(row.get('role')).lower() or self.default_role
+        if role not in ROLES:
+            errors['role'] = [f"Must be one of {', '.join(sorted(ROLES))}."]
+
+        department_id, site_id = None, self.site_id
+        department = _clean(row.get('department'))
+        if department:
+            department_id, department_site_id = self.departments.get(department.lower(), (None, None))
+            site_id = department_site_id or site_id
+            if department_id is None:
+                errors['department'] = [f"Unknown department {department!r}."]
+        elif role == 'director':
+            errors['department'] = ["Directors need a department."]
+
+        user = User(
+            email=email,
+            username=username,
+            first_name=_clean(row.get('first_name'))[:150],
+            last_name=_clean(row.get('last_name'))[:150],
+            role=role,
+            department_id=department_id,
+            site_id=site_id,
+        )
+        password = _clean(row.get('password')) or None
+        if password:
+            try:
+                validate_password(password, user)
+            except ValidationError as exc:
+                errors['password'] = list(exc.messages)
+        if not errors:
+            self.seen_emails.add(email)
+            self.seen_usernames.add(username)
+        return user, password, errors
+
+    def import_batch(self, rows, first_row):
+        candidates = []
+        for number, row in enumerate(rows, start=first_row):
+            user, password, errors = self.validate(row)
+            if errors:
+                self.reject(number, row, errors)
+            else:
+                candidates.append((number, row, user, password))
+        if not candidates:
+            return
+
+        # Existing accounts, one query per batch.
+        emails = [user.email for _, _, user, _ in candidates]
+        usernames = [user.username for _, _, user, _ in candidates]
+        # Emails are compared case-insensitively: Bob@X.com takes bob@x.com.
+        taken_emails = set(
+            User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)
+            .values_list('email_lower', flat=True)
+        )
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        valid = []
+        for number, row, user, password in candidates:
+            errors = {}
+            if user.email in taken_emails:
+                errors['email'] = ["A user with this email already exists."]
+            if user.username in taken_usernames:
+                errors['username'] = ["A user with this username already exists."]
+            if errors:
+                self.reject(number, row, errors)
+            else:
+                valid.append((number, row, user, password))
+        if self.dry_run:
+            self.created += len(valid)
+            return
+
+        hashed = iter(hash_passwords([password for _, _, _, password in valid if password], self.workers))
+        for _, _, user, password in valid:
+            user.password = next(hashed) if password else make_password(None)
+        self.insert(valid)
+
+    def insert(self, valid):
+        users = [user for _, _, user, _ in valid]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+        except IntegrityError:
+            # Lost a race with another write: insert one by one to find the culprits.
+            users = []
+            for number, row, user, _ in valid:
+                try:
+                    with transaction.atomic():
+                        user.save()
+                except IntegrityError:
+                    user.pk = None
+                    self.reject(number, row, {'email': ["A user with this email or username already exists."]})
+                else:
+                    users.append(user)
+        self.created += len(users)
+        for user in users:
+            if user.pk is not None:
+                audit.record('import', user, self.actor, after=audit.snapshot(user))
+
+
+def import_users(rows, **options):
+    """Validate and create users from ``rows`` (dicts); returns the import report."""
+    return UserImporter(**options).run(rows)
@@ -0,0 +1,59 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importer import ImportFileError, import_users, parse_rows
+from tenancy.models import Site
+
+
+class Command(BaseCommand):
+    help = "Create staff accounts in bulk from a CSV or JSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV with a header row, or a JSON list of users")
+        parser.add_argument('--format', choices=['csv', 'json'], help="Default: guessed from the content")
+        parser.add_argument('--default-role', default='staff', help="Role for rows without one")
+        parser.add_argument('--site', help="Code of the site to import into (default: none, departments of every site)")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: USER_IMPORT_WORKERS)")
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; create nothing")
+        parser.add_argument('--json', action='store_true', help="Print the full report as JSON")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as handle:
+                rows = parse_rows(handle.read(), options['format'])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except ImportFileError as exc:
+            raise CommandError(str(exc))
+
+        site = None
+        if options['site']:
+            site = Site.objects.filter(code=options['site']).first()
+            if site is None:
+                raise CommandError(f"Unknown site {options['site']!r}")
+
+        started = time.perf_counter()
+        report = import_users(
+            rows,
+            site=site,
+            default_role=options['default_role'],
+            workers=options['workers'] or settings.USER_IMPORT_WORKERS,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        elapsed = time.perf_counter() - started
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for error in report['errors']:
+            reasons = '; '.join(f"{field}: {' '.join(messages)}" for field, messages in error['errors'].items())
+            self.stdout.write(self.style.WARNING(f"row {error['row']} ({error['email'] or 'no email'}): {reasons}"))
+        verb = "would be created" if options['dry_run'] else "created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} of {report['total']} user(s) {verb}, {report['failed']} rejected, in {elapsed:.2f}s"
+        ))
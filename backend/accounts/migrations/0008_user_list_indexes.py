@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_delete_department'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('departments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'id'], name='user_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['department', 'id'], name='user_department_idx'),
+        ),
+    ]
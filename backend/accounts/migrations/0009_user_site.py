@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-19 09:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_user_list_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('departments', '0004_department_site'),
+        ('tenancy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='site',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='users', to='tenancy.site'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['site', 'id'], name='user_site_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['site', 'role', 'id'], name='user_site_role_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from departments.models import Department 
+from departments.models import Department
+from tenancy.models import Site
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -12,6 +13,23 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='staff')
     department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True)
-    
+    # Users of a site only see that site; users without one see every site
+    # (see tenancy.scoping).
+    # Indexed by user_site_idx and user_site_role_idx below.
+    site = models.ForeignKey(
+        Site, on_delete=models.PROTECT, null=True, blank=True, related_name='users', db_index=False
+    )
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Role filter of the user list, which pages by id.
+            models.Index(fields=['role', 'id'], name='user_role_idx'),
+            # User list of one site, without and with the role filter.
+            models.Index(fields=['site', 'id'], name='user_site_idx'),
+            models.Index(fields=['site', 'role', 'id'], name='user_site_role_idx'),
+            # Department filter of the user list.
+            models.Index(fields=['department', 'id'], name='user_department_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.role})"
\ No newline at end of file
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model, authenticate
 from .models import Department
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from tenancy.serializers import CurrentSiteDefault, SiteRelatedField, SiteScopedRelatedField
 from django.utils.translation import gettext_lazy as _
 
 
@@ -17,7 +18,7 @@ class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     password_confirmation = serializers.CharField(write_only=True, required=False)
 
-    department_id = serializers.PrimaryKeyRelatedField(
+    department_id = SiteScopedRelatedField(
         source='department',
         queryset=Department.objects.all(),
         required=False,
@@ -27,6 +28,8 @@ class UserSerializer(serializers.ModelSerializer):
         source='department.name',
         read_only=True
     )
+    # Admins of a site create users in it; users without a site see every site.
+    site_id = SiteRelatedField(source='site', default=CurrentSiteDefault(), allow_null=True)
 
     class Meta:
         model = User
@@ -38,6 +41,7 @@ class UserSerializer(serializers.ModelSerializer):
             'role',
             'department_id',
             'department_name',
+            'site_id',
             'password',
             'password_confirmation',
             'username'
@@ -57,6 +61,14 @@ class UserSerializer(serializers.ModelSerializer):
         if 'password' in data:
             if data['password'] != data.get('password_confirmation'):
                 raise serializers.ValidationError({"password": "Password fields didn't match."})
+        department = data.get('department', getattr(self.instance, 'department', None))
+        if department is not None and department.site_id is not None:
+            site = data.get('site', getattr(self.instance, 'site', None))
+            if 'site_id' not in getattr(self, 'initial_data', {}):
+                # Unless given, the site is the department's.
+                data['site'] = department.site
+            elif site is None or site.pk != department.site_id:
+                raise serializers.ValidationError({"department_id": "The department is in another site."})
         return data
 
     def create(self, validated_data):
@@ -80,6 +92,17 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
     
+class UserListSerializer(serializers.ModelSerializer):
+    """Read-only rows for the user administration list."""
+    department_id = serializers.IntegerField(read_only=True)
+    department_name = serializers.CharField(source='department.name', read_only=True, default=None)
+    site_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = User
+        fields = ['id', 'first_name', 'last_name', 'email', 'role', 'department_id', 'department_name', 'site_id', 'username']
+        read_only_fields = fields
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = 'email'
 
@@ -0,0 +1,141 @@
+"""
+Brute-force protection for the login endpoints.
+
+``LoginRateThrottle`` runs before the view, so a rejected attempt never
+reaches the database or the password hasher. Every attempt takes a token from
+two buckets, one per client IP and one per email address. Each bucket holds
+up to ``burst`` tokens and refills at ``per_minute`` tokens a minute. A
+successful login refills the account bucket. The client IP is DRF's
+``get_ident``, so set ``NUM_PROXIES`` to the number of proxies in front of
+the app; otherwise clients could pick their own IP bucket with
+``X-Forwarded-For``.
+
+Buckets live in process memory. With ``LOGIN_THROTTLE_SHARED`` they are also
+kept in the default cache, so that every worker enforces the same limits.
+The shared check runs only after the local one has passed.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucket:
+    """Per-key token buckets held in this process."""
+    # Buckets that have refilled completely are dropped once there are this many.
+    MAX_KEYS = 10000
+
+    def __init__(self, burst, per_minute):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _refill(self, tokens, updated, now):
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def take(self, key):
+        """Take a token; returns 0 if there was one, else the seconds until there will be."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = self._refill(tokens, updated, now)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+            return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _prune(self, now):
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if self._refill(tokens, updated, now) >= self.burst:
+                del self._buckets[key]
+
+
+class CacheTokenBucket(TokenBucket):
+    """The same buckets in the shared cache, so limits hold across workers."""
+
+    def __init__(self, burst, per_minute, prefix):
+        super().__init__(burst, per_minute)
+        self.prefix = prefix
+        # Long enough for an empty bucket to refill completely.
+        self.timeout = int(self.burst / self.rate) + 1
+
+    def take(self, key):
+        # Read-modify-write without a lock: concurrent attempts from several
+        # workers may each get the last token, which is close enough here.
+        key = f'{self.prefix}:{key}'
+        now = time.time()
+        tokens, updated = cache.get(key, (self.burst, now))
+        tokens = self._refill(tokens, updated, now)
+        if tokens < 1:
+            return (1 - tokens) / self.rate
+        cache.set(key, (tokens - 1, now), self.timeout)
+        return 0
+
+    def reset(self, key):
+        cache.delete(f'{self.prefix}:{key}')
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_buckets():
+    """The local and, if enabled, shared buckets for ``'ip'`` and ``'account'``."""
+    if not _buckets:
+        with _buckets_lock:
+            if not _buckets:
+                limits = {
+                    'ip': (settings.LOGIN_THROTTLE_IP_BURST, settings.LOGIN_THROTTLE_IP_PER_MINUTE),
+                    'account': (settings.LOGIN_THROTTLE_ACCOUNT_BURST, settings.LOGIN_THROTTLE_ACCOUNT_PER_MINUTE),
+                }
+                for scope, (burst, per_minute) in limits.items():
+                    buckets = [TokenBucket(burst, per_minute)]
+                    if settings.LOGIN_THROTTLE_SHARED:
+                        buckets.append(CacheTokenBucket(burst, per_minute, f'login-throttle:{scope}'))
+                    _buckets[scope] = buckets
+    return _buckets
+
+
+def account_key(request):
+    if not hasattr(request.data, 'get'):
+        return None
+    email = request.data.get('email') or request.data.get('username')
+    return str(email).strip().lower() if email else None
+
+
+def reset_account(request):
+    """Refill the account bucket after a successful login."""
+    key = account_key(request)
+    if key and settings.LOGIN_THROTTLE_ENABLED:
+        for bucket in get_buckets()['account']:
+            bucket.reset(key)
+
+
+class LoginRateThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        self.delay = 0
+        if not settings.LOGIN_THROTTLE_ENABLED or request.method != 'POST':
+            return True
+        keys = {'ip': self.get_ident(request), 'account': account_key(request)}
+        buckets = get_buckets()
+        for scope, key in keys.items():
+            if key is None:
+                continue
+            for bucket in buckets[scope]:
+                self.delay = bucket.take(key)
+                if self.delay:
+                    return False
+        return True
+
+    def wait(self):
+        return self.delay
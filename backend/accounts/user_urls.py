@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import UserListView, UserDetailView
+from .views import UserListView, UserDetailView, UserImportView
 
 urlpatterns = [
     path('', UserListView.as_view(), name='user_list'),
+    path('import/', UserImportView.as_view(), name='user_import'),
     path('<int:pk>/', UserDetailView.as_view(), name='user_detail'),
 ]
\ No newline at end of file
@@ -1,24 +1,39 @@
+import json
+
+from django.conf import settings
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate, login, logout
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Q
+from rest_framework.pagination import PageNumberPagination
 from .models import User
-from .serializers import UserSerializer
+from .serializers import UserSerializer, UserListSerializer
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.permissions import AllowAny
 from .serializers import CustomTokenObtainPairSerializer
 from rest_framework.permissions import IsAuthenticated
+from backend.routers import ReplicaReadMixin
+from tenancy.scoping import scope_to_site, site_id_for
+from audit import log as audit
+from visitors.idempotency import idempotent
+from .importer import ImportFileError, count_passwords, import_users, parse_rows
+from .throttling import LoginRateThrottle, reset_account
 
 class LoginView(APIView):
+    throttle_classes = [LoginRateThrottle]
+
     def post(self, request):
         email = request.data.get('email')
         password = request.data.get('password')
         
         user = authenticate(request, username=email, password=password)
         if user is not None:
+            reset_account(request)
             login(request, user)
             refresh = RefreshToken.for_user(user)
             return Response({
@@ -48,26 +63,65 @@ class CurrentUserView(APIView):
         serializer = UserSerializer(request.user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-class UserListView(APIView):
+class UserPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+class UserListView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('get',)
     
     def get_permissions(self):
         if self.request.method == 'POST':
             return [permissions.IsAdminUser()]
         return super().get_permissions()
+
+    def get_queryset(self):
+        users = (
+            User.objects
+            .select_related('department')
+            .only('id', 'first_name', 'last_name', 'email', 'role', 'username', 'site_id', 'department__name')
+        )
+        # Site first, so every filter below rides on user_site_idx or user_site_role_idx.
+        users = scope_to_site(users, site_id_for(self.request.user, self.request.query_params))
+
+        role = self.request.query_params.get('role')
+        if role:
+            users = users.filter(role=role)
+
+        department = self.request.query_params.get('department')
+        if department:
+            if not department.isdigit():
+                return users.none()
+            users = users.filter(department_id=department)
+
+        search = self.request.query_params.get('search')
+        if search:
+            users = users.filter(
+                Q(first_name__icontains=search) |
+                Q(last_name__icontains=search) |
+                Q(email__icontains=search)
+            )
+
+        # A stable order, so rows do not move between pages.
+        return users.order_by('id')
     
     def get(self, request):
-        users = User.objects.all()
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+        # One COUNT and one page query, whatever the headcount.
+        paginator = UserPagination()
+        page = paginator.paginate_queryset(self.get_queryset(), request, view=self)
+        serializer = UserListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     def post(self, request):
         if 'username' not in request.data and 'email' in request.data:
             request.data['username'] = request.data['email']
             
-        serializer = UserSerializer(data=request.data)
+        serializer = UserSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             user = serializer.save()
+            audit.record('create', user, request.user, after=audit.snapshot(user))
             return Response(
                 UserSerializer(user).data, 
                 status=status.HTTP_201_CREATED
@@ -77,11 +131,52 @@ class UserListView(APIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-class UserDetailView(APIView):
+class UserImportView(ReplicaReadMixin, APIView):
+    """
+    Create many users at once from an uploaded CSV/JSON ``file``, or a JSON body
+    that is a list of users or ``{"users": [...]}``. ``?dry_run=1`` only validates.
+    """
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    @idempotent
+    def post(self, request):
+        try:
+            upload = request.FILES.get('file')
+            if upload is not None:
+                fmt = 'json' if upload.name.lower().endswith('.json') else None
+                rows = parse_rows(upload.read(), fmt)
+            elif isinstance(request.data, list):
+                rows = parse_rows(json.dumps(request.data), 'json')
+            else:
+                rows = parse_rows(json.dumps(request.data.get('users')), 'json')
+        except ImportFileError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if not rows:
+            return Response({'error': 'No users to import'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.USER_IMPORT_MAX_ROWS:
+            return Response(
+                {'error': f'At most {settings.USER_IMPORT_MAX_ROWS} users per request; use manage.py import_users for more'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        # Hashing runs in this request; dry runs hash nothing.
+        if not dry_run and count_passwords(rows) > settings.USER_IMPORT_MAX_PASSWORDS:
+            return Response(
+                {'error': f'At most {settings.USER_IMPORT_MAX_PASSWORDS} users with a password per request; '
+                          'split the file, leave passwords for an admin to set, or use manage.py import_users'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        report = import_users(rows, actor=request.user, dry_run=dry_run)
+        created = report['created'] and not dry_run
+        return Response(report, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+class UserDetailView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
     
     def get_object(self, pk):
-        return get_object_or_404(User, pk=pk)
+        # Admins of a site only manage its users.
+        return get_object_or_404(scope_to_site(User.objects.all(), site_id_for(self.request.user)), pk=pk)
 
     def get(self, request, pk):
         user = self.get_object(pk)
@@ -97,13 +192,17 @@ class UserDetailView(APIView):
             context={'request': request}
         )
         if serializer.is_valid():
+            before = audit.snapshot(user)
             serializer.save()
+            audit.record('update', user, request.user, before, audit.snapshot(user))
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
         user = self.get_object(pk)
-        user.delete()
+        with transaction.atomic():
+            audit.record('delete', user, request.user, before=audit.snapshot(user))
+            user.delete()
         return Response(
             {'message': 'User deleted successfully'},
             status=status.HTTP_204_NO_CONTENT
@@ -112,10 +211,13 @@ class UserDetailView(APIView):
 class CustomTokenObtainPairView(TokenObtainPairView):
     permission_classes = [AllowAny]
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [LoginRateThrottle]
 
     def post(self, request, *args, **kwargs):
-        print("REQUEST DATA:", request.data)
-        return super().post(request, *args, **kwargs)
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            reset_account(request)
+        return response
 
 class CustomTokenRefreshView(TokenRefreshView):
     def post(self, request, *args, **kwargs):
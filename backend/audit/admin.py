@@ -0,0 +1,48 @@
+from django.contrib import admin
+from django.db import transaction
+
+from backend.paginators import EstimatedCountPaginator
+from . import log as audit
+from .models import AuditEvent
+
+
+class AuditedAdmin(admin.ModelAdmin):
+    """Records admin changes in the audit log, like the API views do."""
+
+    def save_model(self, request, obj, form, change):
+        before = audit.snapshot(type(obj)._default_manager.get(pk=obj.pk)) if change else None
+        super().save_model(request, obj, form, change)
+        audit.record('update' if change else 'create', obj, request.user, before, audit.snapshot(obj))
+
+    # Deletes and their audit events commit together.
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            audit.record('delete', obj, request.user, before=audit.snapshot(obj))
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for obj in queryset:
+                audit.record('delete', obj, request.user, before=audit.snapshot(obj))
+            super().delete_queryset(request, queryset)
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'action', 'entity_type', 'entity_id', 'actor_name']
+    # Both filters and the entity search use audit_entity_time_idx.
+    list_filter = ['entity_type', 'action']
+    search_fields = ['=entity_id']
+    ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 100
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
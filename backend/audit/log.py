@@ -0,0 +1,149 @@
+"""
+Append-only audit log.
+
+Views call ``record()`` after a change. The event is built immediately but only
+buffered once the surrounding transaction commits, so rolled-back changes
+leave no trace. A background thread writes the buffer with ``bulk_create``
+every ``AUDIT_FLUSH_INTERVAL`` seconds, or as soon as ``AUDIT_BATCH_SIZE``
+events are waiting; the request itself never touches the audit table.
+
+Events still buffered when the process exits are written by an ``atexit``
+hook. If the database is unavailable they stay buffered, up to
+``AUDIT_MAX_BUFFER`` events, and the oldest are dropped beyond that.
+With ``AUDIT_BUFFERED = False`` events are written inline instead.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+# Recorded as changed, never with their values.
+REDACTED_FIELDS = {'password'}
+REDACTED = '<redacted>'
+
+
+def snapshot(instance):
+    """Current column values of ``instance``, keyed by attribute name."""
+    return {
+        field.attname: field.value_from_object(instance)
+        for field in instance._meta.concrete_fields
+    }
+
+
+def diff(before, after):
+    """``{field: [old, new]}`` for every field whose value differs."""
+    changes = {}
+    for field in sorted(before.keys() | after.keys()):
+        old, new = before.get(field), after.get(field)
+        if old != new:
+            changes[field] = [REDACTED, REDACTED] if field in REDACTED_FIELDS else [old, new]
+    return changes
+
+
+class AuditBuffer:
+    def __init__(self, batch_size, interval, max_size):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_size = max_size
+        self._events = []
+        self._condition = threading.Condition()
+        # Serialises writers so events are inserted in the order they were recorded.
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def add(self, event):
+        with self._condition:
+            self._events.append(event)
+            if len(self._events) >= self.batch_size:
+                self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-flush', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def pending(self):
+        with self._condition:
+            return len(self._events)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._events) < self.batch_size:
+                    self._condition.wait(timeout=self.interval)
+            self.flush()
+            # Like a request would, so the thread does not hold a stale connection.
+            close_old_connections()
+
+    def flush(self):
+        """Write every buffered event; returns how many were written."""
+        with self._flush_lock:
+            with self._condition:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+            try:
+                for start in range(0, len(events), self.batch_size):
+                    AuditEvent.objects.bulk_create(events[start:start + self.batch_size])
+            except Exception:
+                written = start
+                logger.exception("Could not write %d audit event(s); keeping them buffered", len(events) - written)
+                with self._condition:
+                    self._events[:0] = events[written:]
+                    overflow = len(self._events) - self.max_size
+                    if overflow > 0:
+                        del self._events[:overflow]
+                        logger.error("Audit buffer full; dropped the %d oldest event(s)", overflow)
+                return written
+            return len(events)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = AuditBuffer(
+                    settings.AUDIT_BATCH_SIZE, settings.AUDIT_FLUSH_INTERVAL, settings.AUDIT_MAX_BUFFER
+                )
+    return _buffer
+
+
+def flush():
+    """Write this process's buffered events now, e.g. before reading history."""
+    return get_buffer().flush() if _buffer is not None else 0
+
+
+def record(action, instance, actor=None, before=None, after=None):
+    """
+    Log ``action`` on ``instance`` by ``actor``. ``before`` and ``after`` are
+    ``snapshot()``s; only the fields that differ are stored. Call it before
+    ``instance.delete()``, while the primary key is still set.
+    """
+    authenticated = actor is not None and actor.is_authenticated
+    entity_type = instance._meta.model_name
+    event = AuditEvent(
+        entity_type=entity_type,
+        entity_id=instance.pk,
+        action=action,
+        actor_id=actor.pk if authenticated else None,
+        actor_name=(actor.email or actor.get_username()) if authenticated else '',
+        # A site is its own site; watchlist entries belong to none.
+        site_id=instance.pk if entity_type == 'site' else getattr(instance, 'site_id', None),
+        changes=diff(before or {}, after or {}),
+        created_at=timezone.now(),
+    )
+    if settings.AUDIT_BUFFERED:
+        transaction.on_commit(lambda: get_buffer().add(event))
+    else:
+        transaction.on_commit(event.save)
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 08:26
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(max_length=30)),
+                ('entity_id', models.BigIntegerField()),
+                ('action', models.CharField(max_length=30)),
+                ('actor_id', models.BigIntegerField(blank=True, null=True)),
+                ('actor_name', models.CharField(blank=True, max_length=254)),
+                ('changes', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['entity_type', 'entity_id', '-created_at'], name='audit_entity_time_idx'), models.Index(fields=['created_at'], name='audit_created_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-19 09:42
+
+from django.db import migrations, models
+from django.db.models import F
+
+# Entity types of audit events, and the models holding their site.
+SITE_MODELS = {
+    'visitor': [('visitors', 'Visitor'), ('visitors', 'ArchivedVisitor')],
+    'user': [('accounts', 'User')],
+    'department': [('departments', 'Department')],
+}
+
+
+def copy_sites(apps, schema_editor):
+    AuditEvent = apps.get_model('audit', 'AuditEvent')
+    Site = apps.get_model('tenancy', 'Site')
+    AuditEvent.objects.filter(entity_type='site').update(site_id=F('entity_id'))
+    for site_id in Site.objects.values_list('id', flat=True):
+        for entity_type, models_ in SITE_MODELS.items():
+            for app_label, model in models_:
+                entities = apps.get_model(app_label, model).objects.filter(site_id=site_id)
+                AuditEvent.objects.filter(
+                    site_id__isnull=True, entity_type=entity_type, entity_id__in=entities.values('id')
+                ).update(site_id=site_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0001_initial'),
+        ('accounts', '0009_user_site'),
+        ('departments', '0004_department_site'),
+        ('tenancy', '0001_initial'),
+        ('visitors', '0015_visit_site'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditevent',
+            name='site_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['site_id', '-id'], name='audit_site_idx'),
+        ),
+        migrations.RunPython(copy_sites, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class AuditEvent(models.Model):
+    """
+    One change to a visitor, user or department. Rows are only ever inserted
+    (see ``audit.log``); saving an existing event or deleting one is refused.
+    """
+    # Plain ids rather than foreign keys: events outlive the rows they describe,
+    # and the visitors table may be partitioned (see visitors/partitioning.py).
+    entity_type = models.CharField(max_length=30)
+    entity_id = models.BigIntegerField()
+    action = models.CharField(max_length=30)
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    # Kept so the event still says who it was after the user is deleted.
+    actor_name = models.CharField(max_length=254, blank=True)
+    # Site of the entity; users of a site only see its events.
+    site_id = models.BigIntegerField(null=True, blank=True)
+    changes = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    # When the change happened, not when the buffered event was written.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Per-entity history, newest first.
+            models.Index(fields=['entity_type', 'entity_id', '-created_at'], name='audit_entity_time_idx'),
+            models.Index(fields=['created_at'], name='audit_created_at_idx'),
+            # Audit log of one site, newest first.
+            models.Index(fields=['site_id', '-id'], name='audit_site_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type}:{self.entity_id} {self.action} by {self.actor_name or self.actor_id}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Audit events are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Audit events are append-only")
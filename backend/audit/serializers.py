@@ -0,0 +1,9 @@
+from rest_framework import serializers
+from .models import AuditEvent
+
+
+class AuditEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditEvent
+        fields = ['id', 'entity_type', 'entity_id', 'action', 'actor_id', 'actor_name', 'site_id', 'changes', 'created_at']
+        read_only_fields = fields
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import AuditEventListView
+
+urlpatterns = [
+    path('', AuditEventListView.as_view(), name='audit-events'),
+]
@@ -0,0 +1,61 @@
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from tenancy.scoping import scope_to_site, site_id_for
+from . import log
+from .models import AuditEvent
+from .serializers import AuditEventSerializer
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def get_limit(request):
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def history(entity_type, entity_id, limit=DEFAULT_LIMIT):
+    """Newest-first events for one entity."""
+    # Include whatever this process has not written yet.
+    log.flush()
+    return (
+        AuditEvent.objects
+        .filter(entity_type=entity_type, entity_id=entity_id)
+        .order_by('-created_at', '-id')[:limit]
+    )
+
+
+class AuditEventListView(APIView):
+    """
+    Admin view of the audit log, newest first: of their own site for admins
+    of a site, else of every site or the one picked with ``?site=``. Filter
+    with ``entity_type``, ``entity_id``, ``actor_id`` and ``action``; page back
+    with ``before=<id of the last event seen>``.
+    """
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    def get(self, request):
+        filters = {}
+        for param in ('entity_type', 'entity_id', 'actor_id', 'action', 'before'):
+            value = request.query_params.get(param)
+            if value:
+                filters[param] = value
+        try:
+            for param in ('entity_id', 'actor_id', 'before'):
+                if param in filters:
+                    filters[param] = int(filters[param])
+        except ValueError:
+            return Response({'error': f'{param} must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        before = filters.pop('before', None)
+
+        log.flush()
+        events = scope_to_site(AuditEvent.objects.filter(**filters), site_id_for(request.user, request.query_params))
+        if before:
+            events = events.filter(id__lt=before)
+        events = events.order_by('-id')[:get_limit(request)]
+        return Response(AuditEventSerializer(events, many=True).data)
@@ -0,0 +1,130 @@
+"""
+Async read endpoints for ASGI servers.
+
+Served by ``backend.asgi`` (e.g. ``uvicorn backend.asgi:application``), an
+``AsyncReadView`` waits for the database without holding a worker thread,
+and ``gather_queries()`` runs the independent queries of one request at the
+same time. Django's async ORM (``aget()``, ``async for``) passes every query
+of a request to the same thread, one after another, so concurrent queries run
+instead on a shared pool of ``ASYNC_QUERY_WORKERS`` threads, each keeping its
+own connection within ``CONN_MAX_AGE``. The pool size also bounds the
+connections these queries take, however many requests are waiting.
+
+The views authenticate like the DRF ones (JWT, or the user of a
+``backend.batch`` sub-request), answer errors in the same shape and honour
+read-replica routing. With ``ASYNC_VIEWS`` on, the URLconfs route the read
+paths here and everything else to the DRF views.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .routers import _read_alias, is_pinned_to_primary, replica_alias
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ASYNC_QUERY_WORKERS, thread_name_prefix='async-query'
+                )
+    return _executor
+
+
+def _run_query(query):
+    try:
+        return query()
+    finally:
+        # Like the end of a request: keep a usable connection for the next
+        # query, within CONN_MAX_AGE, and drop a broken one.
+        close_old_connections()
+
+
+async def gather_queries(*queries):
+    """Run the zero-argument ``queries`` concurrently; returns their results in order."""
+    if len(queries) == 1:
+        return [await sync_to_async(queries[0])()]
+    loop = asyncio.get_running_loop()
+    # Each query sees the caller's context, e.g. the replica alias.
+    return await asyncio.gather(*[
+        loop.run_in_executor(get_executor(), copy_context().run, _run_query, query)
+        for query in queries
+    ])
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    """``data`` rendered like a DRF ``Response``, so both kinds of view answer byte for byte alike."""
+    return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+def _authenticate(request):
+    # Set on backend.batch sub-requests, which the batch already authenticated.
+    user = getattr(request, '_force_auth_user', None)
+    if user is not None:
+        return user
+    result = JWTAuthentication().authenticate(request)
+    return result[0] if result else None
+
+
+class AsyncReadView(View):
+    """
+    Read-only async view for authenticated users. Other methods go to
+    ``write_view``, the DRF view that serves them at the same path.
+    """
+    http_method_names = ['get', 'head', 'options']
+    write_view = None
+    # Send reads to the replica, like ReplicaReadMixin.replica_actions.
+    use_replica = False
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # JWT requests carry no session cookie, as with DRF's views.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in READ_METHODS and self.write_view is not None:
+            return await sync_to_async(self.write_view)(request, *args, **kwargs)
+        try:
+            user = await sync_to_async(_authenticate)(request)
+        except AuthenticationFailed as exc:
+            return self.unauthorized(request, exc.detail)
+        if user is None:
+            return self.unauthorized(request, 'Authentication credentials were not provided.')
+        request.user = user
+
+        token = None
+        alias = replica_alias()
+        if self.use_replica and alias and not await sync_to_async(is_pinned_to_primary)(user):
+            token = _read_alias.set(alias)
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        finally:
+            if token is not None:
+                _read_alias.reset(token)
+
+    def unauthorized(self, request, detail):
+        response = json_response(
+            detail if isinstance(detail, dict) else {'detail': detail}, status.HTTP_401_UNAUTHORIZED
+        )
+        response['WWW-Authenticate'] = JWTAuthentication().authenticate_header(request)
+        return response
@@ -0,0 +1,185 @@
+"""
+``POST /api/batch/``: several API calls in one round trip.
+
+The body lists sub-requests to the existing ``/api/`` routes::
+
+    {"requests": [{"id": "visitors", "method": "GET", "path": "/api/visitors/?status=checked-in"},
+                  {"method": "POST", "path": "/api/visitors/1/check_out/", "body": {...}}],
+     "parallel": true}
+
+Each one is resolved and handed to its view in this process. Middleware,
+CORS and JWT decoding have already run for the batch, so sub-requests skip
+them and are authenticated as the batch's user. Views still check their own
+permissions.
+
+Sub-requests run in order. With ``"parallel": true``, consecutive reads run
+concurrently on up to ``BATCH_MAX_WORKERS`` threads, while a write waits for
+the reads before it and holds back the ones after it. A failing sub-request
+gets its own error status and does not stop the others.
+"""
+import asyncio
+import io
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+METHODS = (*READ_METHODS, 'POST', 'PUT', 'PATCH', 'DELETE')
+PREFIX = '/api/'
+# Request headers a sub-request does not inherit from the batch.
+BODY_META = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_IDEMPOTENCY_KEY', 'HTTP_IF_NONE_MATCH')
+# Response headers that say nothing about an individual sub-request.
+SKIPPED_HEADERS = {'Content-Type', 'Content-Length', 'Allow', 'Vary', 'X-Frame-Options'}
+
+
+class InvalidSubRequest(ValueError):
+    pass
+
+
+def build_request(request, spec):
+    """A ``WSGIRequest`` for ``spec``, carrying the batch's client and user."""
+    if not isinstance(spec, dict):
+        raise InvalidSubRequest("Each request must be an object")
+    method = str(spec.get('method', 'GET')).upper()
+    if method not in METHODS:
+        raise InvalidSubRequest(f"Unsupported method {method!r}")
+    url = urlsplit(str(spec.get('path', '')))
+    if not url.path.startswith(PREFIX) or url.path.rstrip('/') == request.path.rstrip('/'):
+        raise InvalidSubRequest(f"'path' must be an API route under {PREFIX}, other than the batch itself")
+    body = b''
+    if spec.get('body') is not None:
+        body = json.dumps(spec['body']).encode()
+
+    environ = {key: value for key, value in request.META.items() if key not in BODY_META}
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+    })
+    environ.setdefault('wsgi.url_scheme', request.scheme)
+    for name, value in (spec.get('headers') or {}).items():
+        environ['HTTP_' + str(name).upper().replace('-', '_')] = str(value)
+    sub_request = WSGIRequest(environ)
+    # Picked up by DRF instead of authenticating the request again.
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def render(spec_id, response):
+    result = {'id': spec_id, 'status': response.status_code}
+    headers = {name: value for name, value in response.items() if name not in SKIPPED_HEADERS}
+    if headers:
+        result['headers'] = headers
+    if isinstance(response, Response):
+        result['body'] = response.data
+    else:
+        content = getattr(response, 'content', b'')
+        if response.get('Content-Type', '').startswith('application/json'):
+            result['body'] = json.loads(content or b'null')
+        else:
+            result['body'] = content.decode(response.charset or 'utf-8', errors='replace')
+    return result
+
+
+async def wait_for(coroutine):
+    return await coroutine
+
+
+def dispatch(request, spec):
+    """Run one sub-request; returns its ``{id, status, headers, body}``."""
+    spec_id = spec.get('id') if isinstance(spec, dict) else None
+    try:
+        sub_request = build_request(request, spec)
+        match = resolve(sub_request.path_info)
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if asyncio.iscoroutine(response):
+            # An async view (see backend.async_views), with ASYNC_VIEWS on.
+            response = async_to_sync(wait_for)(response)
+    except InvalidSubRequest as exc:
+        return {'id': spec_id, 'status': status.HTTP_400_BAD_REQUEST, 'body': {'error': str(exc)}}
+    except (Resolver404, Http404):
+        return {'id': spec_id, 'status': status.HTTP_404_NOT_FOUND, 'body': {'error': 'Not found'}}
+    except PermissionDenied:
+        return {'id': spec_id, 'status': status.HTTP_403_FORBIDDEN, 'body': {'error': 'Permission denied'}}
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", spec.get('method', 'GET'), spec.get('path'))
+        return {'id': spec_id, 'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'error': 'Server error'}}
+    return render(spec_id, response)
+
+
+def _dispatch_in_thread(request, spec):
+    try:
+        return dispatch(request, spec)
+    finally:
+        # Like the end of a request: the thread keeps a usable connection for
+        # the next batch, within CONN_MAX_AGE, and drops a broken one.
+        close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # Shared by all batches, so threads and their connections are reused.
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS, thread_name_prefix='batch')
+    return _executor
+
+
+def is_read(spec):
+    return isinstance(spec, dict) and str(spec.get('method', 'GET')).upper() in READ_METHODS
+
+
+def run_batch(request, specs, parallel=False):
+    if not parallel or settings.BATCH_MAX_WORKERS <= 1:
+        return [dispatch(request, spec) for spec in specs]
+    results, reads = [], []
+    for spec in specs:
+        if is_read(spec):
+            reads.append(get_executor().submit(_dispatch_in_thread, request, spec))
+            continue
+        results.extend(future.result() for future in reads)
+        reads = []
+        results.append(dispatch(request, spec))
+    results.extend(future.result() for future in reads)
+    return results
+
+
+class BatchView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        specs = request.data.get('requests') if hasattr(request.data, 'get') else None
+        if not isinstance(specs, list) or not specs:
+            return Response({'error': "'requests' must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(specs) > settings.BATCH_MAX_REQUESTS:
+            return Response(
+                {'error': f'At most {settings.BATCH_MAX_REQUESTS} requests per batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        parallel = request.data.get('parallel') is True
+        return Response({'responses': run_batch(request, specs, parallel)})
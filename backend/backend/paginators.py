@@ -0,0 +1,46 @@
+"""
+Admin pagination for tables too large to ``COUNT(*)`` on every page view.
+
+``EstimatedCountPaginator`` counts at most ``ADMIN_COUNT_LIMIT`` rows. When a
+list holds more than that, an unfiltered list takes PostgreSQL's row estimate
+from ``pg_class`` (summed over partitions, if the table is partitioned), and
+a filtered one reports the limit. The later pages stay reachable through the
+filters and the date hierarchy.
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+ESTIMATE_SQL = """
+    SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint
+    FROM pg_class c
+    WHERE c.oid = %s::regclass
+       OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+"""
+
+
+def estimated_rows(model, using):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(ESTIMATE_SQL, [table, table])
+        return cursor.fetchone()[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_COUNT_LIMIT
+        queryset = self.object_list
+        # COUNT over a LIMITed subquery stops reading after limit + 1 rows.
+        count = queryset.order_by()[:limit + 1].count()
+        if count <= limit:
+            return count
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate:
+                return max(estimate, count)
+        return limit
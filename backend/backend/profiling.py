@@ -0,0 +1,259 @@
+"""
+On-demand request profiling.
+
+With ``PROFILING_ENABLED`` on, ``ProfilingMiddleware`` runs a request under a
+profiler when an admin asks for it with the ``X-Profile`` header or the
+``_profile`` query parameter, and runs ``PROFILING_SAMPLE_PERCENT`` percent of
+all requests under one regardless of who sent them. The value picks the
+profiler, ``sample`` (the default) or ``cprofile``:
+
+- ``sample`` reads the request thread's stack every ``PROFILING_INTERVAL``
+  seconds from another thread and writes ``<id>.collapsed``, one
+  ``frame;frame;frame count`` line per stack, the input of flamegraph.pl or
+  speedscope, and ``<id>.txt``, the functions seen most often.
+- ``cprofile`` traces every call, slower but exact, and writes ``<id>.prof``
+  for pstats or snakeviz and ``<id>.txt``, the pstats summary.
+
+Captures go to ``PROFILING_DIR``, each listed by a line of ``index.ndjson``,
+and the response names its capture in the ``X-Profile-Capture`` header. Only
+the latest ``PROFILING_MAX_CAPTURES`` are kept, and sampled captures record
+the path without its query string, which may carry personal data. With
+``PROFILING_ENABLED`` off the middleware removes itself at startup.
+
+The profiled stack is that of the thread running the middleware: under ASGI,
+an async view (see ``backend.async_views``) only shows up to where it awaits,
+so profile those with ``ASYNC_VIEWS`` off.
+"""
+import cProfile
+import fcntl
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAM = '_profile'
+CAPTURE_HEADER = 'X-Profile-Capture'
+INDEX_FILE = 'index.ndjson'
+LOCK_FILE = 'index.lock'
+
+MODE_SAMPLE = 'sample'
+MODE_CPROFILE = 'cprofile'
+MODES = (MODE_SAMPLE, MODE_CPROFILE)
+
+# Functions listed in a capture's .txt summary.
+TOP_FUNCTIONS = 40
+
+# Only one cProfile profiler can be active per process; a concurrent request
+# asking for one is sampled instead.
+_cprofile_lock = threading.Lock()
+
+
+def _is_admin(user):
+    # The same test as DRF's IsAdminUser.
+    return user is not None and user.is_authenticated and user.is_staff
+
+
+def _request_user(request):
+    # Django admin pages have a session user; API requests carry a JWT,
+    # which DRF would only check inside the view.
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+class Sampler(threading.Thread):
+    """Counts the stacks of thread ``thread_id`` below frames of ``stop_code``, every ``interval`` seconds."""
+
+    def __init__(self, thread_id, stop_code, interval):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.stop_code = stop_code
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+        self._labels = {}
+        # Longest first, so files are named relative to the closest sys.path entry.
+        self._prefixes = sorted({os.path.join(os.path.abspath(p), '') for p in sys.path if p}, key=len, reverse=True)
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame.f_code is not self.stop_code:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            for prefix in self._prefixes:
+                if filename.startswith(prefix):
+                    filename = filename[len(prefix):]
+                    break
+            # ';' separates frames in the collapsed format.
+            label = f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+            self._labels[code] = label
+        return label
+
+    def collapsed(self):
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def summary(self):
+        total = sum(self.stacks.values())
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+        lines = [f'{total} samples every {self.interval * 1000:g} ms', '']
+        for title, counts in (('Own samples', own), ('Inclusive samples', inclusive)):
+            lines += [title, '']
+            for label, count in counts.most_common(TOP_FUNCTIONS):
+                lines.append(f'{count:8d} {count / total:7.1%}  {label}')
+            lines.append('')
+        return '\n'.join(lines)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode, trigger = self.requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        return self.capture(request, mode, trigger)
+
+    def requested_mode(self, request):
+        value = request.META.get(HEADER)
+        if value is None:
+            value = request.GET.get(QUERY_PARAM)
+        if value is not None:
+            value = value.strip().lower()
+            mode = value if value in MODES else settings.PROFILING_MODE
+            if _is_admin(_request_user(request)):
+                return mode, 'request'
+        percent = settings.PROFILING_SAMPLE_PERCENT
+        if percent > 0 and random.random() * 100 < percent:
+            return settings.PROFILING_MODE, 'sampled'
+        return None, None
+
+    def capture(self, request, mode, trigger):
+        if mode == MODE_CPROFILE and not _cprofile_lock.acquire(blocking=False):
+            mode = MODE_SAMPLE
+        started_at = timezone.now()
+        started = time.perf_counter()
+        if mode == MODE_CPROFILE:
+            profiler = cProfile.Profile()
+            try:
+                response = profiler.runcall(self.get_response, request)
+            finally:
+                _cprofile_lock.release()
+        else:
+            profiler = Sampler(threading.get_ident(), sys._getframe().f_code, settings.PROFILING_INTERVAL)
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+        duration = time.perf_counter() - started
+
+        capture_id = '{:%Y%m%dT%H%M%S}-{}-{}-{}'.format(
+            started_at, request.method.lower(),
+            re.sub(r'[^a-z0-9]+', '-', request.path.lower()).strip('-')[:60] or 'root',
+            uuid.uuid4().hex[:8],
+        )
+        try:
+            files = write_capture(capture_id, mode, profiler)
+            add_to_index({
+                'id': capture_id,
+                'at': started_at.isoformat(),
+                'method': request.method,
+                'path': request.get_full_path() if trigger == 'request' else request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 1),
+                'mode': mode,
+                'trigger': trigger,
+                'files': files,
+            })
+        except OSError:
+            # The request itself went fine; losing its profile must not fail it.
+            logger.exception('Could not save profile %s', capture_id)
+        else:
+            response[CAPTURE_HEADER] = capture_id
+        return response
+
+
+def write_capture(capture_id, mode, profiler):
+    """Write the profiler's output under ``PROFILING_DIR``; returns the file names."""
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    if mode == MODE_CPROFILE:
+        profiler.dump_stats(os.path.join(directory, f'{capture_id}.prof'))
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        outputs = {'prof': None, 'txt': text.getvalue()}
+    else:
+        outputs = {'collapsed': profiler.collapsed(), 'txt': profiler.summary()}
+    for extension, content in outputs.items():
+        if content is not None:
+            with open(os.path.join(directory, f'{capture_id}.{extension}'), 'w', encoding='utf-8') as fh:
+                fh.write(content)
+    return [f'{capture_id}.{extension}' for extension in outputs]
+
+
+def add_to_index(entry):
+    """List a capture in the index, deleting the oldest beyond ``PROFILING_MAX_CAPTURES``."""
+    directory = settings.PROFILING_DIR
+    path = os.path.join(directory, INDEX_FILE)
+    # Workers of every process rewrite the index in turn; closing the lock
+    # file releases the lock.
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path, encoding='utf-8') as fh:
+                lines = [line for line in fh if line.strip()]
+        except FileNotFoundError:
+            lines = []
+        lines.append(json.dumps(entry) + '\n')
+        keep = max(settings.PROFILING_MAX_CAPTURES, 1)
+        for line in lines[:-keep]:
+            for name in json.loads(line).get('files', []):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
+        with open(path + '.tmp', 'w', encoding='utf-8') as fh:
+            fh.writelines(lines[-keep:])
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,78 @@
+"""
+Read-replica routing.
+
+Views opt in with ``ReplicaReadMixin``: while one of their ``replica_actions``
+is running, ORM reads go to ``settings.REPLICA_DATABASE_ALIAS``. Everything
+else, and every write, uses ``default``. After a successful write, the user is
+pinned to the primary for ``REPLICA_PIN_SECONDS`` so they always read their
+own writes even if the replica lags behind.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+    return alias if alias in settings.DATABASES else None
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    if user and user.is_authenticated:
+        cache.set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user):
+    return bool(user and user.is_authenticated and cache.get(_pin_key(user.pk)))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Returning the alias explicitly stops Django from writing an instance
+        # back to the replica it was read from.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary.
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    Send the reads of the listed actions to the replica. ViewSets list action
+    names, plain APIViews list lower-case HTTP methods.
+    """
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication has run once super().initial() returns.
+        super().initial(request, *args, **kwargs)
+        action = getattr(self, 'action', None) or request.method.lower()
+        alias = replica_alias()
+        if (
+            alias
+            and action in self.replica_actions
+            and request.method in ('GET', 'HEAD', 'OPTIONS')
+            and not is_pinned_to_primary(request.user)
+        ):
+            self._replica_token = _read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._replica_token = None
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            pin_to_primary(getattr(request, 'user', None))
+        return super().finalize_response(request, response, *args, **kwargs)
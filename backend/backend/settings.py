@@ -2,6 +2,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 import dj_database_url
+from corsheaders.defaults import default_headers
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -28,6 +29,10 @@ INSTALLED_APPS = [
     'accounts',
     'visitors',
     'departments',
+    'tasks',
+    'audit',
+    'watchlist',
+    'tenancy',
 ]
 
 MIDDLEWARE = [
@@ -40,6 +45,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Removes itself unless PROFILING_ENABLED is on.
+    'backend.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -68,6 +75,48 @@ DATABASES = {
     'default': dj_database_url.config(default=f"postgres://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}", conn_max_age=600)
 }
 
+# Optional read replica for the heavy list and stats reads (see backend/routers.py).
+# Locally, two SQLite files work: migrate both, or copy the primary file.
+REPLICA_DATABASE_ALIAS = 'replica'
+if os.getenv('REPLICA_DATABASE_URL'):
+    DATABASES[REPLICA_DATABASE_ALIAS] = dj_database_url.parse(os.getenv('REPLICA_DATABASE_URL'), conn_max_age=600)
+    DATABASES[REPLICA_DATABASE_ALIAS]['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['backend.routers.ReplicaRouter']
+
+# Optional psycopg connection pool for PostgreSQL. Each worker process keeps
+# one pool per database instead of one persistent connection per thread, so
+# bursts share a bounded number of server connections.
+if os.getenv('DB_POOL', 'False') == 'True':
+    for database in DATABASES.values():
+        if database.get('ENGINE') != 'django.db.backends.postgresql':
+            continue
+        # Pooled connections go back to the pool at the end of each request.
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            # Seconds a request waits for a free connection before failing.
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+        }
+        # Health check on checkout (psycopg_pool's check_connection) drops
+        # connections the server has closed.
+        database['CONN_HEALTH_CHECKS'] = os.getenv('DB_POOL_CHECK', 'True') == 'True'
+
+# After a write, a user reads from the primary for this many seconds.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '15'))
+
+# Replica pinning relies on the cache; with several worker processes point this
+# at a shared backend (e.g. file-based or memcached) so every worker sees it.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -87,6 +136,147 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Covering (INCLUDE) index columns are PostgreSQL-only; SQLite, used for local
+# runs and tests, simply builds those indexes without them.
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
+# Visit retention: visits older than this many days are moved out of the
+# visitors table by `manage.py archive_visitors`.
+VISITOR_RETENTION_DAYS = int(os.getenv('VISITOR_RETENTION_DAYS', '730'))
+VISITOR_ARCHIVE_BATCH_SIZE = int(os.getenv('VISITOR_ARCHIVE_BATCH_SIZE', '1000'))
+VISITOR_ARCHIVE_DIR = os.getenv('VISITOR_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+
+# Nightly report snapshots (see visitors/reports.py, `manage.py snapshot_reports`).
+REPORT_SNAPSHOT_DIR = os.getenv('REPORT_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'reports'))
+
+# Monthly partitions of the visitors table (PostgreSQL only, see
+# `manage.py partition_visitors`) are created this many months ahead.
+VISITOR_PARTITION_MONTHS_AHEAD = int(os.getenv('VISITOR_PARTITION_MONTHS_AHEAD', '3'))
+
+# Background tasks (see tasks/queue.py): 'thread', 'database' (durable, run by
+# `manage.py run_task_worker`) or 'immediate'.
+TASKS_BACKEND = os.getenv('TASKS_BACKEND', 'thread')
+TASKS_THREADS = int(os.getenv('TASKS_THREADS', '4'))
+TASKS_MAX_ATTEMPTS = int(os.getenv('TASKS_MAX_ATTEMPTS', '5'))
+# Retry n waits TASKS_RETRY_BACKOFF * 2**(n-1) seconds, at most TASKS_RETRY_MAX_DELAY.
+TASKS_RETRY_BACKOFF = float(os.getenv('TASKS_RETRY_BACKOFF', '2'))
+TASKS_RETRY_MAX_DELAY = float(os.getenv('TASKS_RETRY_MAX_DELAY', '300'))
+# Running database tasks older than this are assumed orphaned and re-queued.
+TASKS_STALE_AFTER = int(os.getenv('TASKS_STALE_AFTER', '600'))
+
+# Host arrival notifications (see visitors/notifications.py). Arrivals for the
+# same host within the window are sent as one message. They are on by default
+# only once EMAIL_HOST or a webhook is configured: the console email backend
+# would otherwise print every visitor's details to the logs.
+HOST_NOTIFICATION_WEBHOOK_URL = os.getenv('HOST_NOTIFICATION_WEBHOOK_URL', '')
+_notification_sinks = []
+if os.getenv('EMAIL_HOST'):
+    _notification_sinks.append('visitors.notifications.EmailSink')
+if HOST_NOTIFICATION_WEBHOOK_URL:
+    _notification_sinks.append('visitors.notifications.WebhookSink')
+HOST_NOTIFICATION_SINKS = [
+    sink for sink in os.getenv('HOST_NOTIFICATION_SINKS', ','.join(_notification_sinks)).split(',') if sink
+]
+HOST_NOTIFICATIONS_ENABLED = os.getenv('HOST_NOTIFICATIONS_ENABLED', str(bool(_notification_sinks))) == 'True'
+HOST_NOTIFICATION_WINDOW = float(os.getenv('HOST_NOTIFICATION_WINDOW', '30'))
+HOST_NOTIFICATION_TIMEOUT = float(os.getenv('HOST_NOTIFICATION_TIMEOUT', '5'))
+
+# Outgoing email; without EMAIL_HOST messages are printed to the console.
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND',
+    'django.core.mail.backends.smtp.EmailBackend' if os.getenv('EMAIL_HOST') else 'django.core.mail.backends.console.EmailBackend',
+)
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False') == 'True'
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'no-reply@localhost')
+
+# Audit log (see audit/log.py): events are buffered in-process and written in
+# batches of AUDIT_BATCH_SIZE at least every AUDIT_FLUSH_INTERVAL seconds.
+AUDIT_BUFFERED = os.getenv('AUDIT_BUFFERED', 'True') == 'True'
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '1'))
+AUDIT_MAX_BUFFER = int(os.getenv('AUDIT_MAX_BUFFER', '100000'))
+
+# Bulk user import (see accounts/importer.py). `manage.py import_users` hashes
+# passwords across USER_IMPORT_WORKERS processes; 1 hashes them in the calling
+# process. The API hashes in the request, at roughly 0.4 s per password, so
+# one request takes at most USER_IMPORT_MAX_PASSWORDS users with a password
+# (dry runs excepted) and USER_IMPORT_MAX_ROWS users in all.
+USER_IMPORT_WORKERS = int(os.getenv('USER_IMPORT_WORKERS', str(os.cpu_count() or 1)))
+USER_IMPORT_BATCH_SIZE = int(os.getenv('USER_IMPORT_BATCH_SIZE', '500'))
+USER_IMPORT_MAX_ROWS = int(os.getenv('USER_IMPORT_MAX_ROWS', '1000'))
+USER_IMPORT_MAX_PASSWORDS = int(os.getenv('USER_IMPORT_MAX_PASSWORDS', '40'))
+
+# Login throttling (see accounts/throttling.py): token buckets per client IP
+# and per email. LOGIN_THROTTLE_SHARED also keeps them in the default cache so
+# all workers share the limits.
+LOGIN_THROTTLE_ENABLED = os.getenv('LOGIN_THROTTLE_ENABLED', 'True') == 'True'
+LOGIN_THROTTLE_SHARED = os.getenv('LOGIN_THROTTLE_SHARED', 'False') == 'True'
+LOGIN_THROTTLE_IP_BURST = int(os.getenv('LOGIN_THROTTLE_IP_BURST', '20'))
+LOGIN_THROTTLE_IP_PER_MINUTE = float(os.getenv('LOGIN_THROTTLE_IP_PER_MINUTE', '10'))
+LOGIN_THROTTLE_ACCOUNT_BURST = int(os.getenv('LOGIN_THROTTLE_ACCOUNT_BURST', '5'))
+LOGIN_THROTTLE_ACCOUNT_PER_MINUTE = float(os.getenv('LOGIN_THROTTLE_ACCOUNT_PER_MINUTE', '1'))
+
+# Seconds a worker may serve its cached department list (see
+# departments/cache.py) without seeing another worker's changes.
+DEPARTMENT_CACHE_TTL = float(os.getenv('DEPARTMENT_CACHE_TTL', '30'))
+
+# Seconds after checking in before a badge scan checks the visitor out, so a
+# badge scanned twice in a row at the desk does not end the visit.
+BADGE_MIN_STAY = int(os.getenv('BADGE_MIN_STAY', '60'))
+
+# Offline kiosk sync (see visitors/sync.py): operations per request, and per
+# transaction.
+SYNC_MAX_OPERATIONS = int(os.getenv('SYNC_MAX_OPERATIONS', '2000'))
+SYNC_CHUNK_SIZE = int(os.getenv('SYNC_CHUNK_SIZE', '250'))
+
+# POST /api/batch/ (see backend/batch.py): sub-requests per batch, and threads
+# for the reads of a parallel batch.
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '20'))
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', '4'))
+
+# Watchlist screening (see watchlist/screening.py): names within
+# WATCHLIST_MAX_EDITS typos match once they are WATCHLIST_FUZZY_MIN_LENGTH
+# characters long. Indexes are rebuilt on change, and at least every
+# WATCHLIST_RELOAD_INTERVAL seconds.
+WATCHLIST_ENABLED = os.getenv('WATCHLIST_ENABLED', 'True') == 'True'
+WATCHLIST_MAX_EDITS = int(os.getenv('WATCHLIST_MAX_EDITS', '1'))
+WATCHLIST_FUZZY_MIN_LENGTH = int(os.getenv('WATCHLIST_FUZZY_MIN_LENGTH', '5'))
+WATCHLIST_RELOAD_INTERVAL = float(os.getenv('WATCHLIST_RELOAD_INTERVAL', '300'))
+
+# Largest list the admin counts exactly (see backend/paginators.py); bigger
+# ones show an estimate.
+ADMIN_COUNT_LIMIT = int(os.getenv('ADMIN_COUNT_LIMIT', '10000'))
+
+# Async read views (see backend/async_views.py) for the visitor list, the
+# dashboard stats and the department list. Turn on when serving backend.asgi,
+# e.g. `uvicorn backend.asgi:application`, preferably with DB_POOL=True: under
+# ASGI, connections opened per request are not reused. Threads running the
+# concurrent queries of those views, each with its own database connection.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+ASYNC_QUERY_WORKERS = int(os.getenv('ASYNC_QUERY_WORKERS', '8'))
+
+# Request profiling (see backend/profiling.py): admins ask for a profile with
+# the X-Profile header or ?_profile=, and PROFILING_SAMPLE_PERCENT percent of
+# all requests are profiled anyway. 'sample' reads the stack every
+# PROFILING_INTERVAL seconds; 'cprofile' traces every call. Only the latest
+# PROFILING_MAX_CAPTURES captures are kept.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'sample')
+PROFILING_SAMPLE_PERCENT = float(os.getenv('PROFILING_SAMPLE_PERCENT', '0'))
+PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', '0.005'))
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILING_MAX_CAPTURES = int(os.getenv('PROFILING_MAX_CAPTURES', '200'))
+
+# Seconds a response stored for an Idempotency-Key header is replayed for.
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', str(24 * 60 * 60)))
+# Seconds before a request that never finished, e.g. its worker was killed,
+# stops holding its key; keep it above the server's worker timeout.
+IDEMPOTENCY_CLAIM_TIMEOUT = int(os.getenv('IDEMPOTENCY_CLAIM_TIMEOUT', '120'))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -94,6 +284,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Reverse proxies in front of the app. Throttles (see
+    # accounts/throttling.py) key clients on the address this many hops back
+    # in X-Forwarded-For; with 0 the header, which clients can forge, is
+    # ignored for REMOTE_ADDR.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
 }
 
 AUTHENTICATION_BACKENDS = [
@@ -120,6 +315,8 @@ SIMPLE_JWT = {
 # CORS configuration
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'x-profile')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'X-Profile-Capture']
 
 CSRF_TRUSTED_ORIGINS = [
     "https://nasrdavms.netlify.app"
@@ -1,10 +1,17 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .batch import BatchView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('accounts.urls')),  # All auth routes moved to accounts/urls.py
     path('api/users/', include('accounts.user_urls')),  # User management
+    path('api/sites/', include('tenancy.urls')),
     path('api/departments/', include('departments.urls')),
     path('api/visitors/', include('visitors.urls')),
+    path('api/tasks/', include('tasks.urls')),
+    path('api/audit/', include('audit.urls')),
+    path('api/watchlist/', include('watchlist.urls')),
+    path('api/batch/', BatchView.as_view(), name='batch'),
 ]
\ No newline at end of file
@@ -1,3 +1,28 @@
 from django.contrib import admin
+from django.db import transaction
 
-# Register your models here.
+from audit.admin import AuditedAdmin
+from .cache import invalidate
+from .models import Department
+
+
+@admin.register(Department)
+class DepartmentAdmin(AuditedAdmin):
+    list_display = ['name', 'site', 'visitor_count', 'on_site_count', 'max_occupancy', 'updated_at']
+    list_select_related = ['site']
+    list_filter = ['site']
+    search_fields = ['name']
+    # Maintained by departments.counters; fix drift with reconcile_department_counters.
+    readonly_fields = ['visitor_count', 'on_site_count', 'created_at', 'updated_at']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        transaction.on_commit(invalidate)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        transaction.on_commit(invalidate)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        transaction.on_commit(invalidate)
@@ -0,0 +1,19 @@
+"""Async version of the department list (see ``backend.async_views``)."""
+from asgiref.sync import sync_to_async
+
+from backend.async_views import AsyncReadView, json_response
+from tenancy.scoping import site_id_for
+from .cache import for_site, get_department_list
+from .models import Department
+from .serializers import DepartmentSerializer
+
+
+def build_list():
+    return DepartmentSerializer(Department.objects.all(), many=True).data
+
+
+class DepartmentListView(AsyncReadView):
+    async def get(self, request):
+        # Usually served from the per-process copy; the version check is one cache read.
+        departments = await sync_to_async(get_department_list)(build_list)
+        return json_response(for_site(departments, site_id_for(request.user, request.GET)))
@@ -0,0 +1,63 @@
+"""
+Per-process cache of the department list.
+
+The list is kept together with the version it was built for. The version
+itself lives in the default cache, and ``invalidate()`` bumps it whenever a
+department or its counters change, so one cache read per request tells
+whether the copy is still current. Copies also expire after
+``DEPARTMENT_CACHE_TTL`` seconds, which bounds staleness when the default
+cache is not shared between worker processes. One list holds every site;
+``for_site()`` narrows it per request.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'departments:version'
+
+_entry = None
+_lock = threading.Lock()
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Random start, so a version key lost from the cache never matches an old copy.
+        cache.add(VERSION_KEY, random.randint(1, 2 ** 31), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    global _entry
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        current_version()
+    _entry = None
+
+
+def get_department_list(build):
+    """The cached department list, rebuilt with ``build()`` when it is out of date."""
+    global _entry
+    version = current_version()
+    entry = _entry
+    if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+        return entry[2]
+    with _lock:
+        entry = _entry
+        if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+            return entry[2]
+        data = build()
+        _entry = (version, time.monotonic() + settings.DEPARTMENT_CACHE_TTL, data)
+        return data
+
+
+def for_site(departments, site_id):
+    """The departments of a cached list that belong to ``site_id``; all of them for None."""
+    if site_id is None:
+        return departments
+    return [department for department in departments if department['site_id'] == site_id]
@@ -0,0 +1,140 @@
+"""
+Per-department visitor counters.
+
+``Department.visitor_count`` and ``Department.on_site_count`` replace a
+``COUNT`` over the visitors table on every department listing. Whatever
+creates, changes, deletes, archives or restores visits updates them in the
+same transaction through ``visits_changed()``. ``manage.py
+reconcile_department_counters`` recomputes them, should they ever drift.
+
+``on_site_count`` also enforces ``Department.max_occupancy``: check-ins take
+their place with a conditional ``UPDATE`` instead of counting the visitors
+on site. Counters that drifted too low are clamped at zero rather than
+failing the visit write that would take them below it.
+"""
+import logging
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Q
+from django.db.models.functions import Greatest
+
+from .cache import invalidate
+from .models import Department
+
+logger = logging.getLogger(__name__)
+
+ON_SITE = 'checked-in'
+
+
+def visit_state(visit):
+    """What the counters care about in a visit (a model instance or a values() row)."""
+    if isinstance(visit, dict):
+        return visit['department_id'], visit['status']
+    return visit.department_id, visit.status
+
+
+class DepartmentFull(Exception):
+    """A check-in would take a department past its ``max_occupancy``."""
+
+    def __init__(self, department_id, name, max_occupancy):
+        super().__init__(f"{name} is at its maximum occupancy of {max_occupancy}")
+        self.department_id = department_id
+        self.name = name
+        self.max_occupancy = max_occupancy
+
+
+def visits_changed(before=(), after=(), check_capacity=False):
+    """
+    Apply the difference between two collections of ``visit_state()``s: pass
+    the old states of changed or deleted visits as ``before`` and the new
+    states of created or changed visits as ``after``.
+
+    With ``check_capacity``, a department whose on-site count would exceed
+    its ``max_occupancy`` is left unchanged and ``DepartmentFull`` is raised;
+    the caller's transaction should then roll back its visit writes.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for states, sign in ((before, -1), (after, 1)):
+        for (department_id, status), count in Counter(states).items():
+            if department_id is not None:
+                deltas[department_id][0] += sign * count
+                deltas[department_id][1] += sign * count if status == ON_SITE else 0
+    changed = False
+    for department_id, (visitors, on_site) in deltas.items():
+        if not visitors and not on_site:
+            continue
+        departments = Department.objects.filter(pk=department_id)
+        if check_capacity and on_site > 0:
+            # The limit is checked by the same UPDATE that takes the places,
+            # so concurrent check-ins cannot both get the last one.
+            departments = departments.filter(
+                Q(max_occupancy__isnull=True) | Q(max_occupancy__gte=F('on_site_count') + on_site)
+            )
+        # Decrements only apply in full when the counters can take them.
+        enough = Q()
+        if visitors < 0:
+            enough &= Q(visitor_count__gte=-visitors)
+        if on_site < 0:
+            enough &= Q(on_site_count__gte=-on_site)
+        updated = departments.filter(enough).update(
+            visitor_count=F('visitor_count') + visitors,
+            on_site_count=F('on_site_count') + on_site,
+        )
+        if not updated and (visitors < 0 or on_site < 0):
+            # A drifted counter must not block a check-out or a delete.
+            updated = departments.update(
+                visitor_count=_clamped('visitor_count', visitors),
+                on_site_count=_clamped('on_site_count', on_site),
+            )
+            if updated:
+                logger.warning(
+                    "Counters of department %s drifted below zero and were clamped; "
+                    "run manage.py reconcile_department_counters", department_id,
+                )
+        if not updated and check_capacity and on_site > 0:
+            full = Department.objects.filter(pk=department_id).values_list('name', 'max_occupancy').first()
+            if full is not None:
+                raise DepartmentFull(department_id, *full)
+        changed = True
+    if changed:
+        transaction.on_commit(invalidate)
+
+
+def _clamped(field, delta):
+    if delta >= 0:
+        return F(field) + delta
+    return Greatest(F(field) + delta, 0, output_field=IntegerField())
+
+
+def visit_changed(before=None, after=None, check_capacity=False):
+    """``visits_changed()`` for a single visit; ``None`` for a side that does not exist."""
+    visits_changed([before] if before else (), [after] if after else (), check_capacity)
+
+
+def reconcile():
+    """Recompute every department's counters from the visitors table; returns the departments fixed."""
+    with transaction.atomic():
+        # Counter updates of concurrent visit writes wait for these locks, so
+        # they land after the recount instead of being overwritten by it.
+        stored = {
+            pk: (visitors, on_site)
+            for pk, visitors, on_site in Department.objects.select_for_update()
+            .values_list('id', 'visitor_count', 'on_site_count')
+        }
+        actual = {
+            row['id']: (row['total'], row['checked_in'])
+            for row in Department.objects.values('id').annotate(
+                total=Count('visitors'),
+                checked_in=Count('visitors', filter=Q(visitors__status=ON_SITE)),
+            )
+        }
+        fixed = []
+        for pk, counts in stored.items():
+            visitors, on_site = actual.get(pk, (0, 0))
+            if counts != (visitors, on_site):
+                Department.objects.filter(pk=pk).update(visitor_count=visitors, on_site_count=on_site)
+                fixed.append(pk)
+        if fixed:
+            transaction.on_commit(invalidate)
+    return fixed
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-19 08:37
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_visitors(apps, schema_editor):
+    Department = apps.get_model('departments', 'Department')
+    Visitor = apps.get_model('visitors', 'Visitor')
+    for row in Visitor.objects.filter(department__isnull=False).values('department_id').annotate(
+        visitors=Count('id'),
+        on_site=Count('id', filter=Q(status='checked-in')),
+    ).order_by():
+        Department.objects.filter(pk=row['department_id']).update(
+            visitor_count=row['visitors'], on_site_count=row['on_site']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('departments', '0001_initial'),
+        ('visitors', '0011_visitor_host_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='on_site_count',
+            field=models.PositiveIntegerField(default=0, help_text='Visitors of the department currently checked in', verbose_name='on-site count'),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='visitor_count',
+            field=models.PositiveIntegerField(default=0, help_text='Visits recorded for the department', verbose_name='visitor count'),
+        ),
+        migrations.RunPython(count_visitors, migrations.RunPython.noop),
+    ]
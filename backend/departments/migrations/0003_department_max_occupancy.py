@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('departments', '0002_department_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='max_occupancy',
+            field=models.PositiveIntegerField(blank=True, help_text='Most visitors allowed on site at once; empty for no limit', null=True, verbose_name='max occupancy'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-19 09:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('departments', '0003_department_max_occupancy'),
+        ('tenancy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='site',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Building the department is in', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='departments', to='tenancy.site', verbose_name='site'),
+        ),
+        migrations.AlterField(
+            model_name='department',
+            name='name',
+            field=models.CharField(help_text='Name of the department', max_length=100, verbose_name='name'),
+        ),
+        migrations.AddConstraint(
+            model_name='department',
+            constraint=models.UniqueConstraint(fields=('site', 'name'), name='department_site_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='department',
+            constraint=models.UniqueConstraint(condition=models.Q(('site__isnull', True)), fields=('name',), name='department_name_without_site_uniq'),
+        ),
+    ]
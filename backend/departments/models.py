@@ -1,13 +1,26 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from tenancy.models import Site
+
 class Department(models.Model):
     name = models.CharField(
         _('name'),
         max_length=100,
-        unique=True,
         help_text=_("Name of the department")
     )
+    # Copied onto the department's users and visits (see visitors.signals).
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='departments',
+        # Indexed by department_site_name_uniq.
+        db_index=False,
+        verbose_name=_('site'),
+        help_text=_("Building the department is in")
+    )
     description = models.TextField(
         _('description'),
         blank=True,
@@ -19,16 +32,54 @@ class Department(models.Model):
         auto_now_add=True,
         help_text=_("When the department was created")
     )
+    # Maintained by departments.counters on every visit write.
+    visitor_count = models.PositiveIntegerField(
+        _('visitor count'),
+        default=0,
+        help_text=_("Visits recorded for the department")
+    )
+    on_site_count = models.PositiveIntegerField(
+        _('on-site count'),
+        default=0,
+        help_text=_("Visitors of the department currently checked in")
+    )
+    # Enforced by departments.counters when visitors check in.
+    max_occupancy = models.PositiveIntegerField(
+        _('max occupancy'),
+        null=True,
+        blank=True,
+        help_text=_("Most visitors allowed on site at once; empty for no limit")
+    )
     updated_at = models.DateTimeField(
         _('updated at'),
         auto_now=True,
         help_text=_("When the department was last updated")
     )
 
+    COUNTER_FIELDS = ('visitor_count', 'on_site_count')
+
     class Meta:
         verbose_name = _('department')
         verbose_name_plural = _('departments')
         ordering = ['name']
+        constraints = [
+            # Names are unique within a site; the index also serves the
+            # site-scoped list, which is ordered by name.
+            models.UniqueConstraint(fields=['site', 'name'], name='department_site_name_uniq'),
+            models.UniqueConstraint(
+                fields=['name'], condition=models.Q(site__isnull=True), name='department_name_without_site_uniq',
+            ),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def save(self, *args, **kwargs):
+        # The counters only change through F() updates (departments.counters);
+        # saving an existing department must not write back a stale copy.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
@@ -1,12 +1,15 @@
 from rest_framework import serializers
+from tenancy.serializers import CurrentSiteDefault, SiteRelatedField
 from .models import Department
 
 class DepartmentSerializer(serializers.ModelSerializer):
-    visitor_count = serializers.IntegerField(read_only=True)
+    # Users of a site create departments in it, and cannot move them out.
+    site_id = SiteRelatedField(source='site', default=CurrentSiteDefault(), allow_null=True)
+
     class Meta:
         model = Department
-        fields = ['id', 'name', 'description', 'created_at', 'updated_at', 'visitor_count']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'site_id', 'created_at', 'updated_at', 'visitor_count', 'on_site_count', 'max_occupancy']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'visitor_count', 'on_site_count']
     
     def validate_name(self, value):
         if len(value) < 3:
@@ -1,10 +1,18 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import DepartmentViewSet
+from .async_views import DepartmentListView
 
 router = DefaultRouter()
 router.register(r'', DepartmentViewSet, basename='department')
 
 urlpatterns = [
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_VIEWS:
+    # Ahead of the router, which keeps serving writes and the other routes.
+    urlpatterns.insert(0, path('', DepartmentListView.as_view(
+        write_view=DepartmentViewSet.as_view({'get': 'list', 'post': 'create'}),
+    ), name='department-list-async'))
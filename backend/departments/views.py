@@ -1,17 +1,68 @@
-from django.db.models import Count
+from django.db import transaction
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import Department
 from .serializers import DepartmentSerializer
+from .cache import for_site, get_department_list, invalidate
+from backend.routers import ReplicaReadMixin
+from tenancy.scoping import scope_to_site, site_id_for
+from audit import log as audit
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = DepartmentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def site_id(self):
+        return site_id_for(self.request.user, self.request.query_params)
+
     def get_queryset(self):
-        return Department.objects.annotate(visitor_count=Count('visitors'))
+        return scope_to_site(Department.objects.all(), self.site_id())
+
+    def cached_list(self):
+        # The counters are columns now, and the whole list, of every site, is
+        # cached per process.
+        departments = get_department_list(
+            lambda: self.get_serializer(Department.objects.all(), many=True).data
+        )
+        return for_site(departments, self.site_id())
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.cached_list())
+
+    @action(detail=False, methods=['get'])
+    def occupancy(self, request):
+        # Who is on site right now, from the counters rather than a visitor count.
+        departments = [
+            {key: department[key] for key in ('id', 'name', 'on_site_count', 'max_occupancy')}
+            for department in self.cached_list()
+        ]
+        return Response({
+            'on_site': sum(department['on_site_count'] for department in departments),
+            'departments': departments,
+        })
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             self.permission_classes = [permissions.IsAdminUser]
         return super().get_permissions()
-    
+
+    def perform_create(self, serializer):
+        department = serializer.save()
+        audit.record('create', department, self.request.user, after=audit.snapshot(department))
+        transaction.on_commit(invalidate)
+
+    def perform_update(self, serializer):
+        before = audit.snapshot(serializer.instance)
+        # A rename or move to another site rewrites the department's visits
+        # and users (see visitors/signals.py); all of it commits or none does.
+        with transaction.atomic():
+            department = serializer.save()
+            audit.record('update', department, self.request.user, before, audit.snapshot(department))
+            transaction.on_commit(invalidate)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            audit.record('delete', instance, self.request.user, before=audit.snapshot(instance))
+            instance.delete()
+            transaction.on_commit(invalidate)
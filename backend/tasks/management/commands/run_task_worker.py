@@ -0,0 +1,51 @@
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from tasks.queue import get_backend
+
+
+class Command(BaseCommand):
+    help = "Run tasks from the durable queue (TASKS_BACKEND='database')."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None, help="Default: TASKS_THREADS")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Run the tasks that are due now, then exit")
+
+    def handle(self, *args, **options):
+        if settings.TASKS_BACKEND != 'database':
+            raise CommandError("run_task_worker needs TASKS_BACKEND='database'")
+        backend = get_backend()
+        concurrency = options['concurrency'] or settings.TASKS_THREADS
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        def run(task):
+            try:
+                backend.run(task)
+            finally:
+                close_old_connections()
+
+        processed = 0
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='task-worker') as pool:
+            while not self.stopping:
+                tasks = backend.claim(concurrency)
+                if tasks:
+                    list(pool.map(run, tasks))
+                    processed += len(tasks)
+                    continue
+                if options['once']:
+                    break
+                close_old_connections()
+                time.sleep(options['poll_interval'])
+        self.stdout.write(f"Processed {processed} task(s)")
+
+    def stop(self, signum, frame):
+        # Finish the current batch, then exit.
+        self.stopping = True
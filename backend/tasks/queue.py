@@ -0,0 +1,240 @@
+"""
+Background tasks for work that should not delay a request.
+
+``TASKS_BACKEND`` picks where enqueued tasks run:
+
+- ``thread`` (default): a per-process thread pool, once the current
+  transaction commits. Nothing to deploy, but tasks still pending when the
+  process exits are lost.
+- ``database``: a ``Task`` row written in the current transaction and run by
+  ``manage.py run_task_worker``. Survives restarts.
+- ``immediate``: inline once the transaction commits; for tests and debugging.
+
+Failed attempts are retried with exponential backoff up to the task's
+``max_attempts``. Counters are kept per process and exposed by ``get_metrics()``.
+"""
+import atexit
+import logging
+import random
+import threading
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Task
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    COUNTERS = ('enqueued', 'started', 'succeeded', 'retried', 'failed')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = defaultdict(lambda: dict.fromkeys(self.COUNTERS, 0))
+            self._runtime = defaultdict(float)
+
+    def incr(self, counter, task_name):
+        with self._lock:
+            self._counts[task_name][counter] += 1
+
+    def add_runtime(self, task_name, seconds):
+        with self._lock:
+            self._runtime[task_name] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            tasks = {}
+            for name, counts in self._counts.items():
+                finished = counts['succeeded'] + counts['retried'] + counts['failed']
+                tasks[name] = dict(
+                    counts,
+                    mean_runtime_ms=round(self._runtime[name] / finished * 1000, 3) if finished else None,
+                )
+        totals = dict.fromkeys(self.COUNTERS, 0)
+        for counts in tasks.values():
+            for counter in self.COUNTERS:
+                totals[counter] += counts[counter]
+        return {'totals': totals, 'tasks': tasks}
+
+
+metrics = Metrics()
+
+
+def retry_delay(attempt):
+    """Seconds to wait after failed attempt number ``attempt``: exponential, jittered, capped."""
+    delay = min(settings.TASKS_RETRY_BACKOFF * 2 ** (attempt - 1), settings.TASKS_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def execute(name, args, kwargs):
+    """Run one attempt of a task, recording metrics; the task's exception propagates."""
+    func = get_task(name)
+    metrics.incr('started', name)
+    start = time.perf_counter()
+    try:
+        func(*args, **kwargs)
+    finally:
+        metrics.add_runtime(name, time.perf_counter() - start)
+
+
+class ImmediateBackend:
+    def enqueue(self, name, args, kwargs):
+        get_task(name)
+        metrics.incr('enqueued', name)
+        transaction.on_commit(lambda: self.run(name, args, kwargs))
+
+    def run(self, name, args, kwargs):
+        try:
+            execute(name, args, kwargs)
+        except Exception:
+            metrics.incr('failed', name)
+            logger.exception("Task %s failed", name)
+        else:
+            metrics.incr('succeeded', name)
+
+
+class ThreadBackend:
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.TASKS_THREADS, thread_name_prefix='task'
+                    )
+                    atexit.register(self.shutdown)
+        return self._executor
+
+    def enqueue(self, name, args, kwargs):
+        get_task(name)
+        metrics.incr('enqueued', name)
+        # Tasks must not run before the data they refer to is committed.
+        transaction.on_commit(lambda: self.submit(name, args, kwargs, 1))
+
+    def submit(self, name, args, kwargs, attempt):
+        self.executor.submit(self.run, name, args, kwargs, attempt)
+
+    def run(self, name, args, kwargs, attempt):
+        try:
+            execute(name, args, kwargs)
+        except Exception:
+            if attempt < get_task(name).max_attempts:
+                metrics.incr('retried', name)
+                timer = threading.Timer(retry_delay(attempt), self.submit, (name, args, kwargs, attempt + 1))
+                timer.daemon = True
+                timer.start()
+            else:
+                metrics.incr('failed', name)
+                logger.exception("Task %s failed after %d attempt(s)", name, attempt)
+        else:
+            metrics.incr('succeeded', name)
+        finally:
+            # Pool threads outlive requests; release connections like a request would.
+            close_old_connections()
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+class DatabaseBackend:
+    def enqueue(self, name, args, kwargs):
+        func = get_task(name)
+        Task.objects.create(
+            name=name, args=list(args), kwargs=kwargs,
+            max_attempts=func.max_attempts, run_at=timezone.now(),
+        )
+        metrics.incr('enqueued', name)
+
+    def claim(self, limit):
+        """Mark up to ``limit`` due tasks as running and return them."""
+        now = timezone.now()
+        # Tasks left running by a worker that died go back to the queue.
+        Task.objects.filter(
+            status='running', locked_at__lt=now - timedelta(seconds=settings.TASKS_STALE_AFTER)
+        ).update(status='queued', locked_at=None)
+
+        due = Task.objects.filter(status='queued', run_at__lte=now).order_by('run_at')
+        claimed = []
+        for task_id in due.values_list('id', flat=True)[:limit]:
+            # Conditional update, so concurrent workers never claim the same task.
+            if Task.objects.filter(pk=task_id, status='queued').update(
+                status='running', locked_at=now, attempts=F('attempts') + 1
+            ):
+                claimed.append(task_id)
+        return list(Task.objects.filter(pk__in=claimed).order_by('run_at'))
+
+    def run(self, task):
+        try:
+            execute(task.name, task.args, task.kwargs)
+        except Exception:
+            task.last_error = traceback.format_exc()
+            task.locked_at = None
+            if task.attempts < task.max_attempts:
+                metrics.incr('retried', task.name)
+                task.status = 'queued'
+                task.run_at = timezone.now() + timedelta(seconds=retry_delay(task.attempts))
+            else:
+                metrics.incr('failed', task.name)
+                task.status = 'failed'
+                logger.error("Task %s (%s) failed after %d attempt(s)", task.pk, task.name, task.attempts)
+            task.save(update_fields=['status', 'run_at', 'locked_at', 'last_error', 'updated_at'])
+        else:
+            metrics.incr('succeeded', task.name)
+            # Finished work is not kept; failed tasks stay for inspection.
+            task.delete()
+
+    def queue_depth(self):
+        counts = dict.fromkeys(('queued', 'running', 'failed'), 0)
+        for row in Task.objects.values('status').annotate(count=Count('id')):
+            counts[row['status']] = row['count']
+        return counts
+
+
+BACKENDS = {
+    'immediate': ImmediateBackend,
+    'thread': ThreadBackend,
+    'database': DatabaseBackend,
+}
+_backends = {}
+
+
+def get_backend(name=None):
+    name = name or settings.TASKS_BACKEND
+    if name not in _backends:
+        try:
+            _backends[name] = BACKENDS[name]()
+        except KeyError:
+            raise ValueError(f"Unknown TASKS_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+    return _backends[name]
+
+
+def enqueue(name, args=(), kwargs=None):
+    """Queue the registered task ``name``; returns as soon as it is queued."""
+    get_backend().enqueue(name, list(args), kwargs or {})
+
+
+def get_metrics():
+    snapshot = metrics.snapshot()
+    snapshot['backend'] = settings.TASKS_BACKEND
+    if settings.TASKS_BACKEND == 'database':
+        snapshot['queue'] = get_backend().queue_depth()
+    return snapshot
@@ -0,0 +1,39 @@
+import functools
+
+from django.conf import settings
+
+_registry = {}
+
+
+class UnknownTask(LookupError):
+    pass
+
+
+def task(func=None, *, max_attempts=None, name=None):
+    """
+    Register ``func`` as a background task.
+
+    Call ``func.delay(*args, **kwargs)`` to enqueue it; arguments must be JSON
+    serialisable so the durable queue can store them. ``func`` itself can
+    still be called directly.
+    """
+    if func is None:
+        return functools.partial(task, max_attempts=max_attempts, name=name)
+
+    func.task_name = name or f'{func.__module__}.{func.__qualname__}'
+    func.max_attempts = max_attempts or settings.TASKS_MAX_ATTEMPTS
+
+    def delay(*args, **kwargs):
+        from .queue import enqueue
+        return enqueue(func.task_name, args, kwargs)
+
+    func.delay = delay
+    _registry[func.task_name] = func
+    return func
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTask(f"No task registered as {name!r}")
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from audit.admin import AuditedAdmin
+from .models import Site
+
+
+@admin.register(Site)
+class SiteAdmin(AuditedAdmin):
+    list_display = ['name', 'code', 'created_at']
+    search_fields = ['name', 'code']
+    prepopulated_fields = {'code': ['name']}
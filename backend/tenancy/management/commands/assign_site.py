@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from accounts.models import User
+from audit import log as audit
+from audit.models import AuditEvent
+from departments.cache import invalidate
+from departments.models import Department
+from tenancy.models import Site
+from visitors import reports
+from visitors.models import ArchivedVisitor, DailyVisitCount, Visitor
+
+
+class Command(BaseCommand):
+    help = (
+        "Move departments, with their users and visits, to a site, created if it does not exist. "
+        "Without --department, every department without a site moves, and so do the visits and "
+        "non-admin users that have neither: how a single-site install becomes the first of many sites."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('code', help="Code of the site, e.g. hq")
+        parser.add_argument('--name', help="Name of the site, when it is created (default: the code)")
+        parser.add_argument('--department', type=int, action='append', dest='departments',
+                            help="Id of a department to move; repeatable")
+
+    def handle(self, *args, **options):
+        ids = options['departments']
+        with transaction.atomic():
+            site, created = Site.objects.get_or_create(
+                code=options['code'], defaults={'name': options['name'] or options['code']}
+            )
+            if created:
+                audit.record('create', site, after=audit.snapshot(site))
+            if ids:
+                departments = list(Department.objects.filter(pk__in=ids))
+                missing = set(ids) - {department.pk for department in departments}
+                if missing:
+                    raise CommandError(f"Unknown department(s): {', '.join(map(str, sorted(missing)))}")
+            else:
+                departments = list(Department.objects.filter(site__isnull=True))
+
+            for department in departments:
+                before = audit.snapshot(department)
+                department.site = site
+                # visitors.signals moves the department's users and visits along.
+                department.save()
+                audit.record('update', department, before=before, after=audit.snapshot(department))
+
+            moved = {}
+            if not ids:
+                orphans = Q(site__isnull=True, department__isnull=True)
+                for model in (Visitor, ArchivedVisitor, DailyVisitCount):
+                    moved[model._meta.verbose_name_plural] = model.objects.filter(orphans).update(site=site)
+                # Admins keep seeing every site.
+                moved['users'] = User.objects.filter(orphans).exclude(
+                    Q(role='admin') | Q(is_superuser=True)
+                ).update(site=site)
+
+            # Events recorded before the move have no site yet; they follow their entity.
+            audit.flush()
+            for entity_type, models in (
+                ('department', (Department,)), ('user', (User,)), ('visitor', (Visitor, ArchivedVisitor)),
+            ):
+                for model in models:
+                    AuditEvent.objects.filter(
+                        site_id__isnull=True, entity_type=entity_type,
+                        entity_id__in=model.objects.filter(site=site).values('id'),
+                    ).update(site_id=site.pk)
+            transaction.on_commit(invalidate)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {len(departments)} department(s) to {site.name} ({site.code})"
+            + ''.join(f", {count} {name} without a department" for name, count in moved.items())
+        ))
+        # Past reports were counted per site; count them again.
+        if reports.load_manifest() is not None:
+            reports.snapshot_reports(rebuild=True)
+            self.stdout.write(f"Rebuilt the report snapshots in {reports.snapshot_dir()}")
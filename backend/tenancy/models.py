@@ -0,0 +1,15 @@
+from django.db import models
+
+
+class Site(models.Model):
+    """A building served by this deployment; departments, users and visits belong to one."""
+    name = models.CharField(max_length=100, unique=True)
+    # Short, stable identifier for scripts and imports, e.g. "hq".
+    code = models.SlugField(max_length=30, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
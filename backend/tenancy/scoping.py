@@ -0,0 +1,24 @@
+"""
+Which site a request reads.
+
+A user with a site only ever sees that site. Users without one (typically
+the admins of the whole deployment, and every user of a single-site install)
+see all sites, and may narrow any list or stats read to one with
+``?site=<id>``. Rows without a site are only visible to the latter.
+"""
+
+
+def site_id_for(user, params=None):
+    """The id of the site ``user`` reads, given the request's query ``params``; None for every site."""
+    site_id = getattr(user, 'site_id', None)
+    if site_id:
+        return site_id
+    value = str((params or {}).get('site', ''))
+    return int(value) if value.isdigit() else None
+
+
+def scope_to_site(queryset, site_id, field='site'):
+    """``queryset`` narrowed to the site ``site_id``, through the foreign key ``field``."""
+    if site_id is None:
+        return queryset
+    return queryset.filter(**{f'{field}_id': site_id})
@@ -0,0 +1,61 @@
+from rest_framework import serializers
+
+from .models import Site
+from .scoping import scope_to_site, site_id_for
+
+
+class SiteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Site
+        fields = ['id', 'name', 'code', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+
+class CurrentSiteDefault:
+    """Field default: the site of the requesting user, if they belong to one."""
+    requires_context = True
+
+    def __call__(self, serializer_field):
+        request = serializer_field.context.get('request')
+        return request.user.site if request is not None else None
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+
+class SiteRelatedField(serializers.PrimaryKeyRelatedField):
+    """A site, limited to the requesting user's own when they belong to one."""
+    default_error_messages = {
+        'own_site': 'Must be your own site.',
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Site.objects.all())
+        super().__init__(**kwargs)
+
+    def user_site_id(self):
+        request = self.context.get('request')
+        return site_id_for(request.user) if request is not None else None
+
+    def get_queryset(self):
+        site_id = self.user_site_id()
+        if site_id is None:
+            return Site.objects.all()
+        return Site.objects.filter(pk=site_id)
+
+    def validate_empty_values(self, data):
+        # Users of a site cannot leave it empty either.
+        if data is None and self.user_site_id() is not None:
+            self.fail('own_site')
+        return super().validate_empty_values(data)
+
+
+class SiteScopedRelatedField(serializers.PrimaryKeyRelatedField):
+    """A related object, e.g. a department, limited to the requesting user's site."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset
+        return scope_to_site(queryset, site_id_for(request.user))
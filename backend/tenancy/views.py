@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.db.models import ProtectedError
+from rest_framework import permissions, status, viewsets
+from rest_framework.exceptions import APIException
+
+from audit import log as audit
+from backend.routers import ReplicaReadMixin
+from .models import Site
+from .serializers import SiteSerializer
+
+
+class SiteInUse(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The site still has departments, users or visits.'
+    default_code = 'site_in_use'
+
+
+class SiteViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    serializer_class = SiteSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        # Users of one site only see theirs.
+        if self.request.user.site_id:
+            return Site.objects.filter(pk=self.request.user.site_id)
+        return Site.objects.all()
+
+    def get_permissions(self):
+        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+            self.permission_classes = [permissions.IsAdminUser]
+        return super().get_permissions()
+
+    def perform_create(self, serializer):
+        site = serializer.save()
+        audit.record('create', site, self.request.user, after=audit.snapshot(site))
+
+    def perform_update(self, serializer):
+        before = audit.snapshot(serializer.instance)
+        site = serializer.save()
+        audit.record('update', site, self.request.user, before, audit.snapshot(site))
+
+    def perform_destroy(self, instance):
+        # Sites still holding departments, users or visits are protected; the
+        # audit event is only written if the delete goes through.
+        try:
+            with transaction.atomic():
+                audit.record('delete', instance, self.request.user, before=audit.snapshot(instance))
+                instance.delete()
+        except ProtectedError:
+            raise SiteInUse()
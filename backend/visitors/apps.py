@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_visitor_partitions(sender, using, **kwargs):
+    from .partitioning import ensure_partitions
+    from django.db import connections
+
+    ensure_partitions(connection=connections[using])
 
 
 class VisitorsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'visitors'
+
+    def ready(self):
+        # Keeps upcoming monthly partitions in place on every deploy; a no-op
+        # unless the visitors table has been partitioned on PostgreSQL.
+        post_migrate.connect(ensure_visitor_partitions, sender=self)
+
+        from . import signals
+        signals.connect()
@@ -0,0 +1,192 @@
+"""
+Retention and archiving of old visits.
+
+Visits older than ``VISITOR_RETENTION_DAYS`` are moved out of the hot
+``visitors_visitor`` table in batches, either into ``ArchivedVisitor`` or into
+gzip-compressed NDJSON files under ``VISITOR_ARCHIVE_DIR``. Every archived
+batch also updates ``DailyVisitCount`` so the stats endpoints can still count
+archived visits when asked to (``include_archived``).
+"""
+import gzip
+import json
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import User
+from departments.counters import visit_state, visits_changed
+from departments.models import Department
+from tenancy.models import Site
+from .models import Visitor, ArchivedVisitor, DailyVisitCount
+
+# Columns copied between the live table, the archive table and archive files.
+ARCHIVE_FIELDS = [
+    'id', 'name', 'email', 'phone', 'purpose', 'department_id', 'site_id', 'host',
+    'host_email', 'organization', 'address', 'status', 'visit_date', 'check_in_time',
+    'check_out_time', 'created_at', 'created_by_id', 'department_name', 'watchlist_hits',
+]
+
+TARGET_TABLE = 'table'
+TARGET_FILE = 'file'
+
+
+def retention_cutoff(days=None):
+    """Visits dated before the returned day are eligible for archiving."""
+    if days is None:
+        days = settings.VISITOR_RETENTION_DAYS
+    return timezone.now().date() - timedelta(days=days)
+
+
+def _adjust_daily_counts(rows, sign):
+    """Add (``sign=1``) or remove (``sign=-1``) rows from the daily rollups."""
+    # Files written before visits carried a site have no site_id.
+    counts = Counter(
+        (row['visit_date'], row.get('site_id'), row['department_id'], row['status']) for row in rows
+    )
+    for (visit_date, site_id, department_id, status), count in counts.items():
+        updated = DailyVisitCount.objects.filter(
+            visit_date=visit_date, site_id=site_id, department_id=department_id, status=status
+        ).update(count=F('count') + sign * count)
+        if not updated and sign > 0:
+            DailyVisitCount.objects.create(
+                visit_date=visit_date, site_id=site_id, department_id=department_id, status=status, count=count
+            )
+    if sign < 0:
+        DailyVisitCount.objects.filter(count__lte=0).delete()
+
+
+def _write_archive_file(rows, archive_dir):
+    os.makedirs(archive_dir, exist_ok=True)
+    name = f"visitors-{rows[0]['id']}-{rows[-1]['id']}-{timezone.now():%Y%m%d%H%M%S}.ndjson.gz"
+    path = os.path.join(archive_dir, name)
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as fh:
+        for row in rows:
+            fh.write(json.dumps(row, cls=DjangoJSONEncoder))
+            fh.write('\n')
+    os.replace(tmp_path, path)
+    return path
+
+
+def archive_visits(before=None, batch_size=None, target=TARGET_TABLE, archive_dir=None, max_batches=None):
+    """
+    Move visits dated before ``before`` out of ``Visitor``.
+
+    Each batch runs in its own transaction so a long run never holds locks on
+    the hot table for more than one batch. Returns the number of rows moved.
+    """
+    before = before or retention_cutoff()
+    batch_size = batch_size or settings.VISITOR_ARCHIVE_BATCH_SIZE
+    archive_dir = archive_dir or settings.VISITOR_ARCHIVE_DIR
+    if target not in (TARGET_TABLE, TARGET_FILE):
+        raise ValueError(f"Unknown archive target: {target}")
+
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            rows = list(
+                Visitor.objects.filter(visit_date__lt=before)
+                .order_by('id')
+                .values(*ARCHIVE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            if target == TARGET_TABLE:
+                ArchivedVisitor.objects.bulk_create(
+                    [ArchivedVisitor(**row) for row in rows], ignore_conflicts=True
+                )
+            else:
+                _write_archive_file(rows, archive_dir)
+            _adjust_daily_counts(rows, 1)
+            visits_changed(before=[visit_state(row) for row in rows])
+            Visitor.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
+        batches += 1
+    return moved
+
+
+def _restore_rows(rows):
+    """Insert ``rows`` back into ``Visitor``; returns how many were inserted."""
+    # Files written by older versions may carry columns that no longer exist.
+    rows[:] = [{field: row[field] for field in ARCHIVE_FIELDS if field in row} for row in rows]
+    # Departments or users may have been deleted since the visit was archived.
+    departments = {
+        pk: (name, site_id) for pk, name, site_id in Department.objects.filter(
+            id__in={row['department_id'] for row in rows}
+        ).values_list('id', 'name', 'site_id')
+    }
+    user_ids = set(User.objects.filter(
+        id__in={row['created_by_id'] for row in rows}
+    ).values_list('id', flat=True))
+    site_ids = set(Site.objects.filter(
+        id__in={row.get('site_id') for row in rows}
+    ).values_list('id', flat=True))
+    for row in rows:
+        if row['department_id'] not in departments:
+            row['department_id'] = None
+        # Also fills in files written before visits carried the name or site;
+        # the department's current site, like the rollups it moved with.
+        department_name, site_id = departments.get(row['department_id'], ('', None))
+        row['department_name'] = department_name
+        row['site_id'] = site_id or (row.get('site_id') if row.get('site_id') in site_ids else None)
+        if row['created_by_id'] not in user_ids:
+            row['created_by_id'] = None
+    # Rows whose id is already live, e.g. from restoring the same file twice,
+    # are skipped: their rollups were subtracted when they were restored.
+    live = set(Visitor.objects.filter(id__in=[row['id'] for row in rows]).values_list('id', flat=True))
+    rows = [row for row in rows if row['id'] not in live]
+    _adjust_daily_counts(rows, -1)
+    Visitor.objects.bulk_create([Visitor(**row) for row in rows], ignore_conflicts=True)
+    visits_changed(after=[visit_state(row) for row in rows])
+    return len(rows)
+
+
+def restore_from_table(since=None, until=None, batch_size=None):
+    """Move archived visits dated within ``[since, until)`` back into ``Visitor``."""
+    batch_size = batch_size or settings.VISITOR_ARCHIVE_BATCH_SIZE
+    queryset = ArchivedVisitor.objects.all()
+    if since:
+        queryset = queryset.filter(visit_date__gte=since)
+    if until:
+        queryset = queryset.filter(visit_date__lt=until)
+
+    restored = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by('id').values(*ARCHIVE_FIELDS)[:batch_size])
+            if not rows:
+                break
+            restored += _restore_rows(rows)
+            ArchivedVisitor.objects.filter(id__in=[row['id'] for row in rows]).delete()
+    return restored
+
+
+def read_archive_file(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def restore_from_file(path, batch_size=None):
+    """Load an archive file written by ``archive_visits(target='file')`` back into ``Visitor``."""
+    batch_size = batch_size or settings.VISITOR_ARCHIVE_BATCH_SIZE
+    restored = 0
+    batch = []
+    for row in read_archive_file(path):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            with transaction.atomic():
+                restored += _restore_rows(batch)
+            batch = []
+    if batch:
+        with transaction.atomic():
+            restored += _restore_rows(batch)
+    return restored
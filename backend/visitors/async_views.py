@@ -0,0 +1,36 @@
+"""Async versions of the visitor list and dashboard reads (see ``backend.async_views``)."""
+
+from backend.async_views import AsyncReadView, gather_queries, json_response
+from . import queries
+from .models import ArchivedVisitor, Visitor
+from .serializers import VisitorSerializer
+
+
+class VisitorListView(AsyncReadView):
+    use_replica = True
+
+    async def get(self, request):
+        params, user = request.GET, request.user
+        live = queries.filter_visits(Visitor.objects.all(), user, params)
+        if queries.include_archived(params):
+            # Archived visits are older than anything still live, so appending
+            # them keeps the combined result ordered by visit date.
+            archived = queries.filter_visits(ArchivedVisitor.objects.all(), user, params)
+            live, archived = await gather_queries(lambda: list(live), lambda: list(archived))
+            visits = live + archived
+        else:
+            visits = [visitor async for visitor in live]
+        serializer = VisitorSerializer(visits, many=True, context={'request': request})
+        return json_response(serializer.data)
+
+
+class DashboardView(AsyncReadView):
+    """A dashboard endpoint made of a ``visitors.queries`` pair, e.g. ``summary_queries``/``summary_result``."""
+    use_replica = True
+    make_queries = None
+    combine = None
+
+    async def get(self, request):
+        params = request.GET
+        results = await gather_queries(*self.make_queries(request.user, params))
+        return json_response(self.combine(params, *results))
@@ -0,0 +1,78 @@
+"""
+Initials avatars rendered by the API itself.
+
+A visitor's avatar is an SVG with up to two initials on a colour picked from
+the name, so the same name always gives the same image. The URL carries only
+the initials and the colour's index, never the name, since it ends up in
+access logs and shared caches. Nothing is stored per visit, and responses are
+cached by browsers for a year and by the process in an LRU keyed on
+(initials, colour).
+"""
+import hashlib
+import zlib
+from functools import lru_cache
+from urllib.parse import urlencode
+from xml.sax.saxutils import escape
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+# Bump to make browsers fetch avatars again after changing how they look.
+STYLE_VERSION = 1
+COLORS = [
+    '#1abc9c', '#2ecc71', '#3498db', '#9b59b6', '#34495e', '#16a085',
+    '#27ae60', '#2980b9', '#8e44ad', '#e67e22', '#e74c3c', '#7f8c8d',
+]
+MAX_AGE = 365 * 24 * 60 * 60
+
+
+def initials(name):
+    letters = [word[0] for word in (name or '').split() if word[:1].isalnum()]
+    if len(letters) > 2:
+        letters = [letters[0], letters[-1]]
+    return ''.join(letters).upper() or '?'
+
+
+def color_index(name):
+    # crc32 rather than hash(), which differs between processes.
+    return zlib.crc32(' '.join((name or '').lower().split()).encode()) % len(COLORS)
+
+
+def avatar_url(name, request=None):
+    url = f"{reverse('visitor-avatar')}?{urlencode({'i': initials(name), 'c': color_index(name)})}"
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+@lru_cache(maxsize=4096)
+def render(text, color):
+    """``(svg bytes, etag)`` for one initials/colour pair."""
+    size = 28 if len(text) > 1 else 32
+    svg = (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64" viewBox="0 0 64 64">'
+        f'<rect width="64" height="64" fill="{COLORS[color]}"/>'
+        '<text x="50%" y="50%" dy=".35em" text-anchor="middle" fill="#fff" '
+        f'font-family="Helvetica,Arial,sans-serif" font-size="{size}" font-weight="600">{escape(text)}</text>'
+        '</svg>'
+    ).encode()
+    etag = '"{}"'.format(hashlib.md5(svg + str(STYLE_VERSION).encode()).hexdigest())
+    return svg, etag
+
+
+@require_GET
+def avatar(request):
+    # Deliberately public and outside DRF: <img> tags send no token, and the
+    # image only depends on the initials and colour in the URL.
+    text = request.GET.get('i', '').upper()
+    if not 1 <= len(text) <= 2 or not text.isalnum():
+        text = '?'
+    color = request.GET.get('c', '')
+    color = int(color) % len(COLORS) if color.isdigit() else 0
+    svg, etag = render(text, color)
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(svg, content_type='image/svg+xml')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={MAX_AGE}, immutable'
+    return response
@@ -0,0 +1,90 @@
+"""
+Signed badge tokens for one-scan check-in and check-out.
+
+A token carries the visit's id and visit date, both base36, plus a truncated
+HMAC over them. A scanner's token is therefore verified without touching the
+database, and the status change that follows is one conditional update on
+the primary key (and, when the table is partitioned, the partition key).
+
+The QR code of a token is rendered with segno and cached per process and, for
+a year, by browsers: a token never changes for the same visit.
+"""
+import hashlib
+import io
+from datetime import date
+from functools import lru_cache
+
+import segno
+from django.core.signing import Signer
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.utils.http import base36_to_int, int_to_base36
+from django.views.decorators.http import require_GET
+
+SALT = 'visitors.badge'
+# 22 base64 characters keep 132 bits of the HMAC, and the QR code small.
+SIGNATURE_LENGTH = 22
+MAX_AGE = 365 * 24 * 60 * 60
+# Status a scan moves a visit from, to the next one.
+NEXT_STATUS = {'pre-registered': 'checked-in', 'checked-in': 'checked-out'}
+BADGE_STATUSES = tuple(NEXT_STATUS)
+
+
+class InvalidBadge(ValueError):
+    pass
+
+
+def _signature(value):
+    return Signer(salt=SALT).signature(value)[:SIGNATURE_LENGTH]
+
+
+def make_badge_token(visitor):
+    value = f'{int_to_base36(visitor.pk)}.{int_to_base36(visitor.visit_date.toordinal())}'
+    return f'{value}.{_signature(value)}'
+
+
+def read_badge_token(token):
+    """``(visitor id, visit date)`` of a genuine token; raises ``InvalidBadge`` otherwise."""
+    try:
+        pk, ordinal, signature = str(token).strip().split('.')
+        value = f'{pk}.{ordinal}'
+        if not constant_time_compare(signature, _signature(value)):
+            raise InvalidBadge("Badge signature does not match")
+        return base36_to_int(pk), date.fromordinal(base36_to_int(ordinal))
+    except InvalidBadge:
+        raise
+    except (ValueError, OverflowError):
+        raise InvalidBadge("Not a badge token")
+
+
+def qr_url(token, request=None):
+    url = reverse('visitor-badge-qr', args=[token])
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+@lru_cache(maxsize=1024)
+def render_qr(token):
+    """``(svg bytes, etag)`` of the QR code for ``token``."""
+    buffer = io.BytesIO()
+    segno.make(token, error='m', micro=False).save(buffer, kind='svg', scale=4, border=2, xmldecl=False)
+    svg = buffer.getvalue()
+    return svg, '"{}"'.format(hashlib.md5(svg).hexdigest())
+
+
+@require_GET
+def badge_qr(request, token):
+    # Public like the avatars, so it works in <img> tags and printouts; the
+    # token itself is the secret, and forged ones are refused before rendering.
+    try:
+        read_badge_token(token)
+    except InvalidBadge:
+        raise Http404("Unknown badge")
+    svg, etag = render_qr(token)
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(svg, content_type='image/svg+xml')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={MAX_AGE}, immutable'
+    return response
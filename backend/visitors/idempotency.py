@@ -0,0 +1,121 @@
+"""
+``Idempotency-Key`` support for retried kiosk writes.
+
+A request carrying the header is recorded per user and key. A retry with the
+same key gets the stored response back without running validation or the
+write again; reusing a key for a different request is rejected. While the
+first request runs, retries get 409, for at most IDEMPOTENCY_CLAIM_TIMEOUT
+seconds in case it never finishes.
+"""
+import functools
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def request_fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.get_full_path().encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    """Create the in-progress record for ``key``; returns None if it already exists."""
+    now = timezone.now()
+    # An expired record no longer protects anything and may be reused, and
+    # neither may a claim left unfinished by a worker that was killed.
+    IdempotencyRecord.objects.filter(user=user, key=key).filter(
+        Q(expires_at__lte=now)
+        | Q(status_code__isnull=True, created_at__lte=now - timedelta(seconds=settings.IDEMPOTENCY_CLAIM_TIMEOUT))
+    ).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyRecord.objects.create(
+                user=user,
+                key=key,
+                request_hash=fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+    except IntegrityError:
+        return None
+
+
+def replay(record, fingerprint):
+    if record.request_hash != fingerprint:
+        return Response(
+            {'error': f'{HEADER} was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.status_code is None:
+        return Response(
+            {'error': f'A request with this {HEADER} is still being processed'},
+            status=status.HTTP_409_CONFLICT
+        )
+    return Response(record.response, status=record.status_code, headers={REPLAYED_HEADER: 'true'})
+
+
+def idempotent(view_method):
+    """
+    Make a DRF view method honour the ``Idempotency-Key`` header.
+
+    Requests without the header run as usual. Server errors are not stored,
+    so the client can retry them with the same key.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > IdempotencyRecord._meta.get_field('key').max_length:
+            return Response(
+                {'error': f'{HEADER} must be at most 255 characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+        record = _claim(request.user, key, fingerprint)
+        if record is None:
+            existing = IdempotencyRecord.objects.filter(user=request.user, key=key).first()
+            if existing is not None:
+                return replay(existing, fingerprint)
+            # The conflicting record expired and was purged in between.
+            record = _claim(request.user, key, fingerprint)
+            if record is None:
+                return Response(
+                    {'error': f'A request with this {HEADER} is still being processed'},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            # Updates nothing if the claim outlived IDEMPOTENCY_CLAIM_TIMEOUT
+            # and a retry took it over.
+            IdempotencyRecord.objects.filter(pk=record.pk, status_code__isnull=True).update(
+                status_code=response.status_code, response=response.data
+            )
+        return response
+
+    return wrapper
+
+
+def purge_expired():
+    return IdempotencyRecord.objects.filter(expires_at__lte=timezone.now()).delete()[0]
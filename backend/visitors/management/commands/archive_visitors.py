@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from visitors.archive import archive_visits, retention_cutoff, TARGET_TABLE, TARGET_FILE
+
+
+class Command(BaseCommand):
+    help = "Move visits older than the retention horizon out of the visitors table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Retention horizon in days (default: VISITOR_RETENTION_DAYS)")
+        parser.add_argument('--before', help="Archive visits dated before this day (YYYY-MM-DD); overrides --days")
+        parser.add_argument('--target', choices=[TARGET_TABLE, TARGET_FILE], default=TARGET_TABLE)
+        parser.add_argument('--archive-dir', help="Directory for --target=file (default: VISITOR_ARCHIVE_DIR)")
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--max-batches', type=int)
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                before = date.fromisoformat(options['before'])
+            except ValueError:
+                raise CommandError("--before must be a date in YYYY-MM-DD format")
+        else:
+            before = retention_cutoff(options['days'])
+
+        moved = archive_visits(
+            before=before,
+            batch_size=options['batch_size'],
+            target=options['target'],
+            archive_dir=options['archive_dir'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} visit(s) dated before {before} to {options['target']}"
+        ))
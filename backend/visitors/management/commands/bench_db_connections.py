@@ -0,0 +1,170 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from visitors.models import Visitor
+
+BENCH_PREFIX = 'bench-connections-'
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate concurrent check-in requests against PostgreSQL and report connection acquire "
+        "latency, throughput and peak server connections. --compare runs the current persistent "
+        "connection setup and the DB_POOL setup side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32, help="Concurrent simulated requests")
+        parser.add_argument('--requests', type=int, default=50, help="Requests per thread")
+        parser.add_argument('--compare', action='store_true', help="Run without and with DB_POOL")
+        parser.add_argument('--json', action='store_true', help="Print the result as JSON")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Connection pooling is PostgreSQL-only; point DATABASE_URL at PostgreSQL")
+        if options['compare']:
+            return self.compare(options)
+
+        result = self.run(options['threads'], options['requests'])
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+        else:
+            self.print_results([result])
+
+    def run(self, thread_count, request_count):
+        pooled = 'pool' in settings.DATABASES['default'].get('OPTIONS', {})
+        acquire_times = []
+        request_times = []
+        errors = []
+        lock = threading.Lock()
+        peak = {'connections': 0}
+        done = threading.Event()
+        barrier = threading.Barrier(thread_count)
+
+        def simulate(worker):
+            local_acquire, local_request = [], []
+            barrier.wait()
+            try:
+                for i in range(request_count):
+                    start = time.perf_counter()
+                    # Same lifecycle as a real request: Django closes (or returns
+                    # to the pool) connections around each one.
+                    request_started.send(sender=self.__class__)
+                    connection.ensure_connection()
+                    acquired = time.perf_counter()
+                    with transaction.atomic():
+                        visitor = Visitor.objects.create(
+                            name=f'{BENCH_PREFIX}{worker}-{i}', phone='0000000000', purpose='Benchmark',
+                            host='Benchmark', visit_date=timezone.now().date(),
+                        )
+                        Visitor.objects.filter(pk=visitor.pk, status='pre-registered').update(
+                            status='checked-in', check_in_time=timezone.now()
+                        )
+                    request_finished.send(sender=self.__class__)
+                    local_acquire.append(acquired - start)
+                    local_request.append(time.perf_counter() - start)
+            except Exception as exc:
+                with lock:
+                    errors.append(repr(exc))
+            finally:
+                connections.close_all()
+                with lock:
+                    acquire_times.extend(local_acquire)
+                    request_times.extend(local_request)
+
+        def monitor():
+            with connections['default'].cursor() as cursor:
+                while not done.is_set():
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()"
+                    )
+                    # Minus the monitor's own connection.
+                    peak['connections'] = max(peak['connections'], cursor.fetchone()[0] - 1)
+                    time.sleep(0.01)
+            connections.close_all()
+
+        monitor_thread = threading.Thread(target=monitor)
+        monitor_thread.start()
+        threads = [threading.Thread(target=simulate, args=(n,)) for n in range(thread_count)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        monitor_thread.join()
+
+        Visitor.objects.filter(name__startswith=BENCH_PREFIX).delete()
+        connections.close_all()
+
+        return {
+            'mode': 'pooled' if pooled else f"persistent (CONN_MAX_AGE={settings.DATABASES['default'].get('CONN_MAX_AGE')})",
+            'threads': thread_count,
+            'requests': len(request_times),
+            'errors': len(errors),
+            'first_error': errors[0] if errors else None,
+            'throughput': len(request_times) / elapsed if elapsed else 0.0,
+            'acquire_ms': {
+                'mean': statistics.mean(acquire_times) * 1000 if acquire_times else 0.0,
+                'p50': percentile(acquire_times, 50) * 1000,
+                'p95': percentile(acquire_times, 95) * 1000,
+                'p99': percentile(acquire_times, 99) * 1000,
+                'max': max(acquire_times, default=0.0) * 1000,
+            },
+            'request_p95_ms': percentile(request_times, 95) * 1000,
+            'peak_connections': peak['connections'],
+        }
+
+    def compare(self, options):
+        results = []
+        for pool in ('False', 'True'):
+            env = dict(os.environ, DB_POOL=pool)
+            completed = subprocess.run(
+                [
+                    sys.executable, sys.argv[0], 'bench_db_connections', '--json',
+                    '--threads', str(options['threads']), '--requests', str(options['requests']),
+                ],
+                env=env, capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                raise CommandError(f"Benchmark with DB_POOL={pool} failed:\n{completed.stderr}")
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        self.print_results(results)
+
+    def print_results(self, results):
+        header = (
+            f"{'mode':<32} {'req/s':>8} {'acq p50':>8} {'acq p95':>8} {'acq p99':>8} "
+            f"{'acq max':>8} {'req p95':>8} {'conns':>6} {'errors':>6}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for r in results:
+            acquire = r['acquire_ms']
+            self.stdout.write(
+                f"{r['mode']:<32} {r['throughput']:>8.1f} {acquire['p50']:>8.2f} {acquire['p95']:>8.2f} "
+                f"{acquire['p99']:>8.2f} {acquire['max']:>8.2f} {r['request_p95_ms']:>8.2f} "
+                f"{r['peak_connections']:>6} {r['errors']:>6}"
+            )
+            if r['first_error']:
+                self.stdout.write(self.style.WARNING(f"  first error: {r['first_error']}"))
+        self.stdout.write(f"{results[0]['threads']} threads, {results[0]['requests']} requests per run; latencies in ms")
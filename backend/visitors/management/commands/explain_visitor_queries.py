@@ -0,0 +1,169 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from departments.models import Department
+from tenancy.models import Site
+from visitors.models import Visitor
+from visitors.partitioning import DEFAULT_PARTITION
+
+TABLE = Visitor._meta.db_table
+
+# (label, role, url). Admin requests without any filter read the whole table by
+# definition (the list is not paginated and the department breakdown counts
+# every visit), so only the filtered, site-scoped and director-scoped shapes are
+# checked. "site" is an admin of one site, "admin" sees every site.
+ENDPOINTS = [
+    ('list site', 'site', '/api/visitors/'),
+    ('list site status', 'site', '/api/visitors/?status=checked-in'),
+    ('list site search', 'site', '/api/visitors/?search=visitor'),
+    ('list ?site=', 'admin', '/api/visitors/?site={site}'),
+    ('stats site year', 'site', '/api/visitors/stats/?period=year'),
+    ('department_stats site', 'site', '/api/visitors/department_stats/'),
+    ('summary site', 'site', '/api/visitors/summary/'),
+    ('list director', 'director', '/api/visitors/'),
+    ('list status=checked-in', 'admin', '/api/visitors/?status=checked-in'),
+    ('list status=pre-registered', 'admin', '/api/visitors/?status=pre-registered'),
+    ('list director status', 'director', '/api/visitors/?status=checked-in'),
+    ('list director search', 'director', '/api/visitors/?search=visitor'),
+    ('stats week', 'admin', '/api/visitors/stats/?period=week'),
+    ('stats month', 'admin', '/api/visitors/stats/?period=month'),
+    ('stats director year', 'director', '/api/visitors/stats/?period=year'),
+    ('department_stats director', 'director', '/api/visitors/department_stats/'),
+    ('summary director', 'director', '/api/visitors/summary/'),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large visitors dataset in a rolled-back transaction, call each visitors endpoint "
+        "and EXPLAIN its queries; fails if any of them scans the visitors table sequentially."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--departments', type=int, default=20)
+        # Reading all of one site is reading a share of the table; when that
+        # share is large (a tenth or more), Postgres rightly prefers a
+        # sequential scan, as it does for all of a single-site install.
+        parser.add_argument('--sites', type=int, default=20, help="Sites the departments are spread over")
+        parser.add_argument('--verbose-plans', action='store_true', help="Print every plan")
+
+    def handle(self, *args, **options):
+        failures = []
+        try:
+            with transaction.atomic():
+                users = self.seed(options['rows'], options['departments'], options['sites'])
+                for label, role, url in ENDPOINTS:
+                    url = url.format(site=users['site'].site_id)
+                    failures.extend(self.check_endpoint(label, users[role], url, options['verbose_plans']))
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError("Sequential scans on {}: {}".format(TABLE, ', '.join(failures)))
+        self.stdout.write(self.style.SUCCESS(f"All {len(ENDPOINTS)} visitor queries use an index"))
+
+    def seed(self, rows, department_count, site_count):
+        sites = Site.objects.bulk_create([
+            Site(name=f'Explain Site {i}', code=f'explain-{i}') for i in range(site_count)
+        ])
+        departments = Department.objects.bulk_create([
+            Department(name=f'Explain Department {i}', site=sites[i % site_count]) for i in range(department_count)
+        ])
+        admin = User.objects.create(username='explain-admin', email='explain-admin@example.com', role='admin')
+        site_admin = User.objects.create(
+            username='explain-site-admin', email='explain-site-admin@example.com', role='admin', site=sites[0],
+        )
+        director = User.objects.create(
+            username='explain-director', email='explain-director@example.com',
+            role='director', department=departments[0], site=sites[0],
+        )
+
+        # Mostly finished visits spread over three years, with a small active tail.
+        today = timezone.now().date()
+        rng = random.Random(0)
+        statuses = ['checked-out'] * 18 + ['checked-in', 'pre-registered']
+        batch = []
+        for i in range(rows):
+            department = rng.choice(departments)
+            batch.append(Visitor(
+                name=f'Visitor {i}', phone='0000000000', purpose='Meeting', host='Host',
+                department=department, department_name=department.name, site_id=department.site_id,
+                status=rng.choice(statuses),
+                visit_date=today - timedelta(days=rng.randrange(3 * 365)),
+            ))
+            if len(batch) == 5000:
+                Visitor.objects.bulk_create(batch)
+                batch = []
+        Visitor.objects.bulk_create(batch)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return {'admin': admin, 'site': site_admin, 'director': director}
+
+    def check_endpoint(self, label, user, url, verbose):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"{label}: GET {url} returned {response.status_code}")
+
+        failures = []
+        seen = set()
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if TABLE not in sql or not sql.lstrip().upper().startswith('SELECT') or sql in seen:
+                continue
+            seen.add(sql)
+            plan = self.explain(sql)
+            if verbose:
+                self.stdout.write(f"-- {label}\n{sql}\n{plan}\n")
+            if self.is_sequential_scan(plan):
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"{label}: sequential scan\n{sql}\n{plan}"))
+        if label not in failures:
+            self.stdout.write(f"{label}: ok")
+        return failures
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                return '\n'.join(row[-1] for row in cursor.fetchall())
+            cursor.execute('EXPLAIN ' + sql)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def is_sequential_scan(self, plan):
+        for line in plan.splitlines():
+            line = line.strip()
+            if connection.vendor == 'sqlite':
+                # "SCAN visitors_visitor" without "USING ... INDEX" is a table scan.
+                if line.startswith(f'SCAN {TABLE}') and 'INDEX' not in line:
+                    return True
+            elif 'Seq Scan on ' in line:
+                # On a partitioned table, pruning already narrowed a monthly
+                # partition scan down to the requested dates, so only the plain
+                # table and the catch-all default partition count. Postgres
+                # also always reads single-page tables directly.
+                relation = line.split('Seq Scan on ', 1)[1].split()[0]
+                if relation in (TABLE, DEFAULT_PARTITION) and self.page_count(relation) > 1:
+                    return True
+        return False
+
+    def page_count(self, relation):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT relpages FROM pg_class WHERE oid = %s::regclass', [relation])
+            return cursor.fetchone()[0]
@@ -0,0 +1,209 @@
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from .bench_db_connections import percentile
+
+DEFAULT_PATHS = [
+    '/api/visitors/summary/',
+    '/api/visitors/stats/?period=year',
+    '/api/visitors/department_stats/',
+    '/api/departments/',
+    '/api/visitors/?status=checked-in',
+]
+
+# How each mode of --compare is served: the sync DRF views on gunicorn sync
+# workers, and the async views on uvicorn.
+SERVERS = {
+    'wsgi': (['gunicorn', 'backend.wsgi:application', '--workers', '{workers}', '--bind', '127.0.0.1:{port}'],
+             {'ASYNC_VIEWS': 'False'}),
+    'asgi': (['uvicorn', 'backend.asgi:application', '--workers', '{workers}', '--port', '{port}',
+              '--no-access-log'],
+             {'ASYNC_VIEWS': 'True'}),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the read endpoints (visitor list, dashboard stats, department list) over HTTP and "
+        "report throughput and latency percentiles. Point --url at a running server, or use --compare "
+        "to start gunicorn (sync views) and uvicorn (async views, ASYNC_VIEWS=True) in turn with the "
+        "same number of workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of a running server")
+        parser.add_argument('--compare', action='store_true', help="Start and test a WSGI and an ASGI server")
+        parser.add_argument('--workers', type=int, default=2, help="Server worker processes, with --compare")
+        parser.add_argument('--concurrency', type=int, default=32, help="Concurrent clients")
+        parser.add_argument('--duration', type=float, default=15.0, help="Seconds per run")
+        parser.add_argument('--path', action='append', dest='paths', help="Path to request; repeatable")
+        parser.add_argument('--user', help="Email of the user to authenticate as (default: first superuser)")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        token = self.token(options['user'])
+        paths = options['paths'] or DEFAULT_PATHS
+        if options['compare']:
+            results = [self.serve_and_run(mode, token, paths, options) for mode in SERVERS]
+        else:
+            results = [self.run(options['url'], options['url'], token, paths, options)]
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+        else:
+            self.print_results(results, options)
+
+    def token(self, email):
+        users = User.objects.filter(is_active=True)
+        user = users.filter(email=email).first() if email else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("No user to authenticate as; create a superuser or pass --user")
+        return str(AccessToken.for_user(user))
+
+    def serve_and_run(self, mode, token, paths, options):
+        command, env = SERVERS[mode]
+        port = free_port()
+        command = [part.format(workers=options['workers'], port=port) for part in command]
+        server = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=dict(os.environ, **env),
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        url = f'http://127.0.0.1:{port}'
+        try:
+            self.wait_until_up(server, url, token, paths[0])
+            return self.run(mode, url, token, paths, options)
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    def wait_until_up(self, server, url, token, path, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Server exited with {server.returncode}:\n{server.stderr.read()}")
+            try:
+                status, _ = self.request(self.connect(url), path, token)
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f"Server at {url} did not answer {path} within {timeout}s")
+
+    def connect(self, url):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(parts.hostname, parts.port, timeout=30)
+
+    def request(self, connection, path, token):
+        connection.request('GET', path, headers={'Authorization': f'Bearer {token}'})
+        response = connection.getresponse()
+        body = response.read()
+        return response.status, body
+
+    def run(self, mode, url, token, paths, options):
+        latencies = {path: [] for path in paths}
+        errors = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(options['concurrency'] + 1)
+        stop = threading.Event()
+
+        def client(worker):
+            connection = self.connect(url)
+            local = {path: [] for path in paths}
+            rng = random.Random(worker)
+            barrier.wait()
+            while not stop.is_set():
+                path = rng.choice(paths)
+                start = time.perf_counter()
+                try:
+                    status, _ = self.request(connection, path, token)
+                except (OSError, http.client.HTTPException) as exc:
+                    connection.close()
+                    connection = self.connect(url)
+                    with lock:
+                        errors.append(f'{path}: {exc!r}')
+                    continue
+                elapsed = time.perf_counter() - start
+                if status != 200:
+                    with lock:
+                        errors.append(f'{path}: HTTP {status}')
+                    continue
+                local[path].append(elapsed)
+            connection.close()
+            with lock:
+                for path, values in local.items():
+                    latencies[path].extend(values)
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        every = [value for values in latencies.values() for value in values]
+        return {
+            'mode': mode,
+            'concurrency': options['concurrency'],
+            'requests': len(every),
+            'errors': len(errors),
+            'first_error': errors[0] if errors else None,
+            'throughput': len(every) / elapsed if elapsed else 0.0,
+            'latency_ms': self.summarize(every),
+            'paths': {path: self.summarize(values) for path, values in latencies.items()},
+        }
+
+    def summarize(self, values):
+        return {
+            'mean': statistics.mean(values) * 1000 if values else 0.0,
+            'p50': percentile(values, 50) * 1000,
+            'p95': percentile(values, 95) * 1000,
+            'p99': percentile(values, 99) * 1000,
+            'max': max(values, default=0.0) * 1000,
+        }
+
+    def print_results(self, results, options):
+        header = f"{'mode':<24} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'errors':>6}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for r in results:
+            latency = r['latency_ms']
+            self.stdout.write(
+                f"{r['mode']:<24} {r['throughput']:>8.1f} {latency['p50']:>8.2f} {latency['p95']:>8.2f} "
+                f"{latency['p99']:>8.2f} {latency['max']:>8.2f} {r['errors']:>6}"
+            )
+            for path, summary in r['paths'].items():
+                self.stdout.write(
+                    f"  {path:<40} p50 {summary['p50']:>8.2f}  p95 {summary['p95']:>8.2f}  p99 {summary['p99']:>8.2f}"
+                )
+            if r['first_error']:
+                self.stdout.write(self.style.WARNING(f"  first error: {r['first_error']}"))
+        self.stdout.write(
+            f"{options['concurrency']} clients for {options['duration']:g}s per run; latencies in ms"
+        )
@@ -0,0 +1,74 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from visitors import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage monthly range partitions of the visitors table on PostgreSQL: convert the "
+        "existing table, create upcoming partitions and check that date filters prune partitions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--convert', action='store_true',
+            help="Rebuild the existing visitors table as a partitioned table (takes an exclusive lock)"
+        )
+        parser.add_argument(
+            '--keep-old', action='store_true',
+            help="With --convert, keep the original table as visitors_visitor_unpartitioned"
+        )
+        parser.add_argument('--months-ahead', type=int, help="Default: VISITOR_PARTITION_MONTHS_AHEAD")
+        parser.add_argument(
+            '--check', action='store_true',
+            help="EXPLAIN a visit_date range query and fail if it scans partitions outside the range"
+        )
+        parser.add_argument('--since', help="Start of the --check range (YYYY-MM-DD, default: first of this month)")
+        parser.add_argument('--until', help="End of the --check range (YYYY-MM-DD, default: first of next month)")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not partitioning.is_supported(connection):
+            self.stdout.write(
+                f"Partitioning needs PostgreSQL; '{options['database']}' uses {connection.vendor}, "
+                "so the visitors table stays unpartitioned."
+            )
+            return
+
+        if options['convert']:
+            copied = partitioning.convert_to_partitioned(
+                months_ahead=options['months_ahead'],
+                keep_old=options['keep_old'],
+                connection=connection,
+            )
+            self.stdout.write(self.style.SUCCESS(f"Visitors table is partitioned ({copied} row(s) copied)"))
+
+        if not partitioning.is_partitioned(connection):
+            raise CommandError("The visitors table is not partitioned yet; run with --convert first")
+
+        created = partitioning.ensure_partitions(months_ahead=options['months_ahead'], connection=connection)
+        for name in created:
+            self.stdout.write(f"Created partition {name}")
+
+        if options['check']:
+            self.check_pruning(connection, options)
+
+    def check_pruning(self, connection, options):
+        try:
+            this_month = partitioning.month_start(timezone.now().date())
+            since = date.fromisoformat(options['since']) if options['since'] else this_month
+            until = date.fromisoformat(options['until']) if options['until'] else partitioning.add_months(this_month, 1)
+        except ValueError:
+            raise CommandError("--since and --until must be dates in YYYY-MM-DD format")
+
+        scanned, expected = partitioning.check_pruning(since, until, connection=connection)
+        self.stdout.write(f"visit_date in [{since}, {until}) scans: {', '.join(sorted(scanned)) or 'nothing'}")
+        extra = scanned - expected
+        if extra:
+            raise CommandError(f"Partition pruning failed; also scanned {', '.join(sorted(extra))}")
+        self.stdout.write(self.style.SUCCESS("Partition pruning OK"))
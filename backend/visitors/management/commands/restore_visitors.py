@@ -0,0 +1,52 @@
+import glob
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from visitors.archive import restore_from_table, restore_from_file
+
+
+def _parse_date(value, option):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"{option} must be a date in YYYY-MM-DD format")
+
+
+class Command(BaseCommand):
+    help = "Move archived visits back into the visitors table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Restore archived visits dated on or after this day (YYYY-MM-DD)")
+        parser.add_argument('--until', help="Restore archived visits dated before this day (YYYY-MM-DD)")
+        parser.add_argument(
+            '--file', action='append', default=[],
+            help="Restore from an archive file or directory of files instead of the archive table"
+        )
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        if options['file']:
+            paths = []
+            for path in options['file']:
+                if os.path.isdir(path):
+                    paths.extend(sorted(glob.glob(os.path.join(path, '*.ndjson.gz'))))
+                elif os.path.exists(path):
+                    paths.append(path)
+                else:
+                    raise CommandError(f"No such archive file: {path}")
+            restored = 0
+            for path in paths:
+                count = restore_from_file(path, batch_size=options['batch_size'])
+                self.stdout.write(f"{path}: {count} visit(s)")
+                restored += count
+        else:
+            restored = restore_from_table(
+                since=_parse_date(options['since'], '--since'),
+                until=_parse_date(options['until'], '--until'),
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} visit(s)"))
@@ -0,0 +1,32 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from visitors.reports import snapshot_dir, snapshot_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the month and year visit reports of the closed days (JSON and CSV, for all departments "
+        "and each one) to REPORT_SNAPSHOT_DIR. Run once a day, after midnight."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--through', help="Last closed day to include (YYYY-MM-DD; default: yesterday)")
+        parser.add_argument('--rebuild', action='store_true', help="Rewrite every period, not only open ones")
+
+    def handle(self, *args, **options):
+        through = None
+        if options['through']:
+            try:
+                through = date.fromisoformat(options['through'])
+            except ValueError:
+                raise CommandError("--through must be a date in YYYY-MM-DD format")
+
+        written = snapshot_reports(through=through, rebuild=options['rebuild'])
+        if not written:
+            self.stdout.write("No closed days with visits to snapshot")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote the reports of {len(written)} period(s) to {snapshot_dir()}: {', '.join(written)}"
+        ))
@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-19 08:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('departments', '0001_initial'),
+        ('visitors', '0007_visitor_address_visitor_organization'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedVisitor',
+            fields=[
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('phone', models.CharField(max_length=20)),
+                ('purpose', models.TextField()),
+                ('host', models.CharField(max_length=100)),
+                ('organization', models.CharField(blank=True, max_length=100)),
+                ('address', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pre-registered', 'Pre-Registered'), ('checked-in', 'Checked In'), ('checked-out', 'Checked Out')], default='pre-registered', max_length=15)),
+                ('visit_date', models.DateField()),
+                ('check_in_time', models.DateTimeField(blank=True, null=True)),
+                ('check_out_time', models.DateTimeField(blank=True, null=True)),
+                ('avatar', models.URLField(blank=True, null=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_visitors', to=settings.AUTH_USER_MODEL)),
+                ('department', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_visitors', to='departments.department')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['visit_date'], name='visitors_ar_visit_d_50d395_idx'), models.Index(fields=['department'], name='visitors_ar_departm_f12b7e_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyVisitCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('visit_date', models.DateField()),
+                ('status', models.CharField(choices=[('pre-registered', 'Pre-Registered'), ('checked-in', 'Checked In'), ('checked-out', 'Checked Out')], max_length=15)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('department', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_visit_counts', to='departments.department')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['visit_date', 'department'], name='visitors_da_visit_d_cbbe40_idx')],
+            },
+        ),
+    ]
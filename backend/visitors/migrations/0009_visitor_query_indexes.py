@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-19 08:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('departments', '0001_initial'),
+        ('visitors', '0008_archivedvisitor_dailyvisitcount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='visitor',
+            name='visitors_vi_departm_c7cb1b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(fields=['department', '-visit_date'], include=('status', 'id'), name='visitor_dept_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(condition=models.Q(('status__in', ['pre-registered', 'checked-in'])), fields=['status', '-visit_date'], name='visitor_active_status_idx'),
+        ),
+    ]
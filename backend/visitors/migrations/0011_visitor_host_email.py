@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0010_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedvisitor',
+            name='host_email',
+            field=models.EmailField(blank=True, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='visitor',
+            name='host_email',
+            field=models.EmailField(blank=True, max_length=254),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-19 08:38
+
+from django.db import migrations, models
+
+
+def copy_department_names(apps, schema_editor):
+    Department = apps.get_model('departments', 'Department')
+    for model in ('Visitor', 'ArchivedVisitor'):
+        Visit = apps.get_model('visitors', model)
+        for pk, name in Department.objects.values_list('id', 'name'):
+            Visit.objects.filter(department_id=pk).update(department_name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('departments', '0001_initial'),
+        ('visitors', '0011_visitor_host_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedvisitor',
+            name='department_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='visitor',
+            name='department_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.RunPython(copy_department_names, migrations.RunPython.noop),
+    ]
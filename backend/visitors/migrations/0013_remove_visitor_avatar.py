@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-19 08:39
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0012_visitor_department_name'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='archivedvisitor',
+            name='avatar',
+        ),
+        migrations.RemoveField(
+            model_name='visitor',
+            name='avatar',
+        ),
+    ]
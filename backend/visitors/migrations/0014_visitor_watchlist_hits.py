@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0013_remove_visitor_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedvisitor',
+            name='watchlist_hits',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='visitor',
+            name='watchlist_hits',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-19 09:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('departments', '0004_department_site'),
+        ('tenancy', '0001_initial'),
+        ('visitors', '0014_visitor_watchlist_hits'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='visitor',
+            name='visitor_active_status_idx',
+        ),
+        migrations.AddField(
+            model_name='archivedvisitor',
+            name='site',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_visitors', to='tenancy.site'),
+        ),
+        migrations.AddField(
+            model_name='dailyvisitcount',
+            name='site',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='daily_visit_counts', to='tenancy.site'),
+        ),
+        migrations.AddField(
+            model_name='visitor',
+            name='site',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='visitors', to='tenancy.site'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedvisitor',
+            index=models.Index(fields=['site', 'visit_date'], name='archived_site_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyvisitcount',
+            index=models.Index(fields=['site', 'visit_date'], name='daily_count_site_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(fields=['site', '-visit_date'], include=('status', 'department', 'id'), name='visitor_site_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(condition=models.Q(('status__in', ['pre-registered', 'checked-in'])), fields=['status', 'site', '-visit_date'], name='visitor_active_status_site_idx'),
+        ),
+    ]
@@ -1,20 +1,27 @@
 from django.db import models
 from accounts.models import User
-from departments.models import Department 
-
-class Visitor(models.Model):
-    STATUS_CHOICES = [
-        ('pre-registered', 'Pre-Registered'),
-        ('checked-in', 'Checked In'),
-        ('checked-out', 'Checked Out'),
-    ]
-    
+from departments.models import Department
+from tenancy.models import Site
+
+
+STATUS_CHOICES = [
+    ('pre-registered', 'Pre-Registered'),
+    ('checked-in', 'Checked In'),
+    ('checked-out', 'Checked Out'),
+]
+
+
+class VisitRecord(models.Model):
+    """Fields shared by live visits and archived ones."""
+    STATUS_CHOICES = STATUS_CHOICES
+
     name = models.CharField(max_length=100)
     email = models.EmailField(null=True, blank=True)
     phone = models.CharField(max_length=20)
     purpose = models.TextField()
-    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, related_name='visitors')
     host = models.CharField(max_length=100)
+    # Where arrival notifications go; when empty the host name is matched to a user.
+    host_email = models.EmailField(blank=True)
     organization = models.CharField(max_length=100, blank=True)
     address = models.TextField(blank=True)
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='pre-registered')
@@ -22,19 +29,133 @@ class Visitor(models.Model):
     check_in_time = models.DateTimeField(null=True, blank=True)
     check_out_time = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    avatar = models.URLField(blank=True, null=True)
-    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_visitors')
-    
+    # Copy of department.name, so lists and searches need no join; renames are
+    # propagated by visitors.signals.
+    department_name = models.CharField(max_length=100, blank=True)
+    # Watchlist entries matched when the visitor was last screened (see
+    # watchlist.screening); empty when there was no match.
+    watchlist_hits = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        abstract = True
+
     def __str__(self):
         return f"{self.name} - {self.get_status_display()}"
-    
+
+
+class Visitor(VisitRecord):
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, related_name='visitors')
+    # The department's site, copied like its name, so site scoping needs no
+    # join; visits without a department keep their creator's site. Indexed by
+    # visitor_site_date_idx.
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, related_name='visitors', db_index=False)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_visitors')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_department_id = instance.__dict__.get('department_id')
+        return instance
+
     def save(self, *args, **kwargs):
-        if not self.avatar and self.name:
-            self.avatar = f"https://ui-avatars.com/api/?name={self.name.replace(' ', '+')}&background=random"
+        if self.department_id is None:
+            self.department_name = ''
+        elif Visitor.department.is_cached(self):
+            self.department_name = self.department.name
+            self.site_id = self.department.site_id or self.site_id
+        elif self.department_id != getattr(self, '_loaded_department_id', None):
+            name, site_id = Department.objects.filter(pk=self.department_id).values_list('name', 'site_id').first() or ('', None)
+            self.department_name = name
+            self.site_id = site_id or self.site_id
         super().save(*args, **kwargs)
+        self._loaded_department_id = self.department_id
 
     class Meta:
+        # Matched to the queries in views.py; `manage.py explain_visitor_queries`
+        # checks that none of them falls back to a sequential scan.
         indexes = [
+            # Unfiltered list ordering and the stats date ranges.
             models.Index(fields=['visit_date']),
+            # The same for one site: site equality, then visit_date
+            # range/order; status, department and id ride along so the
+            # counts and the department breakdown read the index alone.
+            models.Index(
+                fields=['site', '-visit_date'],
+                include=['status', 'department', 'id'],
+                name='visitor_site_date_idx',
+            ),
+            # Director-scoped list, stats and summary: department equality,
+            # then visit_date range/order; status and id ride along so the
+            # counts can be answered from the index alone.
+            models.Index(
+                fields=['department', '-visit_date'],
+                include=['status', 'id'],
+                name='visitor_dept_date_idx',
+            ),
+            # Status filter on the list and the summary counts only ever look
+            # for visitors that are still expected or on site. Status equality
+            # comes first in every such read, so it leads; the site follows,
+            # and the same index serves one site and all of them.
+            models.Index(
+                fields=['status', 'site', '-visit_date'],
+                condition=models.Q(status__in=['pre-registered', 'checked-in']),
+                name='visitor_active_status_site_idx',
+            ),
+        ]
+
+
+class ArchivedVisitor(VisitRecord):
+    """A visit moved out of ``Visitor`` by the retention job (see ``visitors.archive``)."""
+    # Keeps the original primary key so a restore puts the row back unchanged.
+    id = models.BigIntegerField(primary_key=True)
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, related_name='archived_visitors')
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, related_name='archived_visitors', db_index=False)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='archived_visitors')
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['visit_date']),
+            models.Index(fields=['site', 'visit_date'], name='archived_site_date_idx'),
             models.Index(fields=['department']),
-        ]
\ No newline at end of file
+        ]
+
+
+class DailyVisitCount(models.Model):
+    """Per-day visit counts kept for archived visits so the stats endpoints stay complete."""
+    visit_date = models.DateField()
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, related_name='daily_visit_counts')
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, related_name='daily_visit_counts', db_index=False)
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['visit_date', 'department']),
+            models.Index(fields=['site', 'visit_date'], name='daily_count_site_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.visit_date} {self.site_id} {self.department_id} {self.status}: {self.count}"
+
+
+class IdempotencyRecord(models.Model):
+    """Stored outcome of a request sent with an ``Idempotency-Key`` header (see ``visitors.idempotency``)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_records')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    # Null while the first request is still being processed; created_at is
+    # when it claimed the key.
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
@@ -0,0 +1,204 @@
+"""
+Arrival notifications for hosts.
+
+``notify_arrival`` is called when a visitor checks in. It only appends to an
+in-process buffer once the transaction commits; arrivals for the same host
+within ``HOST_NOTIFICATION_WINDOW`` seconds are coalesced into one message,
+which is then handed to the background task queue and delivered by every sink
+in ``HOST_NOTIFICATION_SINKS``.
+
+A sink is any class with ``send(notification)``; it may raise to have the
+task retried. ``MemorySink`` is a stand-in for tests and local runs.
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Concat, Lower
+
+from accounts.models import User
+
+logger = logging.getLogger(__name__)
+
+# Longer batches are summarised as "... and N more".
+MAX_LISTED_ARRIVALS = 50
+
+
+class EmailSink:
+    def send(self, notification):
+        if not notification['email']:
+            return
+        send_mail(
+            notification['subject'],
+            notification['body'],
+            settings.DEFAULT_FROM_EMAIL,
+            [notification['email']],
+        )
+
+
+class WebhookSink:
+    def send(self, notification):
+        url = settings.HOST_NOTIFICATION_WEBHOOK_URL
+        if not url:
+            return
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(notification).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=settings.HOST_NOTIFICATION_TIMEOUT) as response:
+            response.read()
+
+
+class MemorySink:
+    """Keeps notifications in ``MemorySink.outbox`` instead of sending them."""
+    outbox = []
+
+    def send(self, notification):
+        self.outbox.append(notification)
+
+
+def resolve_host_email(host):
+    """Email of the staff user whose full name or username matches ``host``, if any."""
+    name = ' '.join(host.split()).lower()
+    if not name:
+        return ''
+    user = (
+        User.objects.annotate(full_name=Lower(Concat('first_name', Value(' '), 'last_name')))
+        .filter(is_active=True)
+        .filter(full_name=name)
+        .only('email')
+        .first()
+    ) or User.objects.filter(is_active=True, username__iexact=name).only('email').first()
+    return user.email if user else ''
+
+
+def build_notification(host, email, arrivals):
+    names = [
+        f"{a['name']} ({a['organization']})" if a.get('organization') else a['name']
+        for a in arrivals[:MAX_LISTED_ARRIVALS]
+    ]
+    if len(arrivals) > MAX_LISTED_ARRIVALS:
+        names.append(f"... and {len(arrivals) - MAX_LISTED_ARRIVALS} more")
+    if len(arrivals) == 1:
+        subject = f"Your visitor {arrivals[0]['name']} has arrived"
+    else:
+        subject = f"{len(arrivals)} of your visitors have arrived"
+    body = f"Hello {host},\n\nThe following visitor(s) have checked in at the front desk:\n\n"
+    body += '\n'.join(f"- {name}" for name in names)
+    return {
+        'host': host,
+        'email': email,
+        'subject': subject,
+        'body': body,
+        'arrivals': arrivals,
+    }
+
+
+class ArrivalCoalescer:
+    """
+    Buffers arrivals per host and calls ``flush(host, email, arrivals)`` once
+    ``window`` seconds have passed since the first buffered arrival.
+    """
+
+    def __init__(self, flush, window):
+        self.flush = flush
+        self.window = window
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def add(self, host, email, arrival):
+        key = (' '.join(host.split()).lower(), email.lower())
+        with self._condition:
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = {
+                    'due': time.monotonic() + self.window,
+                    'host': host,
+                    'email': email,
+                    'arrivals': [],
+                }
+                self._condition.notify()
+            batch['arrivals'].append(arrival)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='arrival-coalescer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush_all)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                now = time.monotonic()
+                next_due = min(batch['due'] for batch in self._pending.values())
+                if next_due > now:
+                    self._condition.wait(timeout=next_due - now)
+                    continue
+                ready = [key for key, batch in self._pending.items() if batch['due'] <= now]
+                batches = [self._pending.pop(key) for key in ready]
+            self._flush_batches(batches)
+
+    def _flush_batches(self, batches):
+        for batch in batches:
+            try:
+                self.flush(batch['host'], batch['email'], batch['arrivals'])
+            except Exception:
+                logger.exception("Could not queue arrival notification for %s", batch['host'])
+
+    def flush_all(self):
+        with self._condition:
+            batches = list(self._pending.values())
+            self._pending.clear()
+        self._flush_batches(batches)
+
+
+def queue_notification(host, email, arrivals):
+    from .tasks import deliver_host_notification
+
+    for sink in settings.HOST_NOTIFICATION_SINKS:
+        deliver_host_notification.delay(sink, host, email, arrivals)
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+
+def get_coalescer():
+    global _coalescer
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = ArrivalCoalescer(queue_notification, settings.HOST_NOTIFICATION_WINDOW)
+    return _coalescer
+
+
+def notify_arrival(visitor):
+    """Tell ``visitor.host`` about the arrival; returns immediately."""
+    if not settings.HOST_NOTIFICATIONS_ENABLED or not visitor.host:
+        return
+    arrival = {
+        'id': visitor.pk,
+        'name': visitor.name,
+        'organization': visitor.organization,
+        'purpose': visitor.purpose,
+        'check_in_time': visitor.check_in_time.isoformat() if visitor.check_in_time else None,
+    }
+    host, email = visitor.host, visitor.host_email or ''
+
+    def add():
+        if settings.HOST_NOTIFICATION_WINDOW <= 0:
+            queue_notification(host, email, [arrival])
+        else:
+            get_coalescer().add(host, email, arrival)
+
+    transaction.on_commit(add)
@@ -0,0 +1,283 @@
+"""
+Monthly range partitioning of ``visitors_visitor`` on PostgreSQL.
+
+The Django model is unchanged: the table keeps its ``id`` sequence, columns,
+indexes and foreign keys, but becomes ``PARTITION BY RANGE (visit_date)`` with
+one partition per month plus a default partition that catches anything outside
+the ranges created so far. Postgres requires the partition key in the primary
+key, so the primary key becomes ``(id, visit_date)``; ``id`` stays unique
+because it is still drawn from a single sequence. Other tables therefore
+cannot hold foreign keys to ``visitors_visitor`` once it is partitioned.
+
+SQLite and other backends keep the plain table; every entry point here is a
+no-op (or reports as much) when the connection is not PostgreSQL.
+"""
+import json
+from datetime import date
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+from .models import Visitor
+
+TABLE = Visitor._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def is_supported(connection=None):
+    connection = connection or default_connection
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(connection=None):
+    connection = connection or default_connection
+    if not is_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+            """,
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def list_partitions(connection=None):
+    """Names of the partitions currently attached to the visitors table."""
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits i
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)
+            ORDER BY child.relname
+            """,
+            [TABLE],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _create_partition(cursor, month, existing):
+    """
+    Create the partition for ``month`` unless it already exists.
+
+    Rows for that month may already sit in the default partition, and Postgres
+    refuses to create an overlapping partition while they are there. The
+    partition is therefore built as a standalone table, filled from the default
+    partition and only then attached.
+    """
+    name = partition_name(month)
+    if name in existing:
+        return False
+    qn = cursor.db.ops.quote_name
+    start, end = month, add_months(month, 1)
+    cursor.execute(
+        f'CREATE TABLE {qn(name)} (LIKE {qn(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    if DEFAULT_PARTITION in existing:
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {qn(DEFAULT_PARTITION)}
+                WHERE visit_date >= %s AND visit_date < %s
+                RETURNING *
+            )
+            INSERT INTO {qn(name)} SELECT * FROM moved
+            """,
+            [start, end],
+        )
+    cursor.execute(
+        f'ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)',
+        [start, end],
+    )
+    existing.add(name)
+    return True
+
+
+def ensure_partitions(months_ahead=None, since=None, connection=None):
+    """
+    Make sure monthly partitions exist from ``since`` (default: this month)
+    through ``months_ahead`` months from now. Returns the names created.
+    """
+    connection = connection or default_connection
+    if not is_partitioned(connection):
+        return []
+    if months_ahead is None:
+        months_ahead = settings.VISITOR_PARTITION_MONTHS_AHEAD
+    this_month = month_start(timezone.now().date())
+    month = month_start(since) if since else this_month
+    last = add_months(this_month, months_ahead)
+
+    created = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        existing = set(list_partitions(connection))
+        while month <= last:
+            if _create_partition(cursor, month, existing):
+                created.append(partition_name(month))
+            month = add_months(month, 1)
+    return created
+
+
+def convert_to_partitioned(months_ahead=None, keep_old=False, connection=None):
+    """
+    Rebuild ``visitors_visitor`` as a partitioned table, copying every row.
+
+    Runs in a single transaction holding an exclusive lock on the table, so
+    it should be run during a maintenance window. Returns the number of rows
+    copied.
+    """
+    connection = connection or default_connection
+    if not is_supported(connection):
+        raise ValueError("Partitioning is only supported on PostgreSQL")
+    if is_partitioned(connection):
+        return 0
+    if months_ahead is None:
+        months_ahead = settings.VISITOR_PARTITION_MONTHS_AHEAD
+    qn = connection.ops.quote_name
+    old = f'{TABLE}_unpartitioned'
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE contype = 'f' AND confrelid = %s::regclass",
+            [TABLE],
+        )
+        referencing = [row[0] for row in cursor.fetchall()]
+        if referencing:
+            raise ValueError(
+                f"Cannot partition {TABLE}: referenced by foreign keys {', '.join(referencing)}"
+            )
+
+        # Remember indexes and foreign keys so they can be recreated under the same names.
+        cursor.execute(
+            """
+            SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = %s::regclass AND NOT x.indisprimary
+            """,
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute('SELECT COALESCE(MAX(id), 0), MIN(visit_date) FROM ' + qn(TABLE))
+        max_id, first_day = cursor.fetchone()
+
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+            [TABLE],
+        )
+        primary_key = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE {qn(TABLE)} RENAME TO {qn(old)}')
+        cursor.execute(f'ALTER TABLE {qn(old)} RENAME CONSTRAINT {qn(primary_key)} TO {qn(old + "_pkey")}')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {qn(name)}')
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE {qn(old)} DROP CONSTRAINT {qn(name)}')
+
+        # The id column becomes a plain column fed by a sequence owned by the
+        # new table, which keeps handing out ids after the highest existing one.
+        # Tables created by older Django versions use serial columns, whose
+        # sequence is simply handed over.
+        cursor.execute(f'ALTER TABLE {qn(old)} ALTER COLUMN id DROP IDENTITY IF EXISTS')
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [old, 'id'])
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            f'CREATE TABLE {qn(TABLE)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+            f'INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE (visit_date)'
+        )
+        if sequence is None:
+            sequence = qn(f'{TABLE}_id_seq')
+            cursor.execute(f'CREATE SEQUENCE {sequence}')
+            cursor.execute('SELECT setval(%s, %s, %s)', [sequence, max(max_id, 1), max_id > 0])
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {qn(TABLE)}.id')
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)",
+            [sequence],
+        )
+        cursor.execute(f'ALTER TABLE {qn(TABLE)} ADD PRIMARY KEY (id, visit_date)')
+        # The definitions were read before the rename, so they already point at the new table.
+        for name, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} {definition}')
+
+        cursor.execute(f'CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(TABLE)} DEFAULT')
+        existing = {DEFAULT_PARTITION}
+        this_month = month_start(timezone.now().date())
+        month = month_start(first_day) if first_day else this_month
+        while month <= add_months(this_month, months_ahead):
+            _create_partition(cursor, month, existing)
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO {qn(TABLE)} SELECT * FROM {qn(old)}')
+        copied = cursor.rowcount
+        if not keep_old:
+            cursor.execute(f'DROP TABLE {qn(old)}')
+    return copied
+
+
+def _scanned_relations(plan):
+    relations = set()
+    if 'Relation Name' in plan:
+        relations.add(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        relations |= _scanned_relations(child)
+    return relations
+
+
+def check_pruning(since, until, connection=None):
+    """
+    EXPLAIN a ``visit_date`` range query and compare the partitions it scans
+    with the partitions that overlap the range.
+
+    Returns ``(scanned, expected)`` as sets of partition names; pruning works
+    when ``scanned`` is a subset of ``expected``.
+    """
+    connection = connection or default_connection
+    queryset = Visitor.objects.using(connection.alias).filter(visit_date__gte=since, visit_date__lt=until)
+    plan = json.loads(queryset.explain(format='json'))
+    # Depending on the driver and Django version, the EXPLAIN output is the
+    # list PostgreSQL returns or, re-dumped after the driver parsed it, its
+    # only element.
+    if isinstance(plan, list):
+        plan = plan[0]
+    plan = plan['Plan']
+    scanned = _scanned_relations(plan) - {TABLE}
+
+    partitions = set(list_partitions(connection))
+    expected = set()
+    month = month_start(since)
+    while month < until:
+        name = partition_name(month)
+        if name in partitions:
+            expected.add(name)
+        elif DEFAULT_PARTITION in partitions:
+            # Months without their own partition are stored in the default one.
+            expected.add(DEFAULT_PARTITION)
+        month = add_months(month, 1)
+    return scanned, expected
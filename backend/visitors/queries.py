@@ -0,0 +1,197 @@
+"""
+Read queries behind the visitor list and the dashboard endpoints.
+
+The sync ``VisitorViewSet`` and the async views in ``visitors.async_views``
+serve the same data. Each dashboard endpoint here is a ``*_queries()``
+function returning independent zero-argument callables, one per database
+query or snapshot read (see ``visitors.reports``), and a ``*_result()``
+function combining what they return. The viewset
+calls them one after another; the async views hand them to
+``backend.async_views.gather_queries()`` to run concurrently.
+"""
+from collections import Counter
+from datetime import timedelta
+from itertools import chain
+
+from django.db.models import CharField, Count, Q, Sum
+from django.db.models.functions import Cast, ExtractWeekDay, Trunc
+from django.utils import timezone
+
+from tenancy.scoping import scope_to_site, site_id_for
+from . import reports
+from .models import DailyVisitCount, Visitor
+
+DAY_NAMES = {
+    '1': 'Sunday',
+    '2': 'Monday',
+    '3': 'Tuesday',
+    '4': 'Wednesday',
+    '5': 'Thursday',
+    '6': 'Friday',
+    '7': 'Saturday'
+}
+
+
+def include_archived(params):
+    return params.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+
+def scope_visits(queryset, user, params=None):
+    # Filter by department if user is director; the department implies the site.
+    if user.role == 'director' and user.department_id:
+        return queryset.filter(department_id=user.department_id)
+    # Users of one site see its visits; the others may pick a site with ?site=.
+    return scope_to_site(queryset, site_id_for(user, params))
+
+
+def filter_visits(queryset, user, params):
+    queryset = scope_visits(queryset, user, params)
+
+    # Apply filters
+    status = params.get('status')
+    if status:
+        queryset = queryset.filter(status=status)
+
+    search = params.get('search')
+    if search:
+        queryset = queryset.filter(
+            Q(name__icontains=search) |
+            Q(email__icontains=search) |
+            Q(department_name__icontains=search)
+        )
+
+    return queryset.order_by('-visit_date')  # Changed from created_at to visit_date
+
+
+def archived_rollups(user, params=None):
+    """Daily counts kept for archived visits, scoped like the live queries."""
+    return scope_visits(DailyVisitCount.objects.all(), user, params)
+
+
+def stats_period(period):
+    """
+    ``(start date, bucket expression, bucket label, bucket of a date)`` of a
+    stats ``period``; the last gives in Python what the expression gives in SQL.
+    """
+    if period == 'week':
+        start_date = timezone.now() - timedelta(days=7)
+        bucket = Cast(ExtractWeekDay('visit_date'), output_field=CharField())
+        label = DAY_NAMES.get
+        bucket_of = lambda date: str(date.isoweekday() % 7 + 1)
+
+    elif period == 'month':
+        start_date = timezone.now() - timedelta(days=30)
+        bucket = Trunc('visit_date', 'day')
+        label = lambda date: date.strftime('%d')
+        bucket_of = lambda date: date
+
+    else:  # year
+        start_date = timezone.now() - timedelta(days=365)
+        bucket = Trunc('visit_date', 'month')
+        label = lambda date: date.strftime('%b')
+        bucket_of = lambda date: date.replace(day=1)
+    return start_date, bucket, label, bucket_of
+
+
+def run_queries(queries):
+    return [query() for query in queries]
+
+
+def snapshot_stats(user, params, first_day, last_day, bucket_of):
+    counts = Counter()
+    for day, visits in reports.daily_counts(reports.user_scope(user, params), first_day, last_day).items():
+        counts[bucket_of(day)] += visits
+    return [{'date': date, 'count': count} for date, count in counts.items()]
+
+
+def stats_queries(user, params):
+    start_date, bucket, _, bucket_of = stats_period(params.get('period', 'week'))
+    archived = include_archived(params)
+    queries = []
+    first_day, today = timezone.localdate(start_date), timezone.localdate()
+    if reports.covers(first_day, archived):
+        # Closed days come from the nightly snapshots, archived visits
+        # included; only today and later is counted in the database.
+        queries.append(lambda: snapshot_stats(user, params, first_day, today - timedelta(days=1), bucket_of))
+        start_date, archived = today, False
+    live = (
+        scope_visits(Visitor.objects.all(), user, params)
+        .filter(visit_date__gte=start_date)
+        .annotate(date=bucket)
+        .values('date')
+        .annotate(count=Count('id'))
+        .order_by('date')
+    )
+    queries.append(lambda: list(live))
+    if archived:
+        rollups = (
+            archived_rollups(user, params)
+            .filter(visit_date__gte=start_date)
+            .annotate(date=bucket)
+            .values('date')
+            .annotate(count=Sum('count'))
+        )
+        queries.append(lambda: list(rollups))
+    return queries
+
+
+def stats_result(params, *results):
+    _, _, label, _ = stats_period(params.get('period', 'week'))
+    counts = {}
+    for stat in chain.from_iterable(results):
+        counts[stat['date']] = counts.get(stat['date'], 0) + stat['count']
+    return [{
+        'date': label(date),
+        'count': count
+    } for date, count in sorted(counts.items())]
+
+
+def department_stats_queries(user, params):
+    live = scope_visits(Visitor.objects.all(), user, params).values('department__name').annotate(
+        count=Count('id')
+    ).order_by('-count')
+    queries = [lambda: list(live)]
+    if include_archived(params):
+        archived = archived_rollups(user, params).values('department__name').annotate(count=Sum('count'))
+        queries.append(lambda: list(archived))
+    return queries
+
+
+def department_stats_result(params, live, archived=None):
+    counts = {stat['department__name']: stat['count'] for stat in live}
+    if archived is not None:
+        for stat in archived:
+            name = stat['department__name']
+            counts[name] = counts.get(name, 0) + stat['count']
+        counts = dict(sorted(counts.items(), key=lambda item: -item[1]))
+    return [{
+        'department': department,
+        'count': count
+    } for department, count in counts.items()]
+
+
+def summary_queries(user, params):
+    queryset = scope_visits(Visitor.objects.all(), user, params)
+    queries = [
+        queryset.count,
+        queryset.filter(status='checked-in').count,
+        queryset.filter(status='pre-registered').count,
+    ]
+    if include_archived(params):
+        queries.append(lambda: archived_rollups(user, params).aggregate(
+            total=Sum('count'),
+            checked_in=Sum('count', filter=Q(status='checked-in')),
+            pre_registered=Sum('count', filter=Q(status='pre-registered')),
+        ))
+    return queries
+
+
+def summary_result(params, total, checked_in, pre_registered, archived=None):
+    summary = {
+        'total': total,
+        'checked_in': checked_in,
+        'pre_registered': pre_registered
+    }
+    for key, count in (archived or {}).items():
+        summary[key] += count or 0
+    return summary
@@ -0,0 +1,388 @@
+"""
+Nightly report snapshots.
+
+``snapshot_reports()`` (``manage.py snapshot_reports``, run once a day has
+closed) counts the visits of the closed days not yet snapshotted, per day,
+department and status, live and archived alike, and writes them under
+``REPORT_SNAPSHOT_DIR``:
+
+- ``data/<YYYY-MM>.json``: the counts of one calendar month;
+- ``<scope>/<period>.json`` and ``.csv``: the report of a month (``YYYY-MM``)
+  or a year (``YYYY``), for everything (scope ``all``), each site
+  (``site-<id>``) and each department (``department-<id>``);
+- ``manifest.json``: the last closed day included and the ETag of each report.
+
+A month or year in progress is rewritten each night and marked
+``"complete": false``; closed ones are written once. ``--rebuild`` writes them
+all again, e.g. after visits of past days were corrected or departments
+moved to another site.
+
+``ReportFileView`` serves the reports, closed ones with long-lived cache
+headers, and the dashboard stats (``visitors.queries.stats_queries``) take
+the closed days of their window from the monthly counts, so only today and
+later is counted in the database.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count, Min, Sum
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils import timezone
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from departments.models import Department
+from tenancy.models import Site
+from tenancy.scoping import site_id_for
+from .archive import retention_cutoff
+from .models import STATUS_CHOICES, DailyVisitCount, Visitor
+
+SCOPE_ALL = 'all'
+STATUSES = [status for status, _ in STATUS_CHOICES]
+FORMATS = {'json': 'application/json', 'csv': 'text/csv'}
+MANIFEST = 'manifest.json'
+# Bumped when the layout of the files changes; older snapshots are rebuilt.
+VERSION = 2
+# A closed period never changes, short of a --rebuild.
+MAX_AGE = 365 * 24 * 3600
+
+
+def snapshot_dir():
+    return Path(settings.REPORT_SNAPSHOT_DIR)
+
+
+def department_scope(department_id):
+    return f'department-{department_id}'
+
+
+def site_scope(site_id):
+    return f'site-{site_id}'
+
+
+def parse_scope(scope):
+    """``(kind, id)`` of a scope, e.g. ``('site', 2)``; ``('all', None)`` for everything."""
+    if scope == SCOPE_ALL:
+        return SCOPE_ALL, None
+    kind, pk = scope.split('-', 1)
+    return kind, int(pk)
+
+
+def user_scope(user, params=None):
+    # Like visitors.queries.scope_visits(): directors see their department,
+    # users of a site (or those who pick one) that site.
+    if user.role == 'director' and user.department_id:
+        return department_scope(user.department_id)
+    site_id = site_id_for(user, params)
+    if site_id is not None:
+        return site_scope(site_id)
+    return SCOPE_ALL
+
+
+def may_read(user, scope, info):
+    """Whether ``user`` may read the report of ``scope``, whose manifest entry is ``info``."""
+    own = user_scope(user)
+    return own in (SCOPE_ALL, scope) or (info['site'] is not None and own == site_scope(info['site']))
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def month_end(day):
+    return (month_start(day) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def months_between(start, end):
+    month = month_start(start)
+    while month <= end:
+        yield month
+        month = month_end(month) + timedelta(days=1)
+
+
+def write_file(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Readers never see a half-written file.
+    temporary = path.with_name(path.name + '.tmp')
+    temporary.write_bytes(content)
+    os.replace(temporary, path)
+
+
+def parse_month(data):
+    rows = [
+        (date.fromisoformat(day), site_id, department_id, status, visits)
+        for day, site_id, department_id, status, visits in data['rows']
+    ]
+    return date.fromisoformat(data['through']), rows
+
+
+@lru_cache(maxsize=256)
+def _read_snapshot(path, mtime_ns, parse):
+    data = json.loads(Path(path).read_bytes())
+    return parse(data) if parse else data
+
+
+def read_snapshot(path, parse=None):
+    """A snapshot file, read and parsed once per version of the file; None if it does not exist."""
+    try:
+        return _read_snapshot(str(path), os.stat(path).st_mtime_ns, parse)
+    except FileNotFoundError:
+        return None
+
+
+def load_manifest():
+    manifest = read_snapshot(snapshot_dir() / MANIFEST)
+    # Snapshots of an older layout are ignored until the next run rebuilds them.
+    return manifest if manifest is not None and manifest.get('version') == VERSION else None
+
+
+def load_month(month):
+    """``(through, [(day, site id, department id, status, visits), ...])`` of one month, or None."""
+    return read_snapshot(snapshot_dir() / 'data' / f'{month:%Y-%m}.json', parse_month)
+
+
+def count_visits(start, end):
+    """Visits per ``(day, site id, department id, status)`` dated start..end, live and archived."""
+    live = (
+        Visitor.objects.filter(visit_date__range=(start, end)).order_by()
+        .values_list('visit_date', 'site_id', 'department_id', 'status').annotate(Count('id'))
+    )
+    archived = (
+        DailyVisitCount.objects.filter(visit_date__range=(start, end)).order_by()
+        .values_list('visit_date', 'site_id', 'department_id', 'status').annotate(Sum('count'))
+    )
+    counts = Counter()
+    for day, site_id, department_id, status, visits in chain(live, archived):
+        counts[day, site_id, department_id, status] += visits
+    return counts
+
+
+def first_visit_date():
+    dates = [
+        Visitor.objects.aggregate(first=Min('visit_date'))['first'],
+        DailyVisitCount.objects.aggregate(first=Min('visit_date'))['first'],
+    ]
+    return min([day for day in dates if day is not None], default=None)
+
+
+def build_report(scope, period, start, end, through, rows, departments, sites):
+    """
+    The JSON-ready report of ``rows`` for one scope and month or year;
+    ``departments`` maps ids to ``(name, site id)``, ``sites`` ids to names.
+    """
+    # A year is reported month by month, a month day by day.
+    key, by_month = ('month', True) if len(period) == 4 else ('date', False)
+    series = defaultdict(Counter)
+    by_department = Counter()
+    for day, _, department_id, status, visits in rows:
+        series[f'{day:%Y-%m}' if by_month else day.isoformat()][status] += visits
+        by_department[department_id] += visits
+    if by_month:
+        keys = [f'{month:%Y-%m}' for month in months_between(start, through)]
+    else:
+        keys = [(start + timedelta(days=offset)).isoformat() for offset in range((through - start).days + 1)]
+    report = {
+        'scope': scope,
+        'period': period,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'through': through.isoformat(),
+        'complete': through >= end,
+        'total': sum(by_department.values()),
+        'by_status': {status: sum(counts[status] for counts in series.values()) for status in STATUSES},
+        'series': [
+            {key: bucket, 'total': sum(series[bucket].values()),
+             **{status: series[bucket][status] for status in STATUSES}}
+            for bucket in keys
+        ],
+    }
+    kind, pk = parse_scope(scope)
+    if kind == 'department':
+        report['department'] = departments.get(pk, (None, None))[0]
+    else:
+        if kind == 'site':
+            report['site'] = sites.get(pk)
+        report['departments'] = [
+            {'id': department_id, 'name': departments.get(department_id, (None, None))[0], 'total': total}
+            for department_id, total in by_department.most_common()
+        ]
+    return report
+
+
+def render_csv(report):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    key = 'month' if len(report['period']) == 4 else 'date'
+    writer.writerow([key, 'total', *STATUSES])
+    for row in report['series']:
+        writer.writerow([row[key], row['total'], *(row[status] for status in STATUSES)])
+    return buffer.getvalue().encode()
+
+
+def write_period(period, start, end, through, rows, departments, sites, manifest):
+    """Write the reports of one month or year, for everything, each site and each department."""
+    # Scope: (rows, site the scope is part of).
+    scopes = {SCOPE_ALL: (rows, None)}
+    for site_id in sites:
+        scopes[site_scope(site_id)] = [row for row in rows if row[1] == site_id], site_id
+    for department_id, (_, site_id) in departments.items():
+        scopes[department_scope(department_id)] = [row for row in rows if row[2] == department_id], site_id
+    for scope, (scope_rows, site_id) in scopes.items():
+        report = build_report(scope, period, start, end, through, scope_rows, departments, sites)
+        for fmt, content in (
+            ('json', json.dumps(report).encode()),
+            ('csv', render_csv(report)),
+        ):
+            name = f'{scope}/{period}.{fmt}'
+            write_file(snapshot_dir() / name, content)
+            manifest['reports'][name] = {
+                'etag': hashlib.md5(content).hexdigest(),
+                'complete': report['complete'],
+                'site': site_id,
+            }
+
+
+def snapshot_reports(through=None, rebuild=False):
+    """Snapshot the closed days up to ``through`` (default: yesterday); returns the periods written."""
+    through = through or timezone.localdate() - timedelta(days=1)
+    manifest_path = snapshot_dir() / MANIFEST
+    # Read afresh: the cached copy is shared with the views.
+    manifest = None if rebuild or not manifest_path.exists() else json.loads(manifest_path.read_bytes())
+    if manifest is not None and manifest.get('version') != VERSION:
+        manifest = None
+    if manifest is None:
+        first = first_visit_date()
+        if first is None or first > through:
+            return []
+        manifest = {'version': VERSION, 'since': month_start(first).isoformat(), 'reports': {}}
+        start = month_start(first)
+    else:
+        # The month in progress at the last run is counted again in full.
+        start = month_start(min(date.fromisoformat(manifest['through']) + timedelta(days=1), through))
+
+    counts = count_visits(start, through)
+    rows_by_month = defaultdict(list)
+    for (day, site_id, department_id, status), visits in sorted(
+        counts.items(), key=lambda item: (item[0][0], item[0][1] or 0, item[0][2] or 0, item[0][3])
+    ):
+        rows_by_month[month_start(day)].append((day, site_id, department_id, status, visits))
+    departments = {pk: (name, site_id) for pk, name, site_id in Department.objects.values_list('id', 'name', 'site_id')}
+    sites = dict(Site.objects.values_list('id', 'name'))
+
+    written = []
+    for month in months_between(start, through):
+        month_through = min(month_end(month), through)
+        rows = rows_by_month[month]
+        write_file(snapshot_dir() / 'data' / f'{month:%Y-%m}.json', json.dumps({
+            'month': f'{month:%Y-%m}',
+            'through': month_through.isoformat(),
+            'rows': [[day.isoformat(), *row] for day, *row in rows],
+        }).encode())
+        write_period(f'{month:%Y-%m}', month, month_end(month), month_through, rows, departments, sites, manifest)
+        written.append(f'{month:%Y-%m}')
+
+    for year in sorted({month.year for month in months_between(start, through)}):
+        year_start, year_end = date(year, 1, 1), date(year, 12, 31)
+        rows = []
+        for month in months_between(max(year_start, date.fromisoformat(manifest['since'])), min(year_end, through)):
+            rows.extend(load_month(month)[1])
+        write_period(str(year), year_start, year_end, min(year_end, through), rows, departments, sites, manifest)
+        written.append(str(year))
+
+    manifest['through'] = through.isoformat()
+    manifest['generated_at'] = timezone.now().isoformat()
+    write_file(snapshot_dir() / MANIFEST, json.dumps(manifest).encode())
+    return written
+
+
+def covers(start, include_archived):
+    """
+    Whether the snapshots hold every closed day from ``start`` to yesterday,
+    counted the way the live stats would count them: snapshots include
+    archived visits, so without ``include_archived`` only days still within
+    the retention horizon qualify.
+    """
+    manifest = load_manifest()
+    if manifest is None:
+        return False
+    yesterday = timezone.localdate() - timedelta(days=1)
+    return (
+        date.fromisoformat(manifest['through']) >= yesterday
+        and (include_archived or start >= retention_cutoff())
+    )
+
+
+def daily_counts(scope, start, end):
+    """Visits per day from ``start`` to ``end``, from the monthly counts."""
+    manifest = load_manifest()
+    kind, pk = parse_scope(scope)
+    # The column of the row that must match: site or department id.
+    column = {'site': 1, 'department': 2}.get(kind)
+    counts = Counter()
+    # Nothing was dated before the first snapshotted month.
+    for month in months_between(max(start, date.fromisoformat(manifest['since'])), end):
+        _, rows = load_month(month) or (None, ())
+        for row in rows:
+            if start <= row[0] <= end and (column is None or row[column] == pk):
+                counts[row[0]] += row[-1]
+    return counts
+
+
+def cache_headers(response, info):
+    response['ETag'] = f'"{info["etag"]}"'
+    if info['complete']:
+        response['Cache-Control'] = f'private, max-age={MAX_AGE}, immutable'
+    else:
+        # Rewritten every night until the period closes.
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class ReportIndexView(APIView):
+    """The report snapshots the user may read."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        manifest = load_manifest() or {'reports': {}}
+        reports = []
+        for name, info in sorted(manifest['reports'].items()):
+            scope, filename = name.split('/')
+            if not may_read(request.user, scope, info):
+                continue
+            period, fmt = filename.rsplit('.', 1)
+            reports.append({
+                'scope': scope,
+                'period': period,
+                'format': fmt,
+                'complete': info['complete'],
+                'url': request.build_absolute_uri(f'{request.path}{name}'),
+            })
+        return Response({'through': manifest.get('through'), 'reports': reports})
+
+
+class ReportFileView(APIView):
+    """One report file, straight from ``REPORT_SNAPSHOT_DIR``."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, scope, period, fmt):
+        name = f'{scope}/{period}.{fmt}'
+        info = (load_manifest() or {'reports': {}})['reports'].get(name)
+        # Someone else's department is as absent as a report never written.
+        if info is None or not may_read(request.user, scope, info):
+            raise Http404
+        if f'"{info["etag"]}"' in request.headers.get('If-None-Match', ''):
+            return cache_headers(HttpResponseNotModified(), info)
+        response = FileResponse(
+            open(snapshot_dir() / name, 'rb'), content_type=FORMATS[fmt],
+            as_attachment=fmt == 'csv', filename=f'visits-{scope}-{period}.{fmt}',
+        )
+        return cache_headers(response, info)
@@ -2,25 +2,45 @@ from rest_framework import serializers
 from .models import Visitor, Department
 from accounts.serializers import DepartmentSerializer
 from django.utils import timezone
+from tenancy.serializers import SiteScopedRelatedField
+from .avatars import avatar_url
+from .badges import BADGE_STATUSES, make_badge_token, qr_url
 
 class VisitorSerializer(serializers.ModelSerializer):
-    department = serializers.StringRelatedField(source='department.name')
-    department_id = serializers.PrimaryKeyRelatedField(
+    # The copied name, so listing visits needs no department join.
+    department = serializers.SerializerMethodField()
+    # Users of a site pick among its departments only.
+    department_id = SiteScopedRelatedField(
         queryset=Department.objects.all(),
         source='department',
         write_only=True
     )
+    site_id = serializers.IntegerField(read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    avatar = serializers.SerializerMethodField()
+    badge = serializers.SerializerMethodField()
     
     class Meta:
         model = Visitor
         fields = [
-            'id', 'name', 'email', 'phone', 'purpose', 'department', 'department_id',
-            'host','organization', 'address', 'status', 'status_display', 'visit_date', 'check_in_time',
-            'check_out_time', 'created_at', 'avatar'
+            'id', 'name', 'email', 'phone', 'purpose', 'department', 'department_id', 'site_id',
+            'host', 'host_email', 'organization', 'address', 'status', 'status_display', 'visit_date', 'check_in_time',
+            'check_out_time', 'created_at', 'avatar', 'badge', 'watchlist_hits'
         ]
-        read_only_fields = ['check_out_time', 'created_at', 'avatar']
+        read_only_fields = ['check_out_time', 'created_at', 'watchlist_hits']
     
+    def get_department(self, obj):
+        return obj.department_name if obj.department_id else None
+
+    def get_avatar(self, obj):
+        return avatar_url(obj.name, self.context.get('request'))
+
+    def get_badge(self, obj):
+        # QR code to scan at the desk, for as long as there is a next status.
+        if obj.status not in BADGE_STATUSES or obj.pk is None:
+            return None
+        return qr_url(make_badge_token(obj), self.context.get('request'))
+
     def validate_visit_date(self, value):
         if value < timezone.now().date():
             raise serializers.ValidationError("Visit date cannot be in the past")
@@ -0,0 +1,39 @@
+"""
+Keeps what visits copy from their department, its name and site, in step with
+department changes; the department's users follow its site too.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+
+from accounts.models import User
+from departments.models import Department
+from .models import ArchivedVisitor, DailyVisitCount, Visitor
+
+
+def remember_department(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        instance._previous_name, instance._previous_site_id = (
+            Department.objects.filter(pk=instance.pk).values_list('name', 'site_id').first() or (None, None)
+        )
+
+
+def propagate_department(sender, instance, created=False, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_name', None)
+    if created or raw or previous is None:
+        return
+    # Uses the department indexes. All of the copies change together, but only
+    # a caller's transaction (e.g. DepartmentViewSet.perform_update) also
+    # keeps them in step with the department row itself.
+    with transaction.atomic():
+        if previous != instance.name:
+            Visitor.objects.filter(department_id=instance.pk).update(department_name=instance.name)
+            ArchivedVisitor.objects.filter(department_id=instance.pk).update(department_name=instance.name)
+        if instance._previous_site_id != instance.site_id:
+            for model in (Visitor, ArchivedVisitor, DailyVisitCount, User):
+                model.objects.filter(department_id=instance.pk).update(site_id=instance.site_id)
+    instance._previous_name, instance._previous_site_id = instance.name, instance.site_id
+
+
+def connect():
+    pre_save.connect(remember_department, sender=Department, dispatch_uid='visitors.remember_department')
+    post_save.connect(propagate_department, sender=Department, dispatch_uid='visitors.propagate_department')
@@ -0,0 +1,288 @@
+"""
+Batch upload of operations a kiosk queued while it was offline.
+
+A sync carries an ordered list of operations::
+
+    {"id": "<client id>", "type": "create" | "check_in" | "check_out",
+     "at": "<client timestamp>", "visitor": <visitor id> or "ref": "<id of a create>",
+     "data": {...visitor fields, for create...}}
+
+Operations are applied in order, ``SYNC_CHUNK_SIZE`` at a time. Each chunk is
+one transaction: the visits it touches are locked and read with one query,
+the operations are resolved against their current status in memory, and the
+outcome is written with one ``bulk_create`` and one ``bulk_update``.
+
+An operation that no longer fits the visit's status, e.g. checking out a
+visitor someone already checked out at the desk, or a check-in to a
+department at its ``max_occupancy``, is reported as a conflict and changes
+nothing. The ids of applied operations are remembered like an
+``Idempotency-Key`` (see ``visitors.idempotency``), so a kiosk that resends a
+sync after a lost response gets the original results back.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from audit import log as audit
+from departments.counters import visit_state, visits_changed
+from departments.models import Department
+from tenancy.scoping import scope_to_site, site_id_for
+from .models import IdempotencyRecord, Visitor
+from .notifications import notify_arrival
+from .serializers import VisitorSerializer
+from watchlist.screening import log_hits, screen_visitor
+
+APPLIED = 'applied'
+DUPLICATE = 'duplicate'
+CONFLICT = 'conflict'
+INVALID = 'invalid'
+
+# Status an operation needs, and the status and timestamp it sets.
+TRANSITIONS = {
+    'check_in': ('pre-registered', 'checked-in', 'check_in_time'),
+    'check_out': ('checked-in', 'checked-out', 'check_out_time'),
+}
+OPERATION_TYPES = ('create', *TRANSITIONS)
+KEY_PREFIX = 'sync:'
+# Columns an applied check-in or check-out writes.
+UPDATED_FIELDS = ['status', 'check_in_time', 'check_out_time', 'watchlist_hits']
+
+FULL_ERROR = {'department': ['The department is at its maximum occupancy.']}
+
+
+def take_place(room, department_id):
+    """Count a check-in against ``room``, the places left per limited department."""
+    if department_id not in room:
+        return True
+    if room[department_id] <= 0:
+        return False
+    room[department_id] -= 1
+    return True
+
+
+class SyncVisitorSerializer(VisitorSerializer):
+    """Visitor fields of an offline create, checked against preloaded departments."""
+    department_id = serializers.IntegerField(write_only=True)
+
+    def validate_department_id(self, value):
+        if value not in self.context['departments']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+    def validate_visit_date(self, value):
+        # The visit was recorded at the kiosk, possibly on an earlier day.
+        return value
+
+
+class VisitorSync:
+    def __init__(self, user, queryset=None, chunk_size=None):
+        self.user = user
+        # The visits this user may change, e.g. a director's department.
+        self.queryset = queryset if queryset is not None else Visitor.objects.all()
+        self.chunk_size = chunk_size or settings.SYNC_CHUNK_SIZE
+        # The departments of the user's site, by id: (name, site id).
+        departments = scope_to_site(Department.objects.all(), site_id_for(user)).values_list('id', 'name', 'site_id')
+        self.departments = {pk: (name, site_id) for pk, name, site_id in departments}
+        # One instance validates every create, the way a ListSerializer reuses
+        # its child; building the fields per row costs more than validating.
+        self.serializer = SyncVisitorSerializer(context={'departments': self.departments})
+        # Client ids of creates, mapped to the visitor they created.
+        self.refs = {}
+        self.seen = set()
+        self.results = []
+
+    def run(self, operations):
+        for start in range(0, len(operations), self.chunk_size):
+            self.sync_chunk(operations[start:start + self.chunk_size])
+        return self.report()
+
+    def report(self):
+        summary = {outcome: 0 for outcome in (APPLIED, DUPLICATE, CONFLICT, INVALID)}
+        for result in self.results:
+            summary[result['result']] += 1
+        return {'total': len(self.results), **summary, 'results': self.results}
+
+    def parse(self, operation, now):
+        """``(op id, type, timestamp, error)`` of one raw operation."""
+        if not isinstance(operation, dict):
+            return None, None, None, 'Operation must be an object'
+        op_id = str(operation.get('id') or '').strip()
+        op_type = operation.get('type')
+        if not op_id or len(KEY_PREFIX + op_id) > IdempotencyRecord._meta.get_field('key').max_length:
+            return None, op_type, None, 'Every operation needs an id of at most 250 characters'
+        if op_type not in OPERATION_TYPES:
+            return op_id, op_type, None, f"Unknown type; expected one of {', '.join(OPERATION_TYPES)}"
+        at = operation.get('at')
+        at = parse_datetime(at) if isinstance(at, str) else None
+        if at is None:
+            return op_id, op_type, None, "'at' must be an ISO 8601 timestamp"
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+        # A kiosk clock running ahead must not date visits in the future.
+        return op_id, op_type, min(at, now), None
+
+    def target(self, operation):
+        """Visitor id an operation refers to, directly or through a create's ref."""
+        if operation.get('ref') is not None:
+            return self.refs.get(str(operation['ref']))
+        try:
+            return int(operation.get('visitor'))
+        except (TypeError, ValueError):
+            return None
+
+    def sync_chunk(self, operations):
+        now = timezone.now()
+        parsed = [self.parse(operation, now) for operation in operations]
+        keys = [KEY_PREFIX + op_id for op_id, _, _, error in parsed if op_id]
+        replayed = dict(
+            IdempotencyRecord.objects.filter(user=self.user, key__in=keys, expires_at__gt=now)
+            .values_list('key', 'response')
+        )
+        for result in replayed.values():
+            if result.get('type') == 'create' and result.get('visitor') is not None:
+                self.refs[result['id']] = result['visitor']
+
+        with transaction.atomic():
+            ids = {self.target(operation) for operation in operations if isinstance(operation, dict)}
+            ids.discard(None)
+            visits = {
+                visitor.pk: visitor
+                for visitor in self.queryset.select_for_update().filter(pk__in=ids)
+            }
+            states = {pk: visit_state(visitor) for pk, visitor in visits.items()}
+            # Places left in departments with a limit, locked until the chunk commits.
+            room = {
+                pk: max(limit - on_site, 0)
+                for pk, limit, on_site in Department.objects.select_for_update()
+                .filter(max_occupancy__isnull=False).values_list('id', 'max_occupancy', 'on_site_count')
+            }
+            created, changed, events, results = [], {}, [], []
+            # Visitors of applied operations, filled in once created ones have an id.
+            pending = []
+
+            for operation, (op_id, op_type, at, error) in zip(operations, parsed):
+                result = {'id': op_id, 'type': op_type}
+                results.append(result)
+                if error:
+                    result.update(result=INVALID, errors={'operation': [error]})
+                    continue
+                if op_id in self.seen or KEY_PREFIX + op_id in replayed:
+                    stored = replayed.get(KEY_PREFIX + op_id)
+                    result.update(stored or {}, result=DUPLICATE)
+                    continue
+                self.seen.add(op_id)
+
+                if op_type == 'create':
+                    visitor, errors = self.build(operation, at)
+                    if errors:
+                        result.update(result=INVALID, errors=errors)
+                        continue
+                    if visitor.status == 'checked-in' and not take_place(room, visitor.department_id):
+                        result.update(result=CONFLICT, errors=FULL_ERROR)
+                        continue
+                    created.append(visitor)
+                    pending.append((visitor, result))
+                    events.append(('create', visitor, None, audit.snapshot(visitor)))
+                    # Later operations in this chunk may refer to it before it has an id.
+                    self.refs[op_id] = visitor
+                    result.update(result=APPLIED, visitor_status=visitor.status)
+                    continue
+
+                pk = self.target(operation)
+                visitor = pk if isinstance(pk, Visitor) else visits.get(pk)
+                if visitor is None:
+                    result.update(result=INVALID, errors={'visitor': ['Visitor not found']})
+                    continue
+                pending.append((visitor, result))
+                required, status, time_field = TRANSITIONS[op_type]
+                if visitor.status != required:
+                    result.update(result=CONFLICT, visitor_status=visitor.status)
+                    continue
+                if status == 'checked-in' and not take_place(room, visitor.department_id):
+                    result.update(result=CONFLICT, visitor_status=visitor.status, errors=FULL_ERROR)
+                    continue
+                if required == 'checked-in' and visitor.department_id in room:
+                    room[visitor.department_id] += 1
+                before = audit.snapshot(visitor)
+                visitor.status = status
+                # Never before the check-in it ends, whatever the kiosk clock said.
+                setattr(visitor, time_field, max(at, visitor.check_in_time or at))
+                if status == 'checked-in':
+                    visitor.watchlist_hits = screen_visitor(visitor)
+                if visitor.pk is not None:
+                    changed[visitor.pk] = visitor
+                events.append((op_type, visitor, before, audit.snapshot(visitor)))
+                result.update(result=APPLIED, visitor_status=visitor.status)
+
+            if created:
+                Visitor.objects.bulk_create(created)
+                self.refs.update({
+                    op_id: visitor.pk for op_id, visitor in self.refs.items() if isinstance(visitor, Visitor)
+                })
+            if changed:
+                Visitor.objects.bulk_update(changed.values(), UPDATED_FIELDS)
+            visits_changed(
+                before=[states[pk] for pk in changed],
+                after=[visit_state(visitor) for visitor in [*changed.values(), *created]],
+                check_capacity=True,
+            )
+            for visitor, result in pending:
+                result['visitor'] = visitor.pk
+            for action, visitor, before, after in events:
+                # Snapshots taken before the insert lack the generated columns.
+                for snapshot in (before, after):
+                    if snapshot is not None and snapshot['id'] is None:
+                        snapshot.update(id=visitor.pk, created_at=visitor.created_at)
+                audit.record(action, visitor, self.user, before, after)
+                # Visits are screened when created and on check-in.
+                if action == 'create' or visitor.status == 'checked-in':
+                    log_hits(visitor)
+            self.remember(results, now)
+
+        for visitor in [*changed.values(), *created]:
+            if visitor.status == 'checked-in':
+                notify_arrival(visitor)
+        self.results.extend(results)
+
+    def build(self, operation, at):
+        """Unsaved ``Visitor`` of a create operation; returns ``(visitor, errors)``."""
+        data = operation.get('data')
+        if not isinstance(data, dict):
+            return None, {'data': ['Visitor fields are required for a create']}
+        data = {'visit_date': timezone.localdate(at).isoformat(), **data}
+        try:
+            fields = self.serializer.run_validation(data)
+        except serializers.ValidationError as exc:
+            return None, exc.detail
+        fields.setdefault('status', 'checked-in')
+        department_name, site_id = self.departments[fields['department_id']]
+        visitor = Visitor(
+            **fields, created_by=self.user, department_name=department_name, site_id=site_id or self.user.site_id
+        )
+        if visitor.status == 'checked-in':
+            visitor.check_in_time = at
+        visitor.watchlist_hits = screen_visitor(visitor)
+        return visitor, None
+
+    def remember(self, results, now):
+        expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        IdempotencyRecord.objects.bulk_create([
+            IdempotencyRecord(
+                user=self.user,
+                key=KEY_PREFIX + result['id'],
+                request_hash='',
+                status_code=200,
+                response=result,
+                expires_at=expires_at,
+            )
+            for result in results if result['result'] == APPLIED
+        ], ignore_conflicts=True)
+
+
+def sync_visits(operations, user, **options):
+    """Apply queued kiosk ``operations`` in order; returns the per-operation results."""
+    return VisitorSync(user, **options).run(operations)
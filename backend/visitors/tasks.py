@@ -0,0 +1,11 @@
+from django.utils.module_loading import import_string
+
+from tasks.registry import task
+from .notifications import build_notification, resolve_host_email
+
+
+@task
+def deliver_host_notification(sink, host, email, arrivals):
+    """Send one coalesced arrival message through ``sink`` (a dotted path)."""
+    email = email or resolve_host_email(host)
+    import_string(sink)().send(build_notification(host, email, arrivals))
@@ -1,13 +1,44 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from .views import VisitorViewSet ,VisitorStatsView, DepartmentStatsView
+from .avatars import avatar
+from .badges import badge_qr
+from .reports import ReportFileView, ReportIndexView
+from . import queries
+from .async_views import DashboardView, VisitorListView
 
 router = DefaultRouter()
 router.register(r'', VisitorViewSet, basename='visitors')
 
 
 urlpatterns = [
+    # Before the router, which would take "avatar" for a visitor id.
+    path('avatar/', avatar, name='visitor-avatar'),
+    path('badge/<str:token>.svg', badge_qr, name='visitor-badge-qr'),
+    path('reports/', ReportIndexView.as_view(), name='visitor-reports'),
+    re_path(
+        r'^reports/(?P<scope>all|site-\d+|department-\d+)/(?P<period>\d{4}(?:-\d{2})?)\.(?P<fmt>json|csv)$',
+        ReportFileView.as_view(), name='visitor-report-file',
+    ),
     path('', include(router.urls)),
     path('stats/', VisitorStatsView.as_view(), name='visitor-stats'),
     path('department_stats/', DepartmentStatsView.as_view(), name='department-stats'),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_VIEWS:
+    # Ahead of the router, which keeps serving writes and the other routes.
+    urlpatterns[:0] = [
+        path('', VisitorListView.as_view(
+            write_view=VisitorViewSet.as_view({'get': 'list', 'post': 'create'}),
+        ), name='visitors-list-async'),
+        path('summary/', DashboardView.as_view(
+            make_queries=queries.summary_queries, combine=queries.summary_result,
+        ), name='visitors-summary-async'),
+        path('stats/', DashboardView.as_view(
+            make_queries=queries.stats_queries, combine=queries.stats_result,
+        ), name='visitors-stats-async'),
+        path('department_stats/', DashboardView.as_view(
+            make_queries=queries.department_stats_queries, combine=queries.department_stats_result,
+        ), name='visitors-department-stats-async'),
+    ]
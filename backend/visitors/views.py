@@ -1,42 +1,80 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Count
+from contextlib import contextmanager
 from datetime import timedelta
-from .models import Visitor
+from .models import Visitor, ArchivedVisitor
 from .serializers import VisitorSerializer
+from . import queries
+from .badges import NEXT_STATUS, InvalidBadge, read_badge_token
+from .idempotency import idempotent
+from .notifications import notify_arrival
+from .sync import sync_visits
 from rest_framework.views import APIView
 from django.db.models.functions import Trunc, ExtractWeekDay
 from django.db.models import CharField
 from django.db.models.functions import Cast
+from backend.routers import ReplicaReadMixin
+from audit import log as audit
+from departments.counters import DepartmentFull, visit_changed, visit_state
+from watchlist.screening import log_hits, screen, screen_visitor
+from audit.serializers import AuditEventSerializer
+from audit.views import get_limit, history as audit_history
 
 
-class VisitorViewSet(viewsets.ModelViewSet):
+class OccupancyLimitReached(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The department is at its maximum occupancy.'
+    default_code = 'department_full'
+
+
+@contextmanager
+def occupancy_checked():
+    # Outside the atomic block, so the visit write has rolled back by the time
+    # the client is told the department is full.
+    try:
+        yield
+    except DepartmentFull as exc:
+        raise OccupancyLimitReached({'error': str(exc)})
+
+
+class VisitorViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = VisitorSerializer
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('list', 'stats', 'department_stats', 'summary')
     
+    def include_archived(self):
+        return queries.include_archived(self.request.query_params)
+
+    def scope_queryset(self, queryset):
+        return queries.scope_visits(queryset, self.request.user)
+
+    def filter_visits(self, queryset):
+        return queries.filter_visits(queryset, self.request.user, self.request.query_params)
+
     def get_queryset(self):
-        queryset = Visitor.objects.all()
-        
-        # Filter by department if user is director
-        if self.request.user.role == 'director' and self.request.user.department:
-            queryset = queryset.filter(department=self.request.user.department)
-            
-        # Apply filters
-        status = self.request.query_params.get('status')
-        if status:
-            queryset = queryset.filter(status=status)
-            
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(email__icontains=search) |
-                Q(department__name__icontains=search)
-            )
-            
-        return queryset.order_by('-visit_date')  # Changed from created_at to visit_date
+        # The serializer reads the copied department_name, so no join is needed.
+        return self.filter_visits(Visitor.objects.all())
+
+    def list(self, request, *args, **kwargs):
+        if not self.include_archived():
+            return super().list(request, *args, **kwargs)
+        # Archived visits are older than anything still live, so appending them
+        # keeps the combined result ordered by visit date.
+        live = self.get_queryset()
+        archived = self.filter_visits(ArchivedVisitor.objects.all())
+        serializer = self.get_serializer(list(live) + list(archived), many=True)
+        return Response(serializer.data)
+
+    
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         # Get status from validated data or default to 'checked-in'
@@ -45,16 +83,79 @@ class VisitorViewSet(viewsets.ModelViewSet):
         # Prepare save data
         save_data = {
             'created_by': self.request.user,
-            'avatar': f"https://ui-avatars.com/api/?name={serializer.validated_data.get('name','V')}"
+            # Replaced by the department's site when it has one.
+            'site_id': self.request.user.site_id,
+            'watchlist_hits': self.screen_details(serializer),
         }
     
         # Only set check_in_time if status is 'checked-in'
         if status == 'checked-in':
             save_data['check_in_time'] = timezone.now()
     
-        serializer.save(**save_data)
-    
+        with occupancy_checked(), transaction.atomic():
+            visitor = serializer.save(**save_data)
+            visit_changed(after=visit_state(visitor), check_capacity=True)
+        audit.record('create', visitor, self.request.user, after=audit.snapshot(visitor))
+        log_hits(visitor)
+        if visitor.status == 'checked-in':
+            notify_arrival(visitor)
+
+    def perform_update(self, serializer):
+        before = audit.snapshot(serializer.instance)
+        state = visit_state(serializer.instance)
+        with occupancy_checked(), transaction.atomic():
+            visitor = serializer.save(watchlist_hits=self.screen_details(serializer))
+            visit_changed(state, visit_state(visitor), check_capacity=True)
+        audit.record('update', visitor, self.request.user, before, audit.snapshot(visitor))
+        log_hits(visitor)
+
+    def perform_destroy(self, instance):
+        # The audit event is only written if the delete goes through.
+        with transaction.atomic():
+            audit.record('delete', instance, self.request.user, before=audit.snapshot(instance))
+            visit_changed(before=visit_state(instance))
+            instance.delete()
+
+    def screen_details(self, serializer):
+        """Watchlist hits for the details a create or update is about to save."""
+        data, instance = serializer.validated_data, serializer.instance
+        return screen(**{
+            field: data.get(field, getattr(instance, field, ''))
+            for field in ('name', 'phone', 'organization')
+        })
+
+    def advance(self, visitor, next_status, now=None):
+        """
+        Move ``visitor`` on to ``next_status`` with one conditional update.
+        Returns its snapshot from before, or None if another request changed
+        its status first; raises ``OccupancyLimitReached`` on a full department.
+        """
+        now = now or timezone.now()
+        before = audit.snapshot(visitor)
+        changes = {'status': next_status}
+        if next_status == 'checked-in':
+            changes['check_in_time'] = now
+            # Screened again on arrival: the watchlist may have changed since.
+            changes['watchlist_hits'] = screen_visitor(visitor)
+        else:
+            changes['check_out_time'] = now
+        with occupancy_checked(), transaction.atomic():
+            # Conditional on the status read before, so concurrent requests
+            # move the visit on (and count it) only once.
+            updated = Visitor.objects.filter(
+                pk=visitor.pk, visit_date=visitor.visit_date, status=visitor.status
+            ).update(**changes)
+            if not updated:
+                return None
+            for field, value in changes.items():
+                setattr(visitor, field, value)
+            visit_changed(visit_state(before), visit_state(visitor), check_capacity=True)
+        if next_status == 'checked-in':
+            log_hits(visitor)
+        return before
+
     @action(detail=True, methods=['post'])
+    @idempotent
     def check_in(self, request, pk=None):
         visitor = self.get_object()
         if visitor.status != 'pre-registered':
@@ -62,12 +163,15 @@ class VisitorViewSet(viewsets.ModelViewSet):
                 {'error': 'Visitor is not pre-registered'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        visitor.status = 'checked-in'
-        visitor.check_in_time = timezone.now()
-        visitor.save()
+        before = self.advance(visitor, 'checked-in')
+        if before is None:
+            return Response({'error': 'Visitor was updated by another request'}, status=status.HTTP_409_CONFLICT)
+        audit.record('check_in', visitor, request.user, before, audit.snapshot(visitor))
+        notify_arrival(visitor)
         return Response(self.get_serializer(visitor).data)
     
     @action(detail=True, methods=['post'])
+    @idempotent
     def check_out(self, request, pk=None):
         visitor = self.get_object()
         if visitor.status != 'checked-in':
@@ -75,119 +179,95 @@ class VisitorViewSet(viewsets.ModelViewSet):
                 {'error': 'Visitor is not checked in'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        visitor.status = 'checked-out'
-        visitor.check_out_time = timezone.now()
-        visitor.save()
+        before = self.advance(visitor, 'checked-out')
+        if before is None:
+            return Response({'error': 'Visitor was updated by another request'}, status=status.HTTP_409_CONFLICT)
+        audit.record('check_out', visitor, request.user, before, audit.snapshot(visitor))
         return Response(self.get_serializer(visitor).data)
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def scan(self, request):
+        # The token is verified by its signature alone; the visit is then read
+        # and moved on by primary key, without searching the list.
+        try:
+            pk, visit_date = read_badge_token(request.data.get('token', ''))
+        except InvalidBadge:
+            return Response({'error': 'Invalid badge'}, status=status.HTTP_400_BAD_REQUEST)
+        now = timezone.now()
+        if visit_date > now.date():
+            return Response(
+                {'error': f'This badge is for a visit on {visit_date.isoformat()}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        visitor = self.scope_queryset(Visitor.objects.filter(pk=pk, visit_date=visit_date)).first()
+        if visitor is None:
+            return Response({'error': 'Visitor not found'}, status=status.HTTP_404_NOT_FOUND)
+        next_status = NEXT_STATUS.get(visitor.status)
+        if next_status is None:
+            return Response({'error': 'Visitor has already checked out'}, status=status.HTTP_409_CONFLICT)
+        if next_status == 'checked-out' and visitor.check_in_time and \
+                visitor.check_in_time > now - timedelta(seconds=settings.BADGE_MIN_STAY):
+            return Response({'error': 'Visitor has just checked in'}, status=status.HTTP_409_CONFLICT)
+
+        before = self.advance(visitor, next_status, now)
+        if before is None:
+            return Response({'error': 'Visitor was updated by another request'}, status=status.HTTP_409_CONFLICT)
+        action_name = 'check_in' if next_status == 'checked-in' else 'check_out'
+        audit.record(action_name, visitor, request.user, before, audit.snapshot(visitor))
+        if next_status == 'checked-in':
+            notify_arrival(visitor)
+        return Response({'action': action_name, 'visitor': self.get_serializer(visitor).data})
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def sync(self, request):
+        operations = request.data.get('operations') if hasattr(request.data, 'get') else None
+        if not isinstance(operations, list):
+            return Response({'error': "'operations' must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > settings.SYNC_MAX_OPERATIONS:
+            return Response(
+                {'error': f'At most {settings.SYNC_MAX_OPERATIONS} operations per sync'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        report = sync_visits(operations, request.user, queryset=self.scope_queryset(Visitor.objects.all()))
+        return Response(report)
+
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        visitor = self.get_object()
+        events = audit_history('visitor', visitor.pk, get_limit(request))
+        return Response(AuditEventSerializer(events, many=True).data)
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        period = request.query_params.get('period', 'week')
-        
-        queryset = Visitor.objects.all()
-        if request.user.role == 'director' and request.user.department:
-            queryset = queryset.filter(department=request.user.department)
-        
-        if period == 'week':
-            start_date = timezone.now() - timedelta(days=7)
-            stats = (
-                queryset
-                .filter(visit_date__gte=start_date)
-                .annotate(
-                    date=Cast(ExtractWeekDay('visit_date'), output_field=CharField())
-                )
-                .values('date')
-                .annotate(count=Count('id'))
-                .order_by('date')
-            )
-            
-            day_map = {
-                '1': 'Sunday',
-                '2': 'Monday',
-                '3': 'Tuesday',
-                '4': 'Wednesday',
-                '5': 'Thursday',
-                '6': 'Friday',
-                '7': 'Saturday'
-            }
-            
-            result = [{
-                'date': day_map.get(stat['date']),
-                'count': stat['count']
-            } for stat in stats]
-            
-        elif period == 'month':
-            start_date = timezone.now() - timedelta(days=30)
-            stats = (
-                queryset
-                .filter(visit_date__gte=start_date)
-                .annotate(date=Trunc('visit_date', 'day'))
-                .values('date')
-                .annotate(count=Count('id'))
-                .order_by('date')
-            )
-            
-            result = [{
-                'date': stat['date'].strftime('%d'),
-                'count': stat['count']
-            } for stat in stats]
-            
-        else:  # year
-            start_date = timezone.now() - timedelta(days=365)
-            stats = (
-                queryset
-                .filter(visit_date__gte=start_date)
-                .annotate(date=Trunc('visit_date', 'month'))
-                .values('date')
-                .annotate(count=Count('id'))
-                .order_by('date')
-            )
-            
-            result = [{
-                'date': stat['date'].strftime('%b'),
-                'count': stat['count']
-            } for stat in stats]
-            
-        return Response(result)    
+        params = request.query_params
+        results = queries.run_queries(queries.stats_queries(request.user, params))
+        return Response(queries.stats_result(params, *results))
+
     @action(detail=False, methods=['get'])
     def department_stats(self, request):
-        queryset = Visitor.objects.all()
-        if request.user.role == 'director' and request.user.department:
-            queryset = queryset.filter(department=request.user.department)
-            
-        stats = queryset.values('department__name').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
-        return Response([{
-            'department': stat['department__name'],
-            'count': stat['count']
-        } for stat in stats])
+        params = request.query_params
+        results = queries.run_queries(queries.department_stats_queries(request.user, params))
+        return Response(queries.department_stats_result(params, *results))
     
     @action(detail=False, methods=['get'])
     def summary(self, request):
-        queryset = Visitor.objects.all()
-        if request.user.role == 'director' and request.user.department:
-            queryset = queryset.filter(department=request.user.department)
-            
-        return Response({
-            'total': queryset.count(),
-            'checked_in': queryset.filter(status='checked-in').count(),
-            'pre_registered': queryset.filter(status='pre-registered').count()
-        })
+        params = request.query_params
+        results = queries.run_queries(queries.summary_queries(request.user, params))
+        return Response(queries.summary_result(params, *results))
 
 
-class VisitorStatsView(APIView):
+class VisitorStatsView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('get',)
     
     def get(self, request):
         try:
             period = request.GET.get('period', 'week')
             today = timezone.now().date()
             
-            queryset = Visitor.objects.all()
-            if request.user.role == 'director' and request.user.department:
-                queryset = queryset.filter(department=request.user.department)
+            queryset = queries.scope_visits(Visitor.objects.all(), request.user, request.GET)
             
             if period == 'week':
                 start_date = today - timedelta(days=7)
@@ -258,15 +338,15 @@ class VisitorStatsView(APIView):
             )
 
 
-class DepartmentStatsView(APIView):
+class DepartmentStatsView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('get',)
     
     def get(self, request):
         try:
-            queryset = Visitor.objects.exclude(department__isnull=True)
-            
-            if request.user.role == 'director' and request.user.department:
-                queryset = queryset.filter(department=request.user.department)
+            queryset = queries.scope_visits(
+                Visitor.objects.exclude(department__isnull=True), request.user, request.GET
+            )
             
             stats = (
                 queryset
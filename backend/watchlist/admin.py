@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from audit.admin import AuditedAdmin
+from .models import WatchlistEntry
+
+
+@admin.register(WatchlistEntry)
+class WatchlistEntryAdmin(AuditedAdmin):
+    list_display = ['name', 'phone', 'organization', 'active', 'created_by', 'updated_at']
+    list_select_related = ['created_by']
+    list_filter = ['active']
+    search_fields = ['name', 'phone', 'organization']
+    raw_id_fields = ['created_by']
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
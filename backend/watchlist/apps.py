@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class WatchlistConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'watchlist'
+
+    def ready(self):
+        from . import screening
+        screening.connect()
@@ -0,0 +1,23 @@
+from django.db import models
+
+from accounts.models import User
+
+
+class WatchlistEntry(models.Model):
+    """Someone security wants to know about when they arrive (see ``watchlist.screening``)."""
+    name = models.CharField(max_length=100, blank=True)
+    phone = models.CharField(max_length=20, blank=True)
+    organization = models.CharField(max_length=100, blank=True)
+    reason = models.TextField(blank=True)
+    # Inactive entries stay for the record but no longer match.
+    active = models.BooleanField(default=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='watchlist_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'watchlist entries'
+        ordering = ['name', 'id']
+
+    def __str__(self):
+        return self.name or self.organization or self.phone
@@ -0,0 +1,225 @@
+"""
+Screening of visitors against the watchlist.
+
+Active entries are loaded into a ``WatchlistIndex`` held in process memory:
+hash maps from the normalized name, phone number and organization to the
+entries, plus a symmetric-deletion index for names misspelt by up to
+``WATCHLIST_MAX_EDITS`` characters. Screening a visitor is a handful of dict
+lookups and never queries the database.
+
+The index is kept with the watchlist version it was built from. Saving or
+deleting an entry bumps the version in the default cache, so every worker
+rebuilds its index before the next screening, or at the latest after
+``WATCHLIST_RELOAD_INTERVAL`` seconds when the cache is not shared. While one
+thread rebuilds, the others keep screening against the previous index.
+"""
+import logging
+import random
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import WatchlistEntry
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'watchlist:version'
+# Legal forms that do not tell organizations apart.
+ORGANIZATION_SUFFIXES = {
+    'inc', 'llc', 'ltd', 'limited', 'corp', 'corporation', 'co', 'company', 'gmbh', 'plc', 'sa', 'ag', 'bv',
+}
+# Trailing digits compared, so "+44 20 7946 0018" and "020 7946 0018" agree.
+PHONE_DIGITS = 9
+MIN_PHONE_DIGITS = 6
+
+
+def _words(value):
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(char for char in value if not unicodedata.combining(char)).casefold()
+    return re.findall(r'[^\W_]+', value)
+
+
+def normalize_name(value):
+    # Word order does not matter: "Doe, John" is "John Doe".
+    return ' '.join(sorted(_words(value)))
+
+
+def normalize_organization(value):
+    return ' '.join(word for word in _words(value) if word not in ORGANIZATION_SUFFIXES)
+
+
+def normalize_phone(value):
+    digits = re.sub(r'\D', '', str(value or ''))
+    return digits[-PHONE_DIGITS:] if len(digits) >= MIN_PHONE_DIGITS else ''
+
+
+def deletions(value, max_edits):
+    """``value`` and every string made from it by deleting up to ``max_edits`` characters."""
+    variants = frontier = {value}
+    for _ in range(max_edits):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants = variants | frontier
+    return variants
+
+
+def edit_distance(a, b, limit):
+    """Edits (insert, delete, substitute, swap neighbours) from ``a`` to ``b``; ``limit + 1`` beyond ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class WatchlistIndex:
+    """Normalized watchlist entries, for screening without the database."""
+
+    def __init__(self, entries, max_edits=1, min_fuzzy_length=5):
+        self.max_edits = max_edits
+        self.min_fuzzy_length = min_fuzzy_length
+        self.names = defaultdict(set)
+        self.phones = defaultdict(set)
+        self.organizations = defaultdict(set)
+        # Deletion variant -> normalized names it was made from.
+        self.fuzzy_names = defaultdict(set)
+        self.size = 0
+        for entry_id, name, phone, organization in entries:
+            self.size += 1
+            for index, key in (
+                (self.names, normalize_name(name)),
+                (self.phones, normalize_phone(phone)),
+                (self.organizations, normalize_organization(organization)),
+            ):
+                if key:
+                    index[key].add(entry_id)
+        for name in self.names:
+            if self.fuzzy(name):
+                for variant in deletions(name, self.max_edits):
+                    self.fuzzy_names[variant].add(name)
+
+    def fuzzy(self, name):
+        return self.max_edits > 0 and len(name) >= self.min_fuzzy_length
+
+    def screen(self, name='', phone='', organization=''):
+        """``[{'entry', 'field', 'match'}]`` for every entry the details match."""
+        hits = {}
+
+        def add(entry_ids, field, match):
+            for entry_id in entry_ids:
+                hits.setdefault((entry_id, field), match)
+
+        name = normalize_name(name)
+        if name:
+            add(self.names.get(name, ()), 'name', 'exact')
+            if self.fuzzy(name):
+                candidates = set()
+                for variant in deletions(name, self.max_edits):
+                    candidates.update(self.fuzzy_names.get(variant, ()))
+                candidates.discard(name)
+                for candidate in candidates:
+                    if edit_distance(name, candidate, self.max_edits) <= self.max_edits:
+                        add(self.names[candidate], 'name', 'fuzzy')
+        phone = normalize_phone(phone)
+        if phone:
+            add(self.phones.get(phone, ()), 'phone', 'exact')
+        organization = normalize_organization(organization)
+        if organization:
+            add(self.organizations.get(organization, ()), 'organization', 'exact')
+        return [
+            {'entry': entry_id, 'field': field, 'match': match}
+            for (entry_id, field), match in sorted(hits.items())
+        ]
+
+
+def build_index():
+    entries = WatchlistEntry.objects.filter(active=True).values_list('id', 'name', 'phone', 'organization')
+    return WatchlistIndex(entries, settings.WATCHLIST_MAX_EDITS, settings.WATCHLIST_FUZZY_MIN_LENGTH)
+
+
+_entry = None
+_lock = threading.Lock()
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Random start, so a version key lost from the cache never matches an old index.
+        cache.add(VERSION_KEY, random.randint(1, 2 ** 31), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    global _entry
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        current_version()
+    # This process rebuilds at once; others on their next version check.
+    entry = _entry
+    if entry is not None:
+        _entry = (None, 0, entry[2])
+
+
+def get_index():
+    """The current ``WatchlistIndex``, rebuilt when the watchlist has changed."""
+    global _entry
+    version = current_version()
+    entry = _entry
+    if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+        return entry[2]
+    # Only the first thread to notice rebuilds; the others carry on with the
+    # previous index rather than wait, unless there is none yet.
+    if not _lock.acquire(blocking=entry is None):
+        return entry[2]
+    try:
+        entry = _entry
+        if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+            return entry[2]
+        index = build_index()
+        _entry = (version, time.monotonic() + settings.WATCHLIST_RELOAD_INTERVAL, index)
+        return index
+    finally:
+        _lock.release()
+
+
+def screen(name='', phone='', organization=''):
+    """Watchlist hits for a visitor's details; empty when screening is off."""
+    if not settings.WATCHLIST_ENABLED:
+        return []
+    return get_index().screen(name, phone, organization)
+
+
+def screen_visitor(visitor):
+    return screen(visitor.name, visitor.phone, visitor.organization)
+
+
+def log_hits(visitor):
+    """Log a saved visit's hits by id only; the details stay in the database and the audit log."""
+    if visitor.watchlist_hits:
+        entries = sorted({hit['entry'] for hit in visitor.watchlist_hits})
+        logger.warning("Watchlist match for visit %s: entries %s", visitor.pk, entries)
+
+
+def entries_changed(sender, **kwargs):
+    transaction.on_commit(invalidate)
+
+
+def connect():
+    post_save.connect(entries_changed, sender=WatchlistEntry, dispatch_uid='watchlist.entries_changed.save')
+    post_delete.connect(entries_changed, sender=WatchlistEntry, dispatch_uid='watchlist.entries_changed.delete')
@@ -0,0 +1,17 @@
+from rest_framework import serializers
+from .models import WatchlistEntry
+
+
+class WatchlistEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WatchlistEntry
+        fields = ['id', 'name', 'phone', 'organization', 'reason', 'active', 'created_by', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
+
+    def validate(self, attrs):
+        details = [
+            attrs.get(field, getattr(self.instance, field, '')) for field in ('name', 'phone', 'organization')
+        ]
+        if not any(value and value.strip() for value in details):
+            raise serializers.ValidationError("Give at least a name, a phone number or an organization")
+        return attrs
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import WatchlistEntryViewSet
+
+router = DefaultRouter()
+router.register(r'', WatchlistEntryViewSet, basename='watchlist')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,42 @@
+from django.db import transaction
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from audit import log as audit
+from .models import WatchlistEntry
+from . import screening
+from .serializers import WatchlistEntrySerializer
+
+
+class WatchlistEntryViewSet(viewsets.ModelViewSet):
+    serializer_class = WatchlistEntrySerializer
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    def get_queryset(self):
+        queryset = WatchlistEntry.objects.all()
+        active = self.request.query_params.get('active')
+        if active:
+            queryset = queryset.filter(active=active.lower() in ('1', 'true', 'yes'))
+        return queryset
+
+    # Indexes are rebuilt through the save and delete signals (see screening.connect).
+    def perform_create(self, serializer):
+        entry = serializer.save(created_by=self.request.user)
+        audit.record('create', entry, self.request.user, after=audit.snapshot(entry))
+
+    def perform_update(self, serializer):
+        before = audit.snapshot(serializer.instance)
+        entry = serializer.save()
+        audit.record('update', entry, self.request.user, before, audit.snapshot(entry))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            audit.record('delete', instance, self.request.user, before=audit.snapshot(instance))
+            instance.delete()
+
+    @action(detail=False, methods=['post'])
+    def screen(self, request):
+        """Try details against the watchlist without recording a visit."""
+        details = {field: str(request.data.get(field) or '') for field in ('name', 'phone', 'organization')}
+        return Response({'hits': screening.screen(**details), 'entries': screening.get_index().size})
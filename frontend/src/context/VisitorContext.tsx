@@ -1,10 +1,12 @@
 import React, { createContext, useContext, useEffect, useState, useCallback } from 'react';
 import { useAuth } from './AuthContext';
-import api from '../services/api';
+import api, { batchGet } from '../services/api';
 import { toast } from 'sonner';
 
 export interface Department {
   visitor_count: number;
+  on_site_count?: number;
+  max_occupancy?: number | null;
   id: string;
   name: string;
   description?: string;
@@ -26,6 +28,8 @@ export interface Visitor {
   check_out_time?: string;
   created_at: string;
   avatar?: string;
+  // Watchlist entries the visitor matched when last screened.
+  watchlist_hits?: { entry: number; field: string; match: 'exact' | 'fuzzy' }[];
 }
 
 interface VisitorContextType {
@@ -85,7 +89,10 @@ export const VisitorProvider: React.FC<{ children: React.ReactNode }> = ({ child
       if (user) {
         try {
           setLoading(true);
-          await Promise.all([refreshVisitors(), refreshDepartments()]);
+          const [visitorList, departmentList] = await batchGet(['/visitors/', '/departments/']);
+          setVisitors(visitorList);
+          setDepartments(departmentList);
+          setError(null);
         } catch (err) {
           setError('Failed to load initial data');
         } finally {
@@ -94,7 +101,7 @@ export const VisitorProvider: React.FC<{ children: React.ReactNode }> = ({ child
       }
     };
     loadData();
-  }, [user, refreshVisitors, refreshDepartments]);
+  }, [user]);
 
   const addVisitor = async (visitorData: Omit<Visitor, 'id' | 'status' | 'created_at' | 'avatar'>) => {
     try {
@@ -1,8 +1,9 @@
 import React, { useState, useEffect } from 'react';
 import { useVisitors } from '../context/VisitorContext';
 import { useAuth } from '../context/AuthContext';
-import { BarChart3Icon, PieChartIcon, CalendarIcon, CheckIcon, LogOutIcon } from 'lucide-react';
+import { BarChart3Icon, PieChartIcon, CalendarIcon, CheckIcon, LogOutIcon, DownloadIcon } from 'lucide-react';
 import ErrorBoundary from '../components/ErrorBoundary';
+import { listReports, downloadReport } from '../services/api';
 
 interface VisitorStat {
   date: string;
@@ -14,6 +15,14 @@ interface DepartmentStat {
   count: number;
 }
 
+interface Report {
+  scope: string;
+  period: string;
+  format: string;
+  complete: boolean;
+  url: string;
+}
+
 const Analytics: React.FC = () => {
   const { user } = useAuth();
   const { getVisitorStats, getDepartmentStats } = useVisitors();
@@ -22,6 +31,19 @@ const Analytics: React.FC = () => {
   const [departmentStats, setDepartmentStats] = useState<DepartmentStat[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [reports, setReports] = useState<Report[]>([]);
+
+  useEffect(() => {
+    // Yearly CSVs of the widest scope the user may read (all departments, or
+    // the director's own); the snapshots are optional, so failures are not shown.
+    listReports()
+      .then((data) => {
+        const yearly = data.reports.filter((report: Report) => report.format === 'csv' && report.period.length === 4);
+        const all = yearly.filter((report: Report) => report.scope === 'all');
+        setReports(all.length > 0 ? all : yearly);
+      })
+      .catch((err) => console.error('Failed to fetch reports:', err));
+  }, []);
 
   useEffect(() => {
     const fetchData = async () => {
@@ -227,6 +249,27 @@ const Analytics: React.FC = () => {
             <p className="text-sm text-gray-600">Total visitors in the past 365 days</p>
           </div>
         </div>
+
+        {reports.length > 0 && (
+          <div className="bg-white rounded-lg shadow p-6 mt-8">
+            <h2 className="text-xl font-semibold text-gray-800 mb-4 flex items-center">
+              <DownloadIcon className="mr-2 h-5 w-5 text-blue-600" />
+              Yearly Reports
+            </h2>
+            <div className="flex flex-wrap gap-2">
+              {reports.map((report) => (
+                <button
+                  key={report.url}
+                  onClick={() => downloadReport(report.url, `visits-${report.scope}-${report.period}.csv`)}
+                  className="px-3 py-1 text-sm rounded-md bg-gray-100 text-gray-700 hover:bg-gray-200"
+                >
+                  {report.period}
+                  {!report.complete && ' (to date)'}
+                </button>
+              ))}
+            </div>
+          </div>
+        )}
       </div>
     </ErrorBoundary>
   );
@@ -2,7 +2,7 @@ import React, { useState, useEffect, useRef } from 'react';
 import { useVisitors } from '../context/VisitorContext';
 import { toast } from 'sonner';
 import { CheckCircleIcon } from 'lucide-react';
-import api from '../services/api';
+import api, { avatarUrl } from '../services/api';
 import ErrorBoundary from '../components/ErrorBoundary';
 
 const CheckIn: React.FC = () => {
@@ -12,6 +12,8 @@ const CheckIn: React.FC = () => {
   const [avatar, setAvatar] = useState('');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [badgeToken, setBadgeToken] = useState('');
+  const [scanning, setScanning] = useState(false);
   const nameInputRef = useRef<HTMLInputElement>(null);
 
   const initialState = {
@@ -51,6 +53,25 @@ const CheckIn: React.FC = () => {
       }
     }, [loading]);
 
+  // Badge scanners type the QR code's token followed by Enter.
+  const handleScan = async (e: React.FormEvent) => {
+    e.preventDefault();
+    const token = badgeToken.trim();
+    if (!token || scanning) return;
+    try {
+      setScanning(true);
+      const response = await api.post('/visitors/scan/', { token });
+      const { action, visitor } = response.data;
+      toast.success(`${visitor.name} checked ${action === 'check_in' ? 'in' : 'out'}`);
+      await refreshVisitors?.();
+    } catch (error: any) {
+      toast.error(error.response?.data?.error || 'Failed to scan badge');
+    } finally {
+      setBadgeToken('');
+      setScanning(false);
+    }
+  };
+
   const handleChange = (e: React.ChangeEvent<HTMLInputElement | HTMLSelectElement | HTMLTextAreaElement>) => {
     const { name, value } = e.target;
     setFormData(prev => ({
@@ -58,7 +79,7 @@ const CheckIn: React.FC = () => {
       [name]: value
     }));
     if (name === 'name') {
-      setAvatar(`https://ui-avatars.com/api/?name=${encodeURIComponent(value)}&background=random`);
+      setAvatar(value.trim() ? avatarUrl(value) : '');
     }
   };
 
@@ -89,8 +110,7 @@ const CheckIn: React.FC = () => {
         address: formData.address,
         visit_date: formData.visit_date,
         status: 'checked-in',
-        check_in_time: new Date().toISOString(),
-        avatar: `https://ui-avatars.com/api/?name=${encodeURIComponent(formData.name)}`
+        check_in_time: new Date().toISOString()
       };
   
       const response = await api.post('/visitors/', payload);
@@ -142,6 +162,21 @@ const CheckIn: React.FC = () => {
           </div>
         )}
 
+        <form onSubmit={handleScan} className="bg-white rounded-lg shadow p-4 mb-6 flex items-center gap-3">
+          <label htmlFor="badge" className="text-sm font-medium text-gray-700 whitespace-nowrap">
+            Scan badge
+          </label>
+          <input
+            type="text"
+            id="badge"
+            value={badgeToken}
+            onChange={(e) => setBadgeToken(e.target.value)}
+            placeholder="Scan a pre-registration badge to check in or out"
+            className="flex-1 border border-gray-300 rounded-md px-3 py-2 focus:outline-none focus:ring-2 focus:ring-blue-500"
+            autoComplete="off"
+          />
+        </form>
+
         <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
           <div className="lg:col-span-2">
             <div className="bg-white rounded-lg shadow p-6">
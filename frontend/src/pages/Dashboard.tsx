@@ -1,6 +1,7 @@
 import React, { useEffect, useMemo } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { useVisitors, Visitor, VisitorStatus } from '../context/VisitorContext';
+import { avatarUrl } from '../services/api';
 import { UserCheckIcon, Clock9Icon } from 'lucide-react';
 import LoadingSpinner from '../components/LoadingSpinner';
 import { ROUTES } from '../constants/routes';
@@ -142,7 +143,7 @@ const RecentVisitorsTable: React.FC<{ visitors: Visitor[] }> = ({ visitors }) =>
                 <td className="px-4 py-3 whitespace-nowrap">
                   <div className="flex items-center">
                     <img
-                      src={visitor.avatar || `https://ui-avatars.com/api/?name=${encodeURI(visitor.name)}&background=random`}
+                      src={visitor.avatar || avatarUrl(visitor.name)}
                       alt={visitor.name}
                       className="h-9 w-9 rounded-full mr-3"
                     />
@@ -18,7 +18,8 @@ const Departments: React.FC = () => {
 
   const initialFormState = {
     name: '',
-    description: ''
+    description: '',
+    max_occupancy: ''
   };
 
   const [deleteDialogOpen, setDeleteDialogOpen] = useState(false);
@@ -48,12 +49,16 @@ const Departments: React.FC = () => {
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
+    const payload = {
+      ...formData,
+      max_occupancy: formData.max_occupancy === '' ? null : Number(formData.max_occupancy)
+    };
     try {
       if (editingId) {
-        await api.put(`/departments/${editingId}/`, formData);
+        await api.put(`/departments/${editingId}/`, payload);
         toast.success('Department updated successfully');
       } else {
-        await api.post('/departments/', formData);
+        await api.post('/departments/', payload);
         toast.success('Department added successfully');
       }
       
@@ -170,6 +175,21 @@ const Departments: React.FC = () => {
                     className="w-full px-4 py-2 border border-gray-300 rounded-md focus:ring-blue-500 focus:border-blue-500" 
                   />
                 </div>
+                <div>
+                  <label htmlFor="max_occupancy" className="block text-sm font-medium text-gray-700 mb-1">
+                    Maximum Occupancy
+                  </label>
+                  <input 
+                    type="number" 
+                    id="max_occupancy" 
+                    name="max_occupancy" 
+                    min={0} 
+                    value={formData.max_occupancy} 
+                    onChange={handleChange} 
+                    placeholder="No limit" 
+                    className="w-full px-4 py-2 border border-gray-300 rounded-md focus:ring-blue-500 focus:border-blue-500" 
+                  />
+                </div>
               </div>
               <div className="flex justify-end">
                 <button 
@@ -224,15 +244,19 @@ const Departments: React.FC = () => {
                       {department.description || 'No description available'}
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                      {/* Update this with actual visitor count */}
                       {department.visitor_count || 0} visitors
+                      <span className="block text-xs text-gray-400">
+                        {department.on_site_count || 0}
+                        {department.max_occupancy != null && ` / ${department.max_occupancy}`} on site
+                      </span>
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
                       <button 
                         onClick={() => {
                           setFormData({
                             name: department.name,
-                            description: department.description || ''
+                            description: department.description || '',
+                            max_occupancy: department.max_occupancy != null ? String(department.max_occupancy) : ''
                           });
                           setEditingId(department.id);
                           setShowForm(true);
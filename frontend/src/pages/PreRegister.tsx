@@ -11,6 +11,7 @@ const PreRegister: React.FC = () => {
   const { user, loading: authLoading }: any = useAuth();
   const [showSuccess, setShowSuccess] = useState(false);
   const [visitorName, setVisitorName] = useState('');
+  const [badge, setBadge] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const [submitting, setSubmitting] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -77,8 +78,7 @@ const PreRegister: React.FC = () => {
         organization: formData.organization,
         address: formData.address,
         visit_date: formData.visit_date,
-        status: 'pre-registered',
-        avatar: `https://ui-avatars.com/api/?name=${encodeURIComponent(formData.name)}`
+        status: 'pre-registered'
       };
 
       const response = await api.post('/visitors/', payload);
@@ -89,6 +89,7 @@ const PreRegister: React.FC = () => {
 
       await refreshVisitors?.();
       setVisitorName(formData.name);
+      setBadge(response.data.badge);
       setShowSuccess(true);
 
       setFormData({
@@ -317,6 +318,14 @@ const PreRegister: React.FC = () => {
                     </p>
                   </div>
                 </div>
+                {badge && (
+                  <div className="mt-4 text-center">
+                    <img src={badge} alt={`Badge for ${visitorName}`} className="mx-auto h-40 w-40" />
+                    <p className="text-sm text-gray-600 mt-2">
+                      Share or print this badge; scanning it at the desk checks the visitor in and out.
+                    </p>
+                  </div>
+                )}
               </div>
             )}
 
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { toast } from 'sonner';
 import { UserPlusIcon, CheckCircleIcon, UserIcon, EditIcon, TrashIcon } from 'lucide-react';
@@ -17,7 +17,7 @@ interface User {
   department_name?: string;
 }
 
-
+const PAGE_SIZE = 50;
 
 const Users: React.FC = () => {
   const { user } = useAuth();
@@ -46,31 +46,39 @@ const Users: React.FC = () => {
   const [deleteDialogOpen, setDeleteDialogOpen] = useState(false);
   const [userToDelete, setUserToDelete] = useState<string | null>(null);
 
+  const [page, setPage] = useState(1);
+  const [totalUsers, setTotalUsers] = useState(0);
+  const [search, setSearch] = useState('');
+  const [roleFilter, setRoleFilter] = useState('');
+
+  // The user list is paginated by the API; filters are applied server-side.
+  const fetchUsers = useCallback(async () => {
+    try {
+      const response = await api.get('/users/', {
+        params: {
+          page,
+          page_size: PAGE_SIZE,
+          search: search || undefined,
+          role: roleFilter || undefined
+        }
+      });
+      setUsers(Array.isArray(response.data?.results) ? response.data.results : []);
+      setTotalUsers(response.data?.count || 0);
+      setError(null);
+    } catch (error) {
+      console.error('Fetch error:', error);
+      setError('Failed to load data. Please try again later.');
+      toast.error('Failed to load data');
+    } finally {
+      setLoading(false);
+    }
+  }, [page, search, roleFilter]);
+
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        setLoading(true);
-        const [usersRes, deptRes] = await Promise.all([
-          api.get('/users/'),
-          api.get('/departments/')
-        ]);
-
-        const departmentsData = Array.isArray(deptRes?.data) ? deptRes.data : [];
-        const usersData = Array.isArray(usersRes?.data) ? usersRes.data : [];
-
-        setUsers(usersData);
-        setDepartments(departmentsData);
-        setError(null);
-      } catch (error) {
-        console.error('Fetch error:', error);
-        setError('Failed to load data. Please try again later.');
-        toast.error('Failed to load data');
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchData();
-  }, []);
+    fetchUsers();
+  }, [fetchUsers]);
+
+  const totalPages = Math.max(1, Math.ceil(totalUsers / PAGE_SIZE));
 
   const [departmentsLoading, setDepartmentsLoading] = useState(false);
   useEffect(() => {
@@ -120,6 +128,7 @@ const Users: React.FC = () => {
     try {
       await api.delete(`/users/${userToDelete}/`);
       setUsers(prev => prev.filter(user => user.id !== userToDelete));
+      setTotalUsers(prev => Math.max(0, prev - 1));
       toast.success('User deleted successfully');
     } catch (error) {
       console.error('Delete failed:', error);
@@ -173,7 +182,7 @@ const Users: React.FC = () => {
         setUsers(prev => prev.map(u => u.id === editingId ? response.data : u));
         toast.success('User updated successfully');
       } else {
-        setUsers(prev => [...prev, response.data]);
+        fetchUsers();
         setNewUserFullName(`${formData.first_name} ${formData.last_name}`);
         setShowSuccess(true);
         toast.success('User added successfully');
@@ -439,8 +448,27 @@ const Users: React.FC = () => {
         )}
 
         <div className="bg-white rounded-lg shadow-md">
-          <div className="px-6 py-4 border-b border-gray-200">
+          <div className="px-6 py-4 border-b border-gray-200 flex flex-col md:flex-row md:items-center md:justify-between gap-4">
             <h2 className="text-lg font-semibold">System Users</h2>
+            <div className="flex gap-3">
+              <input
+                type="search"
+                placeholder="Search name or email"
+                value={search}
+                onChange={e => { setSearch(e.target.value); setPage(1); }}
+                className="px-3 py-2 border border-gray-300 rounded-md text-sm focus:ring-blue-500 focus:border-blue-500"
+              />
+              <select
+                value={roleFilter}
+                onChange={e => { setRoleFilter(e.target.value); setPage(1); }}
+                className="px-3 py-2 border border-gray-300 rounded-md text-sm focus:ring-blue-500 focus:border-blue-500"
+              >
+                <option value="">All roles</option>
+                <option value="staff">Staff</option>
+                <option value="director">Director</option>
+                <option value="admin">Admin</option>
+              </select>
+            </div>
           </div>
           
           <div className="overflow-x-auto">
@@ -512,6 +540,28 @@ const Users: React.FC = () => {
               </tbody>
             </table>
           </div>
+
+          <div className="px-6 py-4 border-t border-gray-200 flex items-center justify-between text-sm text-gray-600">
+            <span>
+              {totalUsers} user{totalUsers === 1 ? '' : 's'} &middot; Page {page} of {totalPages}
+            </span>
+            <div className="flex gap-2">
+              <button
+                onClick={() => setPage(p => Math.max(1, p - 1))}
+                disabled={page <= 1}
+                className="px-3 py-1 border border-gray-300 rounded-md disabled:opacity-50"
+              >
+                Previous
+              </button>
+              <button
+                onClick={() => setPage(p => Math.min(totalPages, p + 1))}
+                disabled={page >= totalPages}
+                className="px-3 py-1 border border-gray-300 rounded-md disabled:opacity-50"
+              >
+                Next
+              </button>
+            </div>
+          </div>
         </div>
       </div>
       <AlertDialog open={deleteDialogOpen} onOpenChange={setDeleteDialogOpen}>
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useVisitors } from '../context/VisitorContext';
 import { useAuth } from '../context/AuthContext';
 import { toast } from 'sonner';
-import api from '../services/api';
+import api, { avatarUrl } from '../services/api';
 import { CheckCircleIcon, FilterIcon, SearchIcon, CheckIcon, LogOutIcon } from 'lucide-react';
 
 const Visitors: React.FC = () => {
@@ -34,8 +34,9 @@ const Visitors: React.FC = () => {
       setSuccessAction({ type: 'check-in', name });
       setShowSuccessCard(true);
       toast.success(`${name} has been checked in`);
-    } catch (error) {
-      toast.error('Check-in failed');
+    } catch (error: any) {
+      // 409 when the department is at its maximum occupancy.
+      toast.error(error.response?.data?.error || 'Check-in failed');
     }
   };
 
@@ -124,10 +125,15 @@ const Visitors: React.FC = () => {
               {filteredVisitors.length > 0 ? filteredVisitors.map(visitor => <tr key={visitor.id}>
                     <td className="px-6 py-4 whitespace-nowrap">
                       <div className="flex items-center">
-                        <img src={visitor.avatar || `https://ui-avatars.com/api/?name=${encodeURIComponent(visitor.name)}&background=random`} alt={visitor.name} className="h-10 w-10 rounded-full mr-3" />
+                        <img src={visitor.avatar || avatarUrl(visitor.name)} alt={visitor.name} className="h-10 w-10 rounded-full mr-3" />
                         <div>
                           <div className="font-medium text-gray-900">
                             {visitor.name}
+                            {visitor.watchlist_hits && visitor.watchlist_hits.length > 0 && (
+                              <span className="ml-2 px-2 py-0.5 text-xs font-semibold rounded-full bg-red-100 text-red-800" title="Matches the security watchlist">
+                                Watchlist
+                              </span>
+                            )}
                           </div>
                           <div className="text-sm text-gray-500">
                             {visitor.email}
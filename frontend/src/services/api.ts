@@ -52,4 +52,58 @@ api.interceptors.response.use(
   }
 );
 
+// Initials avatar served by the API; the same name always gives the same image.
+// Like visitors/avatars.py, the URL carries the initials and a colour index
+// (crc32 of the normalised name), never the name itself.
+const AVATAR_COLORS = 12;
+const CRC_TABLE = Array.from({ length: 256 }, (_, n) => {
+  let c = n;
+  for (let k = 0; k < 8; k++) c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+  return c >>> 0;
+});
+
+const crc32 = (bytes: Uint8Array) => {
+  let crc = 0xffffffff;
+  for (const byte of bytes) crc = CRC_TABLE[(crc ^ byte) & 0xff] ^ (crc >>> 8);
+  return (crc ^ 0xffffffff) >>> 0;
+};
+
+export const avatarUrl = (name: string) => {
+  const words = name.split(/\s+/).filter(Boolean);
+  let letters = words.map((word) => Array.from(word)[0]).filter((letter) => /[\p{L}\p{N}]/u.test(letter));
+  if (letters.length > 2) letters = [letters[0], letters[letters.length - 1]];
+  const initials = letters.join('').toUpperCase() || '?';
+  const color = crc32(new TextEncoder().encode(words.join(' ').toLowerCase())) % AVATAR_COLORS;
+  return `${api.defaults.baseURL}/visitors/avatar/?i=${encodeURIComponent(initials)}&c=${color}`;
+};
+
+// Several GETs in one round trip through POST /api/batch/; resolves to the
+// response bodies in order, and rejects if any of them failed.
+export const batchGet = async (paths: string[]) => {
+  const response = await api.post('/batch/', {
+    requests: paths.map((path) => ({ path: `/api${path}` })),
+    parallel: true,
+  });
+  return response.data.responses.map((result: { status: number; body: any }, index: number) => {
+    if (result.status >= 400) {
+      throw new Error(`GET ${paths[index]} failed with status ${result.status}`);
+    }
+    return result.body;
+  });
+};
+
+// Nightly report snapshots the user may read (GET /api/visitors/reports/).
+export const listReports = async () => (await api.get('/visitors/reports/')).data;
+
+// Reports need the bearer token, so they are fetched and saved as a blob
+// rather than linked to.
+export const downloadReport = async (url: string, filename: string) => {
+  const response = await api.get(url, { responseType: 'blob' });
+  const link = document.createElement('a');
+  link.href = URL.createObjectURL(response.data);
+  link.download = filename;
+  link.click();
+  URL.revokeObjectURL(link.href);
+};
+
 export default api;
\ No newline at end of file